@@ -0,0 +1,314 @@
+"""Agendador de tarefas com dependências (DAG), no estilo do make.
+
+Cada tarefa declara as tarefas de que depende, suas entradas (arquivos ou
+padrões glob: planilhas, configs, gabaritos) e os arquivos de código que a
+implementam. A assinatura da tarefa é o hash do conteúdo dessas entradas,
+das saídas das dependências, do código e dos argumentos; a tarefa só roda
+de novo quando a assinatura muda ou alguma saída registrada sumiu.
+Quando uma tarefa roda de novo, as saídas da vez anterior que ela não gerou
+mais (e que nenhuma outra tarefa gerou) são apagadas, para que não sigam
+como entrada das etapas seguintes.
+
+Com `paralelo` > 1, tarefas independentes (ramos diferentes do grafo) rodam
+ao mesmo tempo em processos separados; por isso a função da tarefa precisa
+ser uma função de módulo e os argumentos precisam ser serializáveis. A
+função recebe a lista de saídas das dependências e os argumentos, e retorna
+a lista de arquivos que gerou.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from progresso import pulso
+
+# Segundos entre sinais de vida enquanto as tarefas rodam nos outros processos
+INTERVALO_PULSO = 5
+
+
+class Tarefa:
+    def __init__(self, nome, funcao, argumentos=None, dependencias=(), entradas=(), codigo=(), descricao=None,
+                 chave=None, apos=()):
+        """`chave` substitui os argumentos na assinatura, para argumentos que não mudam o resultado.
+        `apos` são tarefas que só precisam terminar antes (como os pré-requisitos só de ordem do
+        make): as saídas delas não entram na assinatura e refazê-las não refaz esta."""
+        self.nome = nome
+        self.funcao = funcao
+        self.argumentos = argumentos or {}
+        self.chave = self.argumentos if chave is None else chave
+        self.dependencias = list(dependencias)
+        self.apos = list(apos)
+        self.entradas = [str(e) for e in entradas]
+        self.codigo = [str(c) for c in codigo]
+        self.descricao = descricao or nome
+
+
+class ErroTarefa(Exception):
+    def __init__(self, tarefa, mensagem):
+        super().__init__(mensagem)
+        self.tarefa = tarefa
+
+
+def _rodar_tarefa(funcao, saidas_dependencias, argumentos):
+    try:
+        return [str(s) for s in funcao(saidas_dependencias, **argumentos)]
+    except SystemExit as e:
+        # As classes do MOTOR chamam exit(1) quando falta config
+        raise RuntimeError(f"encerrou com código {e.code} (veja o log)") from None
+
+
+def _expandir(padroes):
+    """Arquivos que casam com os padrões; um caminho sem curinga que não existe
+    entra mesmo assim, para que o surgimento dele invalide a tarefa."""
+    arquivos = set()
+    for padrao in padroes:
+        if glob.has_magic(padrao):
+            arquivos.update(p for p in glob.glob(padrao) if os.path.isfile(p))
+        else:
+            arquivos.add(padrao)
+    return sorted(os.path.abspath(a) for a in arquivos)
+
+
+class Agendador:
+    def __init__(self, arquivo_estado, paralelo=1, ao_iniciar=None, ao_terminar=None, inicializador=None,
+                 argumentos_inicializador=()):
+        """`ao_iniciar(tarefa, motivo)` é chamada antes de cada tarefa que vai rodar e
+        `ao_terminar(tarefa, situacao)` depois de cada tarefa executada ou em dia.
+        `inicializador` roda uma vez em cada processo do modo paralelo."""
+        self.arquivo_estado = arquivo_estado
+        self.paralelo = max(int(paralelo), 1)
+        self.ao_iniciar = ao_iniciar
+        self.ao_terminar = ao_terminar
+        self.inicializador = inicializador
+        self.argumentos_inicializador = argumentos_inicializador
+        self.tarefas = {}
+        self._estado = None
+
+    def adicionar(self, tarefa):
+        if tarefa.nome in self.tarefas:
+            raise ValueError(f"Tarefa duplicada: {tarefa.nome}")
+        self.tarefas[tarefa.nome] = tarefa
+        return tarefa
+
+    def _ordenar(self):
+        """Ordem topológica, mantendo a ordem de inclusão entre tarefas independentes."""
+        for tarefa in self.tarefas.values():
+            for dependencia in tarefa.dependencias + tarefa.apos:
+                if dependencia not in self.tarefas:
+                    raise ValueError(f"{tarefa.nome} depende de tarefa inexistente: {dependencia}")
+
+        ordem, feitas = [], set()
+        restantes = list(self.tarefas)
+        while restantes:
+            prontas = [n for n in restantes
+                       if all(d in feitas for d in self.tarefas[n].dependencias + self.tarefas[n].apos)]
+            if not prontas:
+                raise ValueError(f"Ciclo de dependências entre: {', '.join(restantes)}")
+            for nome in prontas:
+                restantes.remove(nome)
+                feitas.add(nome)
+                ordem.append(nome)
+        return ordem
+
+    # Estado salvo entre execuções
+
+    def _carregar_estado(self):
+        try:
+            with open(self.arquivo_estado, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            estado = {}
+        estado.setdefault('tarefas', {})
+        estado.setdefault('arquivos', {})
+        return estado
+
+    def _salvar_estado(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.arquivo_estado)), exist_ok=True)
+        temporario = f"{self.arquivo_estado}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self._estado, f, ensure_ascii=False, indent=1)
+        os.replace(temporario, self.arquivo_estado)
+
+    def _hash_arquivo(self, caminho):
+        """Hash do conteúdo, recalculado só quando tamanho ou data de modificação mudam."""
+        cache = self._estado['arquivos']
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            cache.pop(caminho, None)
+            return None
+        anterior = cache.get(caminho)
+        if anterior and anterior[0] == info.st_size and anterior[1] == info.st_mtime_ns:
+            return anterior[2]
+
+        h = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloco)
+        cache[caminho] = [info.st_size, info.st_mtime_ns, h.hexdigest()]
+        return cache[caminho][2]
+
+    def saidas(self, nome):
+        """Arquivos gerados pela tarefa na última vez em que ela rodou."""
+        return self._estado['tarefas'].get(nome, {}).get('saidas', [])
+
+    def _saidas_dependencias(self, tarefa):
+        return [s for d in tarefa.dependencias for s in self.saidas(d)]
+
+    def _assinatura(self, tarefa):
+        h = hashlib.sha256()
+        h.update(json.dumps(tarefa.chave, sort_keys=True, default=str).encode('utf-8'))
+        entradas = sorted(set(self._saidas_dependencias(tarefa)) | set(_expandir(tarefa.entradas)))
+        for grupo in (entradas, _expandir(tarefa.codigo)):
+            h.update(b'|')
+            for caminho in grupo:
+                h.update(f"{caminho}={self._hash_arquivo(caminho)};".encode('utf-8'))
+        return h.hexdigest()
+
+    def _motivo(self, tarefa, assinatura):
+        """Por que a tarefa precisa rodar, ou None se ela está em dia."""
+        anterior = self._estado['tarefas'].get(tarefa.nome)
+        if anterior is None:
+            return "nunca executada"
+        ausentes = [s for s in anterior.get('saidas', []) if not os.path.exists(s)]
+        if ausentes:
+            return f"saída ausente: {os.path.basename(ausentes[0])}"
+        if anterior.get('assinatura') != assinatura:
+            return "entradas, configs ou código mudaram"
+        return None
+
+    def planejar(self, forcar=False):
+        """Simulação (dry-run): [(tarefa, motivo ou None)] na ordem em que rodariam."""
+        self._estado = self._carregar_estado()
+        plano, refazer = [], set()
+        for nome in self._ordenar():
+            tarefa = self.tarefas[nome]
+            dependencias = [d for d in tarefa.dependencias if d in refazer]
+            if forcar:
+                motivo = "forçada"
+            elif dependencias:
+                motivo = f"depende de {self.tarefas[dependencias[0]].descricao}"
+            else:
+                motivo = self._motivo(tarefa, self._assinatura(tarefa))
+            if motivo:
+                refazer.add(nome)
+            plano.append((tarefa, motivo))
+        return plano
+
+    def _remover_obsoletas(self, tarefa, saidas):
+        """Apaga as saídas da execução anterior de `tarefa` que não estão em `saidas` nem são de outra tarefa."""
+        outras = {s for nome in self.tarefas if nome != tarefa.nome for s in self.saidas(nome)}
+        for caminho in set(self.saidas(tarefa.nome)) - set(saidas) - outras:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logging.warning(f"Não foi possível remover a saída obsoleta {caminho}: {e}")
+                continue
+            logging.info(f"Removida saída obsoleta de {tarefa.descricao}: {os.path.basename(caminho)}")
+
+    def _registrar(self, tarefa, assinatura, saidas, segundos):
+        saidas = [os.path.abspath(s) for s in saidas]
+        self._remover_obsoletas(tarefa, saidas)
+        self._estado['tarefas'][tarefa.nome] = {
+            'assinatura': assinatura,
+            'saidas': saidas,
+            'segundos': round(segundos, 3),
+        }
+        self._salvar_estado()
+
+    def _terminar(self, resultado, tarefa, situacao):
+        resultado[tarefa.nome] = situacao
+        if self.ao_terminar:
+            self.ao_terminar(tarefa, situacao)
+
+    def executar(self, forcar=False):
+        """Roda as tarefas desatualizadas e retorna {nome: 'executada' | 'em dia'}.
+
+        A assinatura de cada tarefa é calculada quando as dependências terminam,
+        então uma dependência refeita com o mesmo conteúdo não propaga a
+        reconstrução. Em caso de erro, as tarefas em andamento terminam, nada
+        novo é iniciado e ErroTarefa é levantada.
+        """
+        ordem = self._ordenar()
+        self._estado = self._carregar_estado()
+        resultado = {}
+        pendentes = list(ordem)
+        em_andamento = {}
+        erro = None
+        executor = None
+        if self.paralelo > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.paralelo, initializer=self.inicializador, initargs=self.argumentos_inicializador
+            )
+
+        try:
+            while pendentes or em_andamento:
+                iniciou = True
+                while iniciou and erro is None:
+                    iniciou = False
+                    for nome in list(pendentes):
+                        tarefa = self.tarefas[nome]
+                        if not all(resultado.get(d) for d in tarefa.dependencias + tarefa.apos):
+                            continue
+                        pendentes.remove(nome)
+                        iniciou = True
+
+                        assinatura = self._assinatura(tarefa)
+                        motivo = "forçada" if forcar else self._motivo(tarefa, assinatura)
+                        if motivo is None:
+                            logging.info(f"Em dia: {tarefa.descricao}")
+                            self._terminar(resultado, tarefa, 'em dia')
+                            continue
+
+                        logging.info(f"Executando: {tarefa.descricao} ({motivo})")
+                        if self.ao_iniciar:
+                            self.ao_iniciar(tarefa, motivo)
+                        argumentos = (tarefa.funcao, self._saidas_dependencias(tarefa), tarefa.argumentos)
+                        inicio = time.perf_counter()
+
+                        if executor is None:
+                            try:
+                                saidas = _rodar_tarefa(*argumentos)
+                            except Exception as e:
+                                logging.exception(f"Erro na tarefa {tarefa.descricao}")
+                                erro = ErroTarefa(tarefa, f"{type(e).__name__}: {e}")
+                                erro.__cause__ = e
+                                break
+                            self._registrar(tarefa, assinatura, saidas, time.perf_counter() - inicio)
+                            self._terminar(resultado, tarefa, 'executada')
+                        else:
+                            futuro = executor.submit(_rodar_tarefa, *argumentos)
+                            em_andamento[futuro] = (tarefa, assinatura, inicio)
+
+                if erro is not None:
+                    pendentes.clear()
+                if not em_andamento:
+                    continue
+
+                prontos, _ = wait(em_andamento, timeout=INTERVALO_PULSO, return_when=FIRST_COMPLETED)
+                if erro is None:
+                    pulso()
+                for futuro in prontos:
+                    tarefa, assinatura, inicio = em_andamento.pop(futuro)
+                    try:
+                        saidas = futuro.result()
+                    except Exception as e:
+                        logging.error(f"Erro na tarefa {tarefa.descricao}: {e}", exc_info=e)
+                        if erro is None:
+                            erro = ErroTarefa(tarefa, f"{type(e).__name__}: {e}")
+                            erro.__cause__ = e
+                        continue
+                    self._registrar(tarefa, assinatura, saidas, time.perf_counter() - inicio)
+                    self._terminar(resultado, tarefa, 'executada')
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        if erro is not None:
+            raise erro
+        return resultado
@@ -0,0 +1,253 @@
+"""Cache das saídas das etapas do ETL, endereçado pelo conteúdo do que as produz.
+
+Cada unidade de trabalho (uma planilha no conversor, um TXT no gerador, um
+grupo no mesclador, um arquivo no separador e no tradutor) tem uma chave:
+o hash do conteúdo das entradas, da parte da config que a etapa usa, do
+código da etapa e dos parâmetros que mudam o resultado. Com a chave já no
+cache, a etapa copia as saídas guardadas em vez de refazê-las e repete as
+contagens do manifesto; senão processa e guarda o que gerou. Assim uma config
+que volta ao que era, ou uma planilha igual em outra pasta de trabalho (jobs
+da API), sai do cache em todas as etapas.
+
+Cada entrada fica em <pasta>/<2 primeiros>/<chave>/, com as saídas e um
+entrada.json. Quando o total passa de `limite_mb`, as entradas usadas há mais
+tempo saem primeiro (`despejar`). Para ver ou limpar:
+
+    python COMUM/cache_etapas.py resumo
+    python COMUM/cache_etapas.py listar [--etapa tradutor]
+    python COMUM/cache_etapas.py limpar [--etapa gerador] [--ate-mb 500]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from metricas import contar, repetir
+from progresso import arquivo_concluido
+
+VERSAO = 1
+LIMITE_PADRAO_MB = 2048
+PASTA_PADRAO = Path(__file__).resolve().parent.parent / 'MOTOR' / 'cache' / 'etapas'
+PREFIXO_TEMPORARIO = '.novo_'
+
+
+def parte_config(config, *chaves):
+    """Só as chaves da config que a etapa lê, para que editar o resto não invalide o cache."""
+    return {chave: config.get(chave) for chave in chaves}
+
+
+def _copiar(origem, destino):
+    # Cópia (não hardlink): as etapas regravam as saídas no lugar e estragariam a entrada
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    shutil.copyfile(origem, temporario)
+    os.replace(temporario, destino)
+
+
+class CacheEtapas:
+    def __init__(self, pasta=PASTA_PADRAO, limite_mb=LIMITE_PADRAO_MB, ler=True):
+        """Com `ler=False` (--forcar) nada sai do cache, mas o que é gerado continua sendo guardado."""
+        self.pasta = Path(pasta)
+        self.limite_mb = LIMITE_PADRAO_MB if limite_mb is None else limite_mb
+        self.ler = ler
+        # (caminho, tamanho, mtime) -> hash, só durante o processo
+        self._hashes = {}
+
+    def _hash_arquivo(self, caminho):
+        caminho = os.path.abspath(caminho)
+        info = os.stat(caminho)
+        chave = (caminho, info.st_size, info.st_mtime_ns)
+        if chave not in self._hashes:
+            h = hashlib.sha256()
+            with open(caminho, 'rb') as f:
+                for bloco in iter(lambda: f.read(1 << 20), b''):
+                    h.update(bloco)
+            self._hashes[chave] = h.hexdigest()
+        return self._hashes[chave]
+
+    def chave(self, etapa, arquivos=(), codigo=(), **partes):
+        """Hash das entradas (nome e conteúdo), do código da etapa e das `partes` (config, opções)."""
+        h = hashlib.sha256(f"{VERSAO}|{etapa}|".encode('utf-8'))
+        h.update(json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        for arquivo in arquivos:
+            h.update(f"|{Path(arquivo).name}={self._hash_arquivo(arquivo)}".encode('utf-8'))
+        h.update(b'|')
+        for arquivo in codigo:
+            h.update(f"{self._hash_arquivo(arquivo)};".encode('utf-8'))
+        return h.hexdigest()
+
+    def _pasta_entrada(self, chave):
+        return self.pasta / chave[:2] / chave
+
+    def restaurar(self, chave, destino):
+        """Copia para `destino` as saídas guardadas em `chave` e repete as contagens delas.
+
+        Retorna a entrada (com 'caminhos', as saídas restauradas) ou None quando
+        a chave não está no cache.
+        """
+        if not self.ler:
+            return None
+        pasta = self._pasta_entrada(chave)
+        try:
+            with open(pasta / 'entrada.json', 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            if entrada.get('versao') != VERSAO:
+                return None
+            caminhos = []
+            for nome in entrada['arquivos']:
+                _copiar(pasta / nome, Path(destino) / nome)
+                caminhos.append(Path(destino) / nome)
+            # Usada agora: vai para o fim da fila do despejo
+            os.utime(pasta / 'entrada.json')
+        except (OSError, ValueError, KeyError):
+            # Ausente, ou despejada por outro processo no meio da cópia
+            return None
+
+        repetir(entrada.get('contagens', []))
+        # O tradutor guarda as partes em vez de `registros` e anuncia as saídas ele mesmo
+        for nome, registros in entrada.get('registros', {}).items():
+            logging.info(f"Do cache: {nome} ({registros} registros)")
+            contar('do_cache', 1, nome)
+            arquivo_concluido(nome, registros)
+        entrada['caminhos'] = caminhos
+        return entrada
+
+    def guardar(self, chave, etapa, arquivos, contagens=(), **dados):
+        """Guarda cópias de `arquivos` sob `chave`, com as contagens gravadas e `dados` (registros, partes, ...).
+
+        Uma falha aqui só é avisada: sem cache a execução continua valendo.
+        """
+        final = self._pasta_entrada(chave)
+        if final.exists():
+            return
+        temporario = None
+        try:
+            self.pasta.mkdir(parents=True, exist_ok=True)
+            temporario = Path(tempfile.mkdtemp(prefix=PREFIXO_TEMPORARIO, dir=self.pasta))
+            total = 0
+            for arquivo in arquivos:
+                shutil.copyfile(arquivo, temporario / Path(arquivo).name)
+                total += os.path.getsize(arquivo)
+            entrada = {'versao': VERSAO, 'etapa': etapa, 'chave': chave, 'criada': datetime.now().isoformat(timespec='seconds'),
+                       'arquivos': [Path(a).name for a in arquivos], 'bytes': total, 'contagens': list(contagens), **dados}
+            with open(temporario / 'entrada.json', 'w', encoding='utf-8') as f:
+                json.dump(entrada, f, ensure_ascii=False, default=str)
+            final.parent.mkdir(exist_ok=True)
+            os.rename(temporario, final)
+            temporario = None
+        except OSError as e:
+            # Inclusive a mesma chave guardada por outro processo ao mesmo tempo
+            if not final.exists():
+                logging.warning(f"Não foi possível guardar no cache das etapas: {e}")
+        finally:
+            if temporario is not None:
+                shutil.rmtree(temporario, ignore_errors=True)
+
+    def entradas(self):
+        """[{etapa, chave, arquivos, bytes, criada, usada, pasta}] das entradas guardadas, das mais antigas às mais novas."""
+        entradas = []
+        if not self.pasta.is_dir():
+            return entradas
+        for caminho in self.pasta.glob('??/*/entrada.json'):
+            try:
+                usada = caminho.stat().st_mtime
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entradas.append({
+                'etapa': entrada.get('etapa'), 'chave': caminho.parent.name, 'arquivos': entrada.get('arquivos', []),
+                'bytes': entrada.get('bytes', 0), 'criada': entrada.get('criada'), 'usada': usada,
+                'pasta': caminho.parent,
+            })
+        entradas.sort(key=lambda e: e['usada'])
+        return entradas
+
+    def resumo(self):
+        etapas = {}
+        entradas = self.entradas()
+        for entrada in entradas:
+            etapa = etapas.setdefault(entrada['etapa'], {'entradas': 0, 'bytes': 0})
+            etapa['entradas'] += 1
+            etapa['bytes'] += entrada['bytes']
+        return {'pasta': str(self.pasta), 'limite_mb': self.limite_mb, 'entradas': len(entradas),
+                'bytes': sum(e['bytes'] for e in entradas), 'etapas': etapas}
+
+    def _remover(self, entradas):
+        for entrada in entradas:
+            shutil.rmtree(entrada['pasta'], ignore_errors=True)
+        return len(entradas), sum(e['bytes'] for e in entradas)
+
+    def despejar(self, limite_mb=None):
+        """Remove as entradas usadas há mais tempo até o total caber no limite. Retorna (entradas, bytes) removidos."""
+        limite = (self.limite_mb if limite_mb is None else limite_mb) * 1024 * 1024
+        entradas = self.entradas()
+        total = sum(e['bytes'] for e in entradas)
+        remover = []
+        for entrada in entradas:
+            if total <= limite:
+                break
+            remover.append(entrada)
+            total -= entrada['bytes']
+        return self._remover(remover)
+
+    def limpar(self, etapa=None):
+        """Remove todas as entradas (ou só as de `etapa`) e temporários esquecidos. Retorna (entradas, bytes) removidos."""
+        removidas = self._remover([e for e in self.entradas() if etapa is None or e['etapa'] == etapa])
+        if self.pasta.is_dir():
+            # Temporários de uma execução interrompida no meio do `guardar`
+            for temporario in self.pasta.glob(f'{PREFIXO_TEMPORARIO}*'):
+                if time.time() - temporario.stat().st_mtime > 3600:
+                    shutil.rmtree(temporario, ignore_errors=True)
+        return removidas
+
+
+def _mb(quantidade):
+    return f"{quantidade / (1024 * 1024):.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mostra ou limpa o cache das saídas das etapas do ETL")
+    parser.add_argument('--pasta', default=str(PASTA_PADRAO), help=f"pasta do cache (padrão: {PASTA_PADRAO})")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('resumo', help="entradas e tamanho por etapa")
+    listar = comandos.add_parser('listar', help="uma linha por entrada, das usadas há mais tempo às mais recentes")
+    listar.add_argument('--etapa', help="só as entradas desta etapa")
+    limpar = comandos.add_parser('limpar', help="remove entradas")
+    limpar.add_argument('--etapa', help="só as entradas desta etapa")
+    limpar.add_argument('--ate-mb', type=float, default=None,
+                        help="remove só as usadas há mais tempo, até o cache caber em N MB")
+    args = parser.parse_args(argv)
+
+    cache = CacheEtapas(args.pasta)
+    if args.comando == 'resumo':
+        resumo = cache.resumo()
+        print(f"{resumo['pasta']}: {resumo['entradas']} entradas, {_mb(resumo['bytes'])} (limite padrão {resumo['limite_mb']} MB)")
+        for etapa, dados in sorted(resumo['etapas'].items()):
+            print(f"  {etapa:<10} {dados['entradas']:>6} entradas  {_mb(dados['bytes']):>10}")
+    elif args.comando == 'listar':
+        for entrada in cache.entradas():
+            if args.etapa and entrada['etapa'] != args.etapa:
+                continue
+            usada = datetime.fromtimestamp(entrada['usada']).strftime('%d/%m/%Y %H:%M')
+            print(f"{entrada['chave'][:12]}  {entrada['etapa']:<10} {usada}  {_mb(entrada['bytes']):>10}  "
+                  f"{', '.join(entrada['arquivos'])}")
+    else:
+        if args.ate_mb is not None:
+            if args.etapa:
+                parser.error("--ate-mb vale para o cache todo, sem --etapa")
+            quantidade, total = cache.despejar(args.ate_mb)
+        else:
+            quantidade, total = cache.limpar(args.etapa)
+        print(f"Removidas {quantidade} entradas ({_mb(total)})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Entrega dos arquivos de uma etapa para a pasta de entrada da seguinte.
+
+Modos:
+- 'direto': nada é copiado; a etapa seguinte lê da pasta de origem;
+- 'link': hardlink de cada arquivo (sem duplicar bytes no disco); se o
+  sistema de arquivos não permitir, symlink; em último caso, cópia;
+- 'copia': cópia completa (comportamento antigo).
+
+A vazão das cópias de verdade fica registrada em `arquivo_estatisticas` e é
+usada para estimar o tempo economizado quando nada é copiado.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+
+MODOS_ENTREGA = ('direto', 'link', 'copia')
+
+
+class ResultadoEntrega:
+    def __init__(self, modo, pasta):
+        self.modo = modo
+        self.pasta = pasta
+        self.arquivos = 0
+        self.bytes_copiados = 0
+        self.bytes_evitados = 0
+        self.hardlinks = 0
+        self.symlinks = 0
+        self.copias = 0
+        self.segundos = 0.0
+        self.segundos_copia = 0.0
+
+
+def _vincular(origem, destino, resultado):
+    try:
+        os.link(origem, destino)
+        resultado.hardlinks += 1
+        return True
+    except OSError:
+        pass
+    try:
+        os.symlink(os.path.abspath(origem), destino)
+        resultado.symlinks += 1
+        return True
+    except OSError:
+        return False
+
+
+def _ler_vazao(arquivo_estatisticas):
+    try:
+        with open(arquivo_estatisticas, 'r', encoding='utf-8') as f:
+            return json.load(f).get('bytes_por_segundo')
+    except (OSError, ValueError):
+        return None
+
+
+def _salvar_vazao(arquivo_estatisticas, bytes_por_segundo):
+    try:
+        with open(arquivo_estatisticas, 'w', encoding='utf-8') as f:
+            json.dump({'bytes_por_segundo': bytes_por_segundo}, f)
+    except OSError as e:
+        logging.warning(f"Não foi possível salvar {arquivo_estatisticas}: {e}")
+
+
+def entregar_arquivos(origem, destino, modo='link', extensao='.json', arquivo_estatisticas=None, nomes=None):
+    """Disponibiliza os arquivos `extensao` de `origem` e retorna um ResultadoEntrega.
+
+    `resultado.pasta` é a pasta de onde a próxima etapa deve ler: a própria
+    origem no modo 'direto', senão `destino` (que é esvaziado antes). Com
+    `nomes`, só esses arquivos são entregues e o resto de `destino` fica.
+    """
+    if modo not in MODOS_ENTREGA:
+        raise ValueError(f"Modo de entrega inválido: {modo!r} (use {', '.join(MODOS_ENTREGA)})")
+
+    inicio = time.perf_counter()
+    if nomes is None:
+        arquivos = sorted(f for f in os.listdir(origem) if f.endswith(extensao))
+    else:
+        arquivos = sorted(nomes)
+    resultado = ResultadoEntrega(modo, origem if modo == 'direto' else destino)
+    resultado.arquivos = len(arquivos)
+
+    if modo == 'direto':
+        resultado.bytes_evitados = sum(os.path.getsize(os.path.join(origem, f)) for f in arquivos)
+    else:
+        os.makedirs(destino, exist_ok=True)
+        if nomes is None:
+            for nome in os.listdir(destino):
+                caminho = os.path.join(destino, nome)
+                if os.path.isfile(caminho) or os.path.islink(caminho):
+                    os.unlink(caminho)
+
+        for nome in arquivos:
+            src = os.path.join(origem, nome)
+            dst = os.path.join(destino, nome)
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            tamanho = os.path.getsize(src)
+            if modo == 'link' and _vincular(src, dst, resultado):
+                resultado.bytes_evitados += tamanho
+                continue
+            inicio_copia = time.perf_counter()
+            shutil.copy2(src, dst)
+            resultado.segundos_copia += time.perf_counter() - inicio_copia
+            resultado.bytes_copiados += tamanho
+            resultado.copias += 1
+
+    resultado.segundos = time.perf_counter() - inicio
+
+    if arquivo_estatisticas and resultado.bytes_copiados and resultado.segundos_copia > 0:
+        _salvar_vazao(arquivo_estatisticas, resultado.bytes_copiados / resultado.segundos_copia)
+
+    return resultado
+
+
+def registrar_entrega(resultado, arquivo_estatisticas=None):
+    """Escreve no log os bytes copiados e o tempo economizado com a entrega."""
+    mb = 1024 * 1024
+    detalhes = []
+    if resultado.hardlinks:
+        detalhes.append(f"{resultado.hardlinks} hardlinks")
+    if resultado.symlinks:
+        detalhes.append(f"{resultado.symlinks} symlinks")
+    if resultado.copias:
+        detalhes.append(f"{resultado.copias} cópias")
+    detalhes = f" ({', '.join(detalhes)})" if detalhes else ""
+
+    logging.info(
+        f"Entrega '{resultado.modo}' de {resultado.arquivos} arquivos para {resultado.pasta}{detalhes}: "
+        f"{resultado.bytes_copiados / mb:.1f} MB copiados, {resultado.bytes_evitados / mb:.1f} MB sem cópia, "
+        f"{resultado.segundos:.2f} s"
+    )
+
+    if resultado.bytes_evitados:
+        vazao = _ler_vazao(arquivo_estatisticas) if arquivo_estatisticas else None
+        if vazao:
+            economizado = max(resultado.bytes_evitados / vazao - resultado.segundos, 0)
+            logging.info(f"Tempo economizado (estimado pela última cópia medida): {economizado:.2f} s")
+        else:
+            logging.info("Tempo economizado: sem cópia medida ainda para estimar")
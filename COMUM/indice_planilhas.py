@@ -0,0 +1,218 @@
+"""Índice de metadados das planilhas: abas, dimensões, candidatas a cabeçalho e primeiras linhas.
+
+Lê a planilha uma vez só, em streaming (openpyxl read_only), parando nas
+primeiras `linhas_amostra` linhas de cada aba, sem carregar as abas inteiras
+como fazem o pd.ExcelFile e o XLSX.read do navegador. O resultado fica em
+cache, um JSON por hash do conteúdo em `pasta_cache`, e o hash de cada
+caminho só é recalculado quando o tamanho ou a data de modificação mudam.
+
+    indice = IndicePlanilhas('MOTOR/cache/indice_planilhas')
+    info = indice.indexar('MOTOR/planilhas/Fornecedor.xlsx')
+    [aba['nome'] for aba in info['abas']]
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time
+
+VERSAO = 1
+LINHAS_AMOSTRA = 20
+MAX_CABECALHOS = 3
+EXTENSOES_OPENPYXL = ('.xlsx', '.xlsm')
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _gravar_json(caminho, dados):
+    # Temporário com nome único: conversores em paralelo e threads da API gravam na mesma pasta
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def _valor(valor):
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    if isinstance(valor, float):
+        return None if valor != valor else valor
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _letra_coluna(indice):
+    letras = ''
+    while indice >= 0:
+        indice, resto = divmod(indice, 26)
+        letras = chr(65 + resto) + letras
+        indice -= 1
+    return letras
+
+
+def _eh_texto(valor):
+    if not isinstance(valor, str) or not valor.strip():
+        return False
+    try:
+        float(valor.replace(',', '.'))
+        return False
+    except ValueError:
+        return True
+
+
+def _linha(valores):
+    linha = [_valor(v) for v in valores]
+    while linha and linha[-1] in (None, ''):
+        linha.pop()
+    return linha
+
+
+def candidatas_cabecalho(amostra):
+    """Linhas da amostra com cara de cabeçalho: ao menos 2 células, quase todas texto."""
+    candidatas = []
+    for numero, linha in enumerate(amostra, start=1):
+        preenchidas = [(i, v) for i, v in enumerate(linha) if v not in (None, '')]
+        textos = sum(1 for _, v in preenchidas if _eh_texto(v))
+        if textos < 2 or textos < 0.8 * len(preenchidas):
+            continue
+        primeira = preenchidas[0][0]
+        candidatas.append({
+            'linha': numero,
+            'celula': f"{_letra_coluna(primeira)}{numero}",
+            'colunas': textos,
+            'valores': linha[primeira:],
+        })
+    candidatas.sort(key=lambda c: (-c['colunas'], c['linha']))
+    return candidatas[:MAX_CABECALHOS]
+
+
+def _abas_openpyxl(fonte, linhas_amostra):
+    import openpyxl
+
+    planilha = openpyxl.load_workbook(fonte, read_only=True, data_only=True, keep_links=False)
+    try:
+        abas = []
+        # Só as worksheets, como pd.ExcelFile.sheet_names (o pageIndex das configs conta assim)
+        for indice, aba in enumerate(planilha.worksheets):
+            # max_row/max_column vêm da tag <dimension>; sem ela ficam None (contar exigiria ler tudo)
+            linhas, colunas = aba.max_row, aba.max_column
+            abas.append({
+                'nome': aba.title, 'indice': indice, 'visivel': aba.sheet_state == 'visible',
+                'dimensao': f"A1:{_letra_coluna(colunas - 1)}{linhas}" if linhas and colunas else None,
+                'linhas': linhas, 'colunas': colunas,
+                'amostra': [_linha(linha) for linha in aba.iter_rows(max_row=linhas_amostra, values_only=True)],
+            })
+        return abas
+    finally:
+        planilha.close()
+
+
+def _abas_pandas(fonte, linhas_amostra):
+    # .xls e outros formatos que o openpyxl não lê (xlrd via pandas)
+    import pandas as pd
+
+    with pd.ExcelFile(fonte) as xls:
+        abas = []
+        for indice, nome in enumerate(xls.sheet_names):
+            df = xls.parse(nome, header=None, nrows=linhas_amostra)
+            try:
+                folha = xls.book.sheet_by_name(nome)
+                linhas, colunas = folha.nrows, folha.ncols
+            except AttributeError:
+                linhas = colunas = None
+            abas.append({
+                'nome': nome, 'indice': indice, 'visivel': True,
+                'dimensao': f"A1:{_letra_coluna(colunas - 1)}{linhas}" if linhas and colunas else None,
+                'linhas': linhas, 'colunas': colunas,
+                'amostra': [_linha(linha) for linha in df.itertuples(index=False, name=None)],
+            })
+        return abas
+
+
+class IndicePlanilhas:
+    def __init__(self, pasta_cache, linhas_amostra=LINHAS_AMOSTRA):
+        self.pasta_cache = str(pasta_cache)
+        self.linhas_amostra = linhas_amostra
+        self._arquivo_hashes = os.path.join(self.pasta_cache, 'arquivos.json')
+        self._hashes = None
+        self._trava = threading.Lock()
+        os.makedirs(self.pasta_cache, exist_ok=True)
+
+    def _hash_caminho(self, caminho):
+        """Hash do conteúdo, recalculado só quando tamanho ou data de modificação mudam."""
+        caminho = os.path.abspath(caminho)
+        info = os.stat(caminho)
+        with self._trava:
+            if self._hashes is None:
+                try:
+                    with open(self._arquivo_hashes, 'r', encoding='utf-8') as f:
+                        self._hashes = json.load(f)
+                except (OSError, ValueError):
+                    self._hashes = {}
+            anterior = self._hashes.get(caminho)
+        if anterior and anterior[0] == info.st_size and anterior[1] == info.st_mtime_ns:
+            return anterior[2]
+
+        h = hash_arquivo(caminho)
+        with self._trava:
+            self._hashes[caminho] = [info.st_size, info.st_mtime_ns, h]
+            _gravar_json(self._arquivo_hashes, self._hashes)
+        return h
+
+    def _caminho_indice(self, h):
+        return os.path.join(self.pasta_cache, f"{h}.json")
+
+    def buscar(self, h):
+        """Índice já calculado para o hash, ou None."""
+        try:
+            with open(self._caminho_indice(h), 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if indice.get('versao') != VERSAO or indice.get('linhas_amostra', 0) < self.linhas_amostra:
+            return None
+        return indice
+
+    def _montar(self, h, nome, tamanho, abrir):
+        indice = self.buscar(h)
+        if indice is not None:
+            # Mesmo conteúdo com outro nome
+            return dict(indice, arquivo=nome)
+
+        extrair = _abas_openpyxl if nome.lower().endswith(EXTENSOES_OPENPYXL) else _abas_pandas
+        abas = extrair(abrir(), self.linhas_amostra)
+        for aba in abas:
+            aba['cabecalhos'] = candidatas_cabecalho(aba['amostra'])
+        indice = {'versao': VERSAO, 'hash': h, 'arquivo': nome, 'bytes': tamanho,
+                  'linhas_amostra': self.linhas_amostra, 'abas': abas}
+        _gravar_json(self._caminho_indice(h), indice)
+        return indice
+
+    def indexar(self, caminho):
+        caminho = str(caminho)
+        h = self._hash_caminho(caminho)
+        return self._montar(h, os.path.basename(caminho), os.path.getsize(caminho), lambda: caminho)
+
+    def indexar_conteudo(self, conteudo, nome):
+        """Como indexar, para uma planilha recebida em memória (upload da interface)."""
+        return self._montar(hash_conteudo(conteudo), nome, len(conteudo), lambda: io.BytesIO(conteudo))
+
+    def nomes_abas(self, caminho):
+        return [aba['nome'] for aba in self.indexar(caminho)['abas']]
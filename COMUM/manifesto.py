@@ -0,0 +1,135 @@
+"""Manifesto de cada execução do pipeline: linhas por arquivo e etapa, do Excel à planilha final.
+
+Montado com as contagens que as etapas registram em COMUM/metricas.py
+enquanto processam (nenhum dado é relido). Para cada arquivo gerado:
+
+    linhas_entrada   registros lidos (no mesclador, os de custo, o lado esquerdo do join)
+    descartadas      por motivo: cabecalho (registro_eh_header), sem_par (inner join),
+                     sem_preco (_filtrar_produtos_invalidos)
+    expandidas       linhas a mais criadas (uma por cor no mesclador, produto
+                     cartesiano no separador)
+    linhas_saida     registros gravados
+    do_cache         1 quando a saída veio do cache das etapas (contagens da vez em que foi gerada)
+
+e `confere` diz se entrada + expandidas - descartadas = saída. `origens` liga
+cada arquivo aos de entrada da etapa, então dá para seguir um TXT até a
+planilha final. Tarefas em dia não rodam; os arquivos delas vêm do manifesto
+anterior, com a situação 'em dia' (ou 'anterior', se a execução parou antes).
+"""
+import json
+import os
+import tempfile
+
+VERSAO = 1
+CONTADORES = ('linhas_entrada', 'expandidas', 'linhas_saida')
+PREFIXO_DESCARTE = 'descartadas_'
+
+
+def ler_manifesto(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifesto if manifesto.get('versao') == VERSAO else None
+
+
+def gravar_manifesto(caminho, manifesto):
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def _tarefa_do_arquivo(etapa, arquivo, saidas):
+    """Tarefa da etapa que gravou `arquivo`; o tradutor conta pelo nome sem extensão."""
+    da_etapa = [tarefa for tarefa in saidas if tarefa.split(':', 1)[0] == etapa]
+    for tarefa in da_etapa:
+        for caminho in saidas[tarefa]:
+            nome = os.path.basename(caminho)
+            if arquivo in (nome, os.path.splitext(nome)[0]):
+                return tarefa
+    # Arquivo sem saída gravada (tudo descartado) em uma etapa de tarefa única, como o tradutor
+    return da_etapa[0] if len(da_etapa) == 1 else None
+
+
+def _linha_arquivo(medidas, tarefa, situacao):
+    contadores = medidas['contadores']
+    descartadas = {nome[len(PREFIXO_DESCARTE):]: quantidade for nome, quantidade in contadores.items()
+                   if nome.startswith(PREFIXO_DESCARTE)}
+    linha = {
+        'etapa': medidas['etapa'],
+        'arquivo': medidas['arquivo'],
+        'tarefa': tarefa,
+        'situacao': situacao,
+        'origens': medidas.get('origens', []),
+        'linhas_entrada': contadores.get('linhas_entrada'),
+        'descartadas': descartadas,
+        'expandidas': contadores.get('expandidas', 0),
+        # Arquivo todo descartado (ex.: nenhum produto com preço) não chega a ser gravado
+        'linhas_saida': contadores.get('linhas_saida', 0 if 'linhas_entrada' in contadores else None),
+        'segundos': round(sum(t['segundos'] for t in medidas['trechos'].values()), 4),
+    }
+    # Contadores próprios de uma etapa (linhas_venda do mesclador)
+    linha.update({nome: quantidade for nome, quantidade in contadores.items()
+                  if nome not in CONTADORES and not nome.startswith(PREFIXO_DESCARTE)})
+    if linha['linhas_entrada'] is not None and linha['linhas_saida'] is not None:
+        linha['confere'] = (linha['linhas_entrada'] + linha['expandidas'] - sum(descartadas.values())
+                            == linha['linhas_saida'])
+    return linha
+
+
+def montar_manifesto(resumo, situacoes, saidas, anterior=None, **dados):
+    """Manifesto a partir do `resumo()` de um Metricas.
+
+    `situacoes` é {tarefa: 'executada' | 'em dia'} desta execução e `saidas`
+    {tarefa: [arquivos]} de todas as tarefas do grafo; tarefas que não rodaram
+    agora herdam os arquivos do manifesto `anterior`. `dados` vai para o topo
+    (situação da execução, prévia, ...).
+    """
+    arquivos = []
+    for medidas in resumo['arquivos']:
+        tarefa = _tarefa_do_arquivo(medidas['etapa'], medidas['arquivo'], saidas)
+        arquivos.append(_linha_arquivo(medidas, tarefa, 'executada'))
+
+    executadas = {tarefa for tarefa, situacao in situacoes.items() if situacao == 'executada'}
+    for linha in (anterior or {}).get('arquivos', []):
+        if linha.get('tarefa') in saidas and linha['tarefa'] not in executadas:
+            # 'anterior': a tarefa nem chegou a rodar nesta execução (erro antes dela)
+            arquivos.append({**linha, 'situacao': situacoes.get(linha['tarefa'], 'anterior')})
+
+    etapas = {}
+    for linha in arquivos:
+        etapa = etapas.setdefault(linha['etapa'], {
+            'tarefas_executadas': 0, 'tarefas_em_dia': 0, 'segundos': 0.0, 'arquivos': 0,
+            'linhas_entrada': 0, 'descartadas': {}, 'expandidas': 0, 'linhas_saida': 0,
+        })
+        etapa['arquivos'] += 1
+        etapa['linhas_entrada'] += linha['linhas_entrada'] or 0
+        etapa['expandidas'] += linha['expandidas']
+        etapa['linhas_saida'] += linha['linhas_saida'] or 0
+        for motivo, quantidade in linha['descartadas'].items():
+            etapa['descartadas'][motivo] = etapa['descartadas'].get(motivo, 0) + quantidade
+    for tarefa, situacao in situacoes.items():
+        etapa = etapas.get(tarefa.split(':', 1)[0])
+        if etapa is not None:
+            etapa['tarefas_executadas' if situacao == 'executada' else 'tarefas_em_dia'] += 1
+    for nome, medidas in resumo['etapas'].items():
+        if nome in etapas:
+            etapas[nome]['segundos'] = medidas['segundos']
+
+    return {
+        'versao': VERSAO,
+        'inicio': resumo['inicio'],
+        'segundos': resumo['segundos'],
+        **dados,
+        'etapas': etapas,
+        'arquivos': arquivos,
+    }
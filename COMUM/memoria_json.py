@@ -0,0 +1,58 @@
+"""JSONs intermediários do pipeline mantidos em memória entre as etapas.
+
+Cada etapa continua gravando seus JSONs em disco, mas quando roda dentro do
+pipeline_etl os dados gravados ficam guardados aqui e a etapa seguinte os usa
+direto, sem reler nem reinterpretar o arquivo. As etapas não alteram os dados
+que leem (trabalham sobre cópias), então o mesmo objeto pode ser entregue a
+mais de uma etapa.
+"""
+import json
+import os
+
+
+class MemoriaJSON:
+    def __init__(self):
+        self._dados = {}
+
+    def _chave(self, caminho):
+        return os.path.normcase(os.path.abspath(caminho))
+
+    def guardar(self, caminho, dados):
+        self._dados[self._chave(caminho)] = dados
+
+    def obter(self, caminho):
+        return self._dados.get(self._chave(caminho))
+
+    def vincular(self, destino, origem):
+        """Faz `destino` (uma cópia de `origem` em outra pasta) apontar para os mesmos dados."""
+        dados = self.obter(origem)
+        if dados is not None:
+            self.guardar(destino, dados)
+
+    def descartar(self, caminho):
+        self._dados.pop(self._chave(caminho), None)
+
+    def descartar_pasta(self, pasta):
+        """Libera os dados dos arquivos de `pasta` quando nenhuma etapa vai mais lê-los."""
+        prefixo = self._chave(pasta) + os.sep
+        for chave in [c for c in self._dados if c.startswith(prefixo)]:
+            del self._dados[chave]
+
+    def limpar(self):
+        self._dados.clear()
+
+
+def gravar_json(caminho, dados, memoria=None):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    if memoria is not None:
+        memoria.guardar(caminho, dados)
+
+
+def ler_json(caminho, memoria=None):
+    if memoria is not None:
+        dados = memoria.obter(caminho)
+        if dados is not None:
+            return dados
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
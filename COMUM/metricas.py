@@ -0,0 +1,289 @@
+"""Métricas das etapas do ETL: tempo dos trechos caros, linhas e pico de memória.
+
+As etapas marcam os trechos caros com `with trecho('leitura_excel', arquivo):`
+e informam as linhas de cada arquivo com `contar('linhas_saida', n, arquivo)`,
+uma vez por arquivo, fora dos laços por registro. Quem quer as medidas instala
+um `Metricas` com `coletar(...)`; sem coletor, `trecho` devolve sempre o
+mesmo contexto vazio e `contar` retorna na hora, então desligado o custo é o
+de uma chamada de função por arquivo.
+
+O pipeline_etl avisa o início e o fim de cada tarefa, e as medidas ficam na
+etapa da tarefa em andamento ('conversor', 'gerador', ...). As tarefas do
+modo paralelo medem em um `Metricas` próprio, que o processo principal junta
+com `incorporar(exportar())`; com o tradutor em vários processos, a correção e
+a escrita das saídas ficam de fora.
+"""
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo até agora, em MB (None sem o módulo resource)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _gravar_texto(caminho, texto):
+    # Troca atômica: o coletor do Prometheus nunca lê um arquivo pela metade
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def _rotulos(**rotulos):
+    texto = ','.join(
+        f'{nome}="' + str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for nome, valor in rotulos.items()
+    )
+    return '{' + texto + '}' if texto else ''
+
+
+class _Trecho:
+    __slots__ = ('metricas', 'chave', 'inicio')
+
+    def __init__(self, metricas, chave):
+        self.metricas = metricas
+        self.chave = chave
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.metricas.somar_trecho(self.chave, time.perf_counter() - self.inicio)
+        return False
+
+
+class Metricas:
+    def __init__(self):
+        self.inicio = datetime.now()
+        self._inicio = time.perf_counter()
+        self.segundos = None
+        self.etapa = None
+        self.tarefas = []
+        # (etapa, trecho, arquivo) -> [chamadas, segundos, maior]
+        self.trechos = {}
+        # (etapa, contador, arquivo) -> quantidade
+        self.contadores = {}
+        # (etapa, arquivo) -> arquivos de que ele foi gerado
+        self.origens = {}
+        self._inicio_tarefas = {}
+
+    def iniciar_tarefa(self, nome):
+        # 'conversor:Planilha.xlsx' -> 'conversor'
+        self.etapa = nome.split(':', 1)[0]
+        self._inicio_tarefas[nome] = time.perf_counter()
+
+    def terminar_tarefa(self, nome, situacao):
+        inicio = self._inicio_tarefas.pop(nome, None)
+        self.tarefas.append({
+            'tarefa': nome,
+            'etapa': nome.split(':', 1)[0],
+            'situacao': situacao,
+            'segundos': round(time.perf_counter() - inicio, 4) if inicio is not None else None,
+            # Pico do processo até o fim da tarefa: a tarefa que o elevou aparece como o salto
+            'pico_rss_mb': pico_rss_mb() if inicio is not None else None,
+        })
+        self.etapa = None
+
+    def somar_trecho(self, chave, segundos):
+        total = self.trechos.get(chave)
+        if total is None:
+            self.trechos[chave] = [1, segundos, segundos]
+        else:
+            total[0] += 1
+            total[1] += segundos
+            total[2] = max(total[2], segundos)
+
+    def contar(self, nome, quantidade, arquivo):
+        chave = (self.etapa, nome, arquivo)
+        self.contadores[chave] = self.contadores.get(chave, 0) + quantidade
+
+    def registrar_origem(self, arquivo, origens):
+        self.origens[(self.etapa, arquivo)] = list(origens)
+
+    def exportar(self):
+        """Medidas em forma serializável, para vir de outro processo."""
+        return {
+            'tarefas': self.tarefas,
+            'trechos': [[*chave, *valores] for chave, valores in self.trechos.items()],
+            'contadores': [[*chave, quantidade] for chave, quantidade in self.contadores.items()],
+            'origens': [[*chave, origens] for chave, origens in self.origens.items()],
+        }
+
+    def incorporar(self, dados):
+        self.tarefas.extend(dados.get('tarefas', []))
+        for etapa, nome, arquivo, chamadas, segundos, maior in dados.get('trechos', []):
+            total = self.trechos.setdefault((etapa, nome, arquivo), [0, 0.0, 0.0])
+            total[0] += chamadas
+            total[1] += segundos
+            total[2] = max(total[2], maior)
+        for etapa, nome, arquivo, quantidade in dados.get('contadores', []):
+            chave = (etapa, nome, arquivo)
+            self.contadores[chave] = self.contadores.get(chave, 0) + quantidade
+        for etapa, arquivo, origens in dados.get('origens', []):
+            self.origens[(etapa, arquivo)] = origens
+
+    def encerrar(self):
+        self.segundos = time.perf_counter() - self._inicio
+
+    def resumo(self):
+        """Dicionário com as medidas por etapa, por tarefa e por arquivo."""
+        segundos = self.segundos if self.segundos is not None else time.perf_counter() - self._inicio
+        etapas, arquivos = {}, {}
+
+        def etapa(nome):
+            return etapas.setdefault(nome, {'tarefas': 0, 'segundos': 0.0, 'pico_rss_mb': None,
+                                            'contadores': {}, 'trechos': {}})
+
+        def arquivo(nome_etapa, nome):
+            return arquivos.setdefault((nome_etapa, nome), {'etapa': nome_etapa, 'arquivo': nome, 'origens': [],
+                                                            'contadores': {}, 'trechos': {}})
+
+        for tarefa in self.tarefas:
+            if tarefa['segundos'] is None:
+                continue
+            dados = etapa(tarefa['etapa'])
+            dados['tarefas'] += 1
+            dados['segundos'] = round(dados['segundos'] + tarefa['segundos'], 4)
+            if tarefa['pico_rss_mb'] is not None:
+                dados['pico_rss_mb'] = max(dados['pico_rss_mb'] or 0, tarefa['pico_rss_mb'])
+
+        for (nome_etapa, nome, nome_arquivo), (chamadas, total, maior) in self.trechos.items():
+            trechos = etapa(nome_etapa)['trechos']
+            soma = trechos.setdefault(nome, {'chamadas': 0, 'segundos': 0.0, 'maior': 0.0})
+            soma['chamadas'] += chamadas
+            soma['segundos'] = round(soma['segundos'] + total, 4)
+            soma['maior'] = round(max(soma['maior'], maior), 4)
+            if nome_arquivo is not None:
+                arquivo(nome_etapa, nome_arquivo)['trechos'][nome] = {
+                    'chamadas': chamadas, 'segundos': round(total, 4), 'maior': round(maior, 4)
+                }
+
+        for (nome_etapa, nome, nome_arquivo), quantidade in self.contadores.items():
+            contadores = etapa(nome_etapa)['contadores']
+            contadores[nome] = contadores.get(nome, 0) + quantidade
+            if nome_arquivo is not None:
+                arquivo(nome_etapa, nome_arquivo)['contadores'][nome] = quantidade
+
+        for (nome_etapa, nome_arquivo), origens in self.origens.items():
+            arquivo(nome_etapa, nome_arquivo)['origens'] = origens
+
+        return {
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'segundos': round(segundos, 4),
+            'pico_rss_mb': pico_rss_mb(),
+            'etapas': etapas,
+            'tarefas': self.tarefas,
+            'arquivos': list(arquivos.values()),
+        }
+
+    def gravar_json(self, caminho):
+        _gravar_texto(caminho, json.dumps(self.resumo(), ensure_ascii=False, indent=2) + '\n')
+
+    def gravar_prometheus(self, caminho):
+        """Formato texto do Prometheus, para o textfile collector do node_exporter."""
+        resumo = self.resumo()
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in amostras:
+                linhas.append(f"{nome}{_rotulos(**rotulos)} {valor}")
+
+        metrica('etl_execucao_segundos', 'gauge', "Duração da última execução do pipeline", [({}, resumo['segundos'])])
+        metrica('etl_execucao_timestamp_segundos', 'gauge', "Início da última execução (epoch)",
+                [({}, round(self.inicio.timestamp(), 3))])
+        if resumo['pico_rss_mb'] is not None:
+            metrica('etl_pico_rss_bytes', 'gauge', "Pico de memória residente do processo",
+                    [({}, int(resumo['pico_rss_mb'] * 1024 * 1024))])
+        etapas = resumo['etapas']
+        metrica('etl_etapa_segundos', 'gauge', "Tempo das tarefas executadas de cada etapa",
+                [({'etapa': nome}, dados['segundos']) for nome, dados in etapas.items()])
+        metrica('etl_etapa_tarefas', 'gauge', "Tarefas executadas de cada etapa",
+                [({'etapa': nome}, dados['tarefas']) for nome, dados in etapas.items()])
+        metrica('etl_contagem', 'gauge', "Contadores das etapas (linhas de entrada, de saída, ...)",
+                [({'etapa': nome, 'contador': contador}, quantidade)
+                 for nome, dados in etapas.items() for contador, quantidade in dados['contadores'].items()])
+        metrica('etl_trecho_segundos', 'gauge', "Tempo somado de cada trecho medido",
+                [({'etapa': nome, 'trecho': trecho}, soma['segundos'])
+                 for nome, dados in etapas.items() for trecho, soma in dados['trechos'].items()])
+        metrica('etl_trecho_chamadas', 'gauge', "Vezes que cada trecho medido rodou",
+                [({'etapa': nome, 'trecho': trecho}, soma['chamadas'])
+                 for nome, dados in etapas.items() for trecho, soma in dados['trechos'].items()])
+        _gravar_texto(caminho, '\n'.join(linhas) + '\n')
+
+
+_atual = None
+_VAZIO = contextlib.nullcontext()
+# Lista que recebe as contagens e origens do bloco em `gravar_contagens`
+_gravadas = None
+
+
+def coletar(metricas):
+    """Passa a registrar as medidas das etapas em `metricas` (None para parar)."""
+    global _atual
+    _atual = metricas
+
+
+def trecho(nome, arquivo=None):
+    """Contexto que soma o tempo do bloco ao trecho `nome` da etapa em andamento."""
+    if _atual is None:
+        return _VAZIO
+    return _Trecho(_atual, (_atual.etapa, nome, arquivo))
+
+
+def contar(nome, quantidade=1, arquivo=None):
+    if _atual is not None:
+        _atual.contar(nome, quantidade, arquivo)
+    if _gravadas is not None:
+        _gravadas.append(['contar', nome, quantidade, arquivo])
+
+
+def origem(arquivo, *origens):
+    """Registra de quais arquivos de entrada `arquivo` foi gerado."""
+    if _atual is not None:
+        _atual.registrar_origem(arquivo, origens)
+    if _gravadas is not None:
+        _gravadas.append(['origem', arquivo, list(origens)])
+
+
+@contextlib.contextmanager
+def gravar_contagens():
+    """Guarda em uma lista as contagens e origens registradas no bloco, para
+    `repetir` quando o resultado vier do cache das etapas."""
+    global _gravadas
+    anterior, _gravadas = _gravadas, []
+    try:
+        yield _gravadas
+    finally:
+        _gravadas = anterior
+
+
+def repetir(gravadas):
+    for tipo, *argumentos in gravadas:
+        if tipo == 'contar':
+            contar(*argumentos)
+        else:
+            origem(argumentos[0], *argumentos[1])
@@ -0,0 +1,159 @@
+"""Perfil das funções mais pesadas do ETL (cProfile e, opcionalmente, tracemalloc), ligado sob demanda.
+
+As funções marcadas com `@perfilado()` (ou `@perfilado('gerador')`, nas
+entradas das etapas) só passam pelo cProfile quando há um `Perfil` instalado
+com `perfilar(...)` e o alvo delas foi escolhido; do contrário a marcação custa
+uma chamada a mais. Pelo ambiente:
+
+    ETL_PERFIL=1                                  # as funções de ALVOS_PADRAO
+    ETL_PERFIL=mesclar_dados,tradutor             # alvos escolhidos
+    ETL_PERFIL_MEMORIA=1                          # também o pico de memória (tracemalloc)
+
+Só um alvo é medido de cada vez: dentro de uma etapa perfilada inteira, as
+funções dela entram no perfil da etapa. O perfil vale só para o processo
+principal; tarefas do --paralelo e arquivos do tradutor em outros processos
+ficam de fora.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+
+ETAPAS = ('conversor', 'gerador', 'mesclador', 'separador', 'tradutor')
+ALVOS_PADRAO = ('processar_arquivo_txt', 'mesclar_dados', 'gerar_produto_cartesiano', '_corrigir_valores')
+ALVOS = ETAPAS + ALVOS_PADRAO
+
+
+def ler_alvos(texto):
+    """'1' ou '' -> ALVOS_PADRAO; 'mesclar_dados,tradutor' -> os alvos. ValueError para nomes desconhecidos."""
+    nomes = [nome.strip() for nome in str(texto).split(',') if nome.strip()]
+    if not nomes or nomes in (['1'], ['padrao']):
+        return ALVOS_PADRAO
+    desconhecidos = [nome for nome in nomes if nome not in ALVOS]
+    if desconhecidos:
+        raise ValueError(f"alvos de perfil desconhecidos: {', '.join(desconhecidos)} (use {', '.join(ALVOS)})")
+    return tuple(nomes)
+
+
+def configuracao_ambiente():
+    """(alvos, memoria) de ETL_PERFIL e ETL_PERFIL_MEMORIA; alvos None quando o perfil está desligado."""
+    valor = os.environ.get('ETL_PERFIL', '').strip()
+    memoria = os.environ.get('ETL_PERFIL_MEMORIA', '').strip() not in ('', '0')
+    if valor in ('', '0'):
+        return None, memoria
+    return ler_alvos(valor), memoria
+
+
+class Perfil:
+    def __init__(self, alvos=ALVOS_PADRAO, memoria=False, linhas=25):
+        self.alvos = set(alvos)
+        self.memoria = memoria
+        self.linhas = linhas
+        self.inicio = datetime.now()
+        self.perfis = {}
+        # alvo -> [chamadas, segundos, maior pico de memória em bytes]
+        self.totais = {}
+        # alvo -> snapshot do tracemalloc no fim da chamada com o maior pico
+        self.retratos = {}
+        self._ativo = None
+        self._parar_tracemalloc = False
+
+    def iniciar(self):
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._parar_tracemalloc = True
+
+    def parar(self):
+        if self._parar_tracemalloc:
+            tracemalloc.stop()
+            self._parar_tracemalloc = False
+
+    def executar(self, alvo, funcao, args, kwargs):
+        if alvo not in self.alvos or self._ativo is not None:
+            return funcao(*args, **kwargs)
+
+        perfil = self.perfis.get(alvo)
+        if perfil is None:
+            perfil = self.perfis[alvo] = cProfile.Profile()
+        memoria = self.memoria and tracemalloc.is_tracing()
+        if memoria:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+        self._ativo = alvo
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            perfil.disable()
+            segundos = time.perf_counter() - inicio
+            self._ativo = None
+            total = self.totais.setdefault(alvo, [0, 0.0, None])
+            total[0] += 1
+            total[1] += segundos
+            if memoria:
+                pico = tracemalloc.get_traced_memory()[1] - antes
+                if total[2] is None or pico > total[2]:
+                    total[2] = pico
+                    self.retratos[alvo] = tracemalloc.take_snapshot()
+
+    def _estatisticas(self, alvo, ordem):
+        texto = io.StringIO()
+        pstats.Stats(self.perfis[alvo], stream=texto).strip_dirs().sort_stats(ordem).print_stats(self.linhas)
+        return texto.getvalue().strip('\n')
+
+    def gravar(self, pasta):
+        """Grava perfil_<data>_<alvo>.prof (abre com pstats ou snakeviz) e o resumo perfil_<data>.txt.
+        Retorna os arquivos gravados."""
+        os.makedirs(pasta, exist_ok=True)
+        prefixo = os.path.join(pasta, f"perfil_{self.inicio:%Y%m%d_%H%M%S}")
+        arquivos = []
+        for alvo, perfil in self.perfis.items():
+            perfil.dump_stats(f"{prefixo}_{alvo}.prof")
+            arquivos.append(f"{prefixo}_{alvo}.prof")
+
+        linhas = [f"Perfil da execução de {self.inicio:%d/%m/%Y %H:%M:%S}", ""]
+        for alvo, (chamadas, segundos, pico) in sorted(self.totais.items(), key=lambda item: -item[1][1]):
+            memoria = f", pico de {pico / (1024 * 1024):.1f} MB" if pico is not None else ""
+            linhas.append(f"{alvo}: {chamadas} chamadas, {segundos:.3f} s{memoria}")
+        if not self.totais:
+            linhas.append("Nenhum alvo do perfil rodou nesta execução")
+
+        for alvo in self.perfis:
+            linhas += ["", f"== {alvo}: tempo próprio ==", self._estatisticas(alvo, 'tottime'),
+                       "", f"== {alvo}: tempo acumulado ==", self._estatisticas(alvo, 'cumulative')]
+        for alvo, retrato in self.retratos.items():
+            linhas += ["", f"== {alvo}: memória alocada no fim da chamada de maior pico =="]
+            linhas += [str(estatistica) for estatistica in retrato.statistics('lineno')[:self.linhas]]
+
+        with open(f"{prefixo}.txt", 'w', encoding='utf-8') as f:
+            f.write('\n'.join(linhas) + '\n')
+        arquivos.append(f"{prefixo}.txt")
+        return arquivos
+
+
+_atual = None
+
+
+def perfilar(perfil):
+    """Passa a medir os alvos de `perfil` (None para parar)."""
+    global _atual
+    _atual = perfil
+
+
+def perfilado(alvo=None):
+    """Marca uma função como alvo do perfil; o nome do alvo é o da função quando não informado."""
+    def decorador(funcao):
+        nome = alvo or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _atual is None:
+                return funcao(*args, **kwargs)
+            return _atual.executar(nome, funcao, args, kwargs)
+        return envolvida
+    return decorador
@@ -0,0 +1,114 @@
+"""Conversão vetorizada de preços no padrão brasileiro.
+
+Usado pelo mescladorJSON e pelo tradutor_final para que os dois interpretem
+"1.234,56", "R$ 10,00", ",5" etc. da mesma forma. Os valores são convertidos
+para centavos inteiros (Int64), evitando erros de arredondamento de float.
+"""
+import numpy as np
+import pandas as pd
+
+# Acima disso o valor não cabe em int64 como centavos; tratado como inválido
+MAX_DIGITOS_INTEIROS = 15
+
+
+def _como_serie(valores):
+    if isinstance(valores, pd.Series):
+        return valores
+    return pd.Series(list(valores), dtype=object)
+
+
+def converter_para_centavos(valores):
+    """Converte uma coluna de preços em centavos (Series Int64, <NA> quando inválido).
+
+    Regras:
+    - remove espaços (inclusive NBSP e caracteres de largura zero), símbolo de
+      moeda e qualquer caractere que não seja dígito, ponto ou vírgula;
+    - uma única vírgula é o separador decimal e os pontos são de milhar
+      ("1.234,56" -> 123456);
+    - sem vírgula, um único ponto é o separador decimal ("1234.56") e vários
+      pontos são de milhar ("1.234.567");
+    - mais de uma vírgula é inválido;
+    - vírgula inicial vale como zero (",5" -> 50);
+    - casas além da segunda são arredondadas meio para cima.
+
+    Cada valor distinto é convertido uma única vez; catálogos repetem muito os
+    mesmos preços entre cores e variações.
+    """
+    serie = _como_serie(valores)
+    codigos, unicos = pd.factorize(serie.astype(object), use_na_sentinel=True)
+
+    centavos_unicos = _converter_unicos(pd.Series(unicos, dtype=object).astype(str))
+    centavos_unicos = np.append(centavos_unicos, _SEM_VALOR)
+
+    # codigo -1 (nulo) aponta para o _SEM_VALOR acrescentado no fim
+    centavos = centavos_unicos[codigos]
+    return pd.Series(
+        pd.arrays.IntegerArray(centavos, centavos == _SEM_VALOR),
+        index=serie.index,
+    )
+
+
+# Marcador interno para "sem valor" antes de virar <NA>
+_SEM_VALOR = np.iinfo(np.int64).min
+
+
+def _converter_unicos(texto):
+    texto = texto.str.replace(r'[^0-9.,]', '', regex=True)
+
+    virgulas = texto.str.count(',')
+    pontos = texto.str.count(r'\.')
+
+    remover_pontos = (virgulas == 1) | ((virgulas == 0) & (pontos > 1))
+    texto = texto.where(~remover_pontos, texto.str.replace('.', '', regex=False))
+    texto = texto.where(virgulas > 1, texto.str.replace(',', '.', regex=False))
+
+    partes = texto.str.extract(r'^(\d*)(?:\.(\d*))?$')
+    inteiros = partes[0]
+    fracoes = partes[1].fillna('')
+
+    validos = (
+        inteiros.notna()
+        & ((inteiros.str.len() > 0) | (fracoes.str.len() > 0))
+        & (inteiros.str.len() <= MAX_DIGITOS_INTEIROS)
+    ).to_numpy(dtype=bool)
+
+    centavos = np.full(len(texto), _SEM_VALOR, dtype=np.int64)
+    if not validos.any():
+        return centavos
+
+    inteiros = inteiros[validos].replace('', '0')
+    fracoes = fracoes[validos].str.ljust(3, '0')
+
+    reais = inteiros.astype(np.int64).to_numpy()
+    casas = fracoes.str[:2].astype(np.int64).to_numpy()
+    arredonda = (fracoes.str[2].astype(np.int64) >= 5).to_numpy()
+
+    centavos[validos] = reais * 100 + casas + arredonda
+    return centavos
+
+
+def _formatar_centavos(centavos, separador_decimal, separador_milhar):
+    resultado = np.full(len(centavos), None, dtype=object)
+    presentes = centavos.notna().to_numpy(dtype=bool)
+    if not presentes.any():
+        return resultado
+
+    codigos, unicos = pd.factorize(centavos[presentes].astype(np.int64).to_numpy())
+    reais = pd.Series(unicos // 100).astype(str)
+    casas = pd.Series(unicos % 100).astype(str).str.zfill(2)
+    if separador_milhar:
+        reais = reais.str.replace(r'\B(?=(\d{3})+(?!\d))', separador_milhar, regex=True)
+
+    textos = (reais + separador_decimal + casas).to_numpy(dtype=object)
+    resultado[presentes] = textos[codigos]
+    return resultado
+
+
+def formatar_centavos_brasileiro(centavos):
+    """Formata centavos como "1.234,56". Retorna array de objetos com None onde for <NA>."""
+    return _formatar_centavos(centavos, ',', '.')
+
+
+def formatar_centavos_decimal(centavos):
+    """Formata centavos como "1234.56" (formato canônico dos JSONs intermediários)."""
+    return _formatar_centavos(centavos, '.', '')
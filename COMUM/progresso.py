@@ -0,0 +1,125 @@
+"""Progresso das etapas do ETL enquanto elas rodam.
+
+As etapas avisam cada arquivo gerado com `arquivo_concluido(nome, linhas)` e
+chamam `pulso()` dentro dos laços por registro. Quem acompanha a execução
+instala um `Progresso` com `acompanhar(...)` e recebe eventos estruturados
+(tarefa, arquivos e linhas feitos, linhas por segundo) na função `destino`,
+por exemplo o `put` de uma queue.Queue lida pela interface. Sem ninguém
+acompanhando, as chamadas não fazem nada.
+
+O último sinal de vida (`parado_ha()`) serve para detectar uma execução
+travada pela falta de progresso, sem limite de tempo total; `cancelar()` faz
+a próxima chamada de `pulso()` ou `arquivo_concluido()` levantar Cancelado.
+"""
+import threading
+import time
+
+
+class Cancelado(BaseException):
+    """Execução interrompida. Deriva de BaseException para não ser engolida
+    pelos `except Exception` que pulam arquivos com erro nas etapas."""
+
+
+class EventoProgresso:
+    def __init__(self, tipo, descricao=None, numero=0, total=0, arquivo=None, linhas=0,
+                 arquivos_feitos=0, linhas_feitas=0, segundos=0.0, dados=None):
+        self.tipo = tipo  # 'tarefa', 'arquivo', 'fim_tarefa', 'concluido' ou 'erro'
+        self.descricao = descricao
+        self.numero = numero
+        self.total = total
+        self.arquivo = arquivo
+        self.linhas = linhas
+        self.arquivos_feitos = arquivos_feitos
+        self.linhas_feitas = linhas_feitas
+        self.segundos = segundos
+        self.dados = dados
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas_feitas / self.segundos if self.segundos > 0 else 0.0
+
+    def __repr__(self):
+        return f"EventoProgresso({self.tipo!r}, {self.descricao!r}, arquivos={self.arquivos_feitos}, linhas={self.linhas_feitas})"
+
+
+class Progresso:
+    def __init__(self, destino=None):
+        self.destino = destino
+        self.descricao = None
+        self.numero = 0
+        self.total = 0
+        self.arquivos_feitos = 0
+        self.linhas_feitas = 0
+        self._inicio_tarefa = time.monotonic()
+        self._ultimo_sinal = time.monotonic()
+        self._cancelado = threading.Event()
+
+    def _emitir(self, tipo, **dados):
+        evento = EventoProgresso(
+            tipo, self.descricao, self.numero, self.total,
+            arquivos_feitos=self.arquivos_feitos, linhas_feitas=self.linhas_feitas,
+            segundos=time.monotonic() - self._inicio_tarefa, **dados
+        )
+        if self.destino:
+            self.destino(evento)
+        return evento
+
+    def pulso(self):
+        self._ultimo_sinal = time.monotonic()
+        if self._cancelado.is_set():
+            raise Cancelado("Execução cancelada")
+
+    def iniciar_tarefa(self, numero, total, descricao):
+        self.pulso()
+        self.numero, self.total, self.descricao = numero, total, descricao
+        self.arquivos_feitos = self.linhas_feitas = 0
+        self._inicio_tarefa = time.monotonic()
+        self._emitir('tarefa')
+
+    def arquivo(self, nome, linhas=0):
+        self.pulso()
+        self.arquivos_feitos += 1
+        self.linhas_feitas += linhas
+        self._emitir('arquivo', arquivo=nome, linhas=linhas)
+
+    def terminar_tarefa(self, situacao):
+        self.pulso()
+        self._emitir('fim_tarefa', dados=situacao)
+
+    def concluir(self, dados=None):
+        self._ultimo_sinal = time.monotonic()
+        self._emitir('concluido', dados=dados)
+
+    def falhar(self, dados=None):
+        self._ultimo_sinal = time.monotonic()
+        self._emitir('erro', dados=dados)
+
+    def parado_ha(self):
+        """Segundos desde o último sinal de vida das etapas."""
+        return time.monotonic() - self._ultimo_sinal
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+
+_atual = None
+
+
+def acompanhar(progresso):
+    """Passa a enviar o progresso das etapas para `progresso` (None para parar)."""
+    global _atual
+    _atual = progresso
+
+
+def pulso():
+    if _atual is not None:
+        _atual.pulso()
+
+
+def arquivo_concluido(nome, linhas=0):
+    if _atual is not None:
+        _atual.arquivo(nome, linhas)
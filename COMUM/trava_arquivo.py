@@ -0,0 +1,61 @@
+"""Travas exclusivas de arquivo (flock no Linux, msvcrt no Windows).
+
+A trava é do processo que mantém o arquivo aberto e some sozinha quando ele
+termina, mesmo que morra no meio, então não fica trava órfã para limpar.
+"""
+import os
+import time
+
+if os.name == 'nt':
+    import msvcrt
+
+    def travar_arquivo(f, bloquear=True):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not bloquear:
+                    return False
+                time.sleep(0.05)
+
+    def destravar_arquivo(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def travar_arquivo(f, bloquear=True):
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def destravar_arquivo(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class TravaExclusiva:
+    """Trava mantida em `caminho` enquanto o objeto estiver adquirido."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def adquirir(self, bloquear=False):
+        """Retorna False (sem esperar, a menos que `bloquear`) se outro processo já tem a trava."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        arquivo = open(self.caminho, 'a+b')
+        if not travar_arquivo(arquivo, bloquear):
+            arquivo.close()
+            return False
+        self._arquivo = arquivo
+        return True
+
+    def liberar(self):
+        if self._arquivo is not None:
+            destravar_arquivo(self._arquivo)
+            self._arquivo.close()
+            self._arquivo = None
@@ -5,6 +5,8 @@ import { Button } from '@/components/ui/button';
 import { useToast } from '@/hooks/use-toast';
 import * as XLSX from 'xlsx';
 import { UploadedFile, PageConfig } from '@/types/spreadsheet';
+import { indexarPlanilha } from '@/lib/pipelineApi';
+import { PlanilhaLida, planilhaDoIndice, planilhaDoWorkbook, lerExcel } from '@/lib/leitorPlanilha';
 import { PageManager } from './PageManager';
 
 interface FileUploadProps {
@@ -16,18 +18,85 @@ interface FileUploadProps {
   initialPagesConfig?: PageConfig[]; // Configurações iniciais de páginas
 }
 
+// Função para parse CSV robusto considerando aspas e diferentes delimitadores
+const parseCSV = (csvText: string): string[][] => {
+  const lines = csvText.split(/\r?\n/).filter(line => line.trim() !== '');
+  if (lines.length === 0) return [];
+  
+  // Detectar delimitador na primeira linha
+  const firstLine = lines[0];
+  const commaCount = (firstLine.match(/,/g) || []).length;
+  const semicolonCount = (firstLine.match(/;/g) || []).length;
+  const tabCount = (firstLine.match(/\t/g) || []).length;
+  
+  let delimiter = ',';
+  if (tabCount > Math.max(commaCount, semicolonCount)) {
+    delimiter = '\t';
+  } else if (semicolonCount > commaCount) {
+    delimiter = ';';
+  }
+  
+  // Parse cada linha considerando aspas
+  return lines.map(line => {
+    const row: string[] = [];
+    let currentCell = '';
+    let inQuotes = false;
+    
+    for (let i = 0; i < line.length; i++) {
+      const char = line[i];
+      const nextChar = line[i + 1];
+      
+      if (char === '"') {
+        if (inQuotes && nextChar === '"') {
+          // Aspas duplas dentro de aspas = caractere literal
+          currentCell += '"';
+          i++; // Pular próximo caractere
+        } else {
+          // Alternar estado de aspas
+          inQuotes = !inQuotes;
+        }
+      } else if (char === delimiter && !inQuotes) {
+        // Fim da célula
+        row.push(currentCell);
+        currentCell = '';
+      } else {
+        currentCell += char;
+      }
+    }
+    
+    // Adicionar última célula
+    row.push(currentCell);
+    
+    return row;
+  });
+};
+
+// Mensagens de erro mais específicas
+const mensagemErroLeitura = (error: unknown) => {
+  if (error instanceof Error) {
+    if (error.message.includes('memory') || error.message.includes('out of memory')) {
+      return 'Arquivo muito grande. Tente dividir em arquivos menores ou usar uma versão mais recente do navegador.';
+    } else if (error.message.includes('corrupt') || error.message.includes('invalid')) {
+      return 'Arquivo corrompido ou inválido. Verifique se o arquivo não está danificado.';
+    }
+  }
+  return 'Erro ao ler o arquivo. Verifique se é um arquivo Excel válido.';
+};
+
 export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConfigChange, initialPagesConfig = [] }: FileUploadProps) => {
   const { toast } = useToast();
   const [isLoading, setIsLoading] = useState(false);
-  const [workbook, setWorkbook] = useState<XLSX.WorkBook | null>(null);
+  const [planilha, setPlanilha] = useState<PlanilhaLida | null>(null);
+  const [arquivo, setArquivo] = useState<File | null>(null);
+  const [lendoCompleta, setLendoCompleta] = useState(false);
   const [isConfiguring, setIsConfiguring] = useState(false);
   const [fileName, setFileName] = useState<string>('');
   
-  // Manter workbook mesmo após gerar arquivo para permitir edição posterior
+  // Manter planilha mesmo após gerar arquivo para permitir edição posterior
   const handleFileReady = (uploadedFile: UploadedFile) => {
-    onFileUpload(uploadedFile);
+    onFileUpload({ ...uploadedFile, arquivo: arquivo ?? undefined });
     setIsConfiguring(false);
-    // Não limpar workbook aqui para permitir edição posterior
+    // Não limpar planilha aqui para permitir edição posterior
   };
   
   const handleEditConfig = () => {
@@ -52,115 +121,55 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
       }
 
       setIsLoading(true);
-      
-      const reader = new FileReader();
-      reader.onload = (event) => {
-        try {
-          let loadedWorkbook: XLSX.WorkBook;
-          
-          if (fileExtension === 'csv') {
-            // Processar arquivo CSV como texto
-            const text = event.target?.result as string;
-            
-            if (!text || text.trim() === '') {
-              setIsLoading(false);
-              toast({
-                title: 'Erro',
-                description: 'O arquivo CSV está vazio',
-                variant: 'destructive',
-              });
-              return;
-            }
-            
-            // Função para parse CSV robusto considerando aspas e diferentes delimitadores
-            const parseCSV = (csvText: string): string[][] => {
-              const lines = csvText.split(/\r?\n/).filter(line => line.trim() !== '');
-              if (lines.length === 0) return [];
-              
-              // Detectar delimitador na primeira linha
-              const firstLine = lines[0];
-              const commaCount = (firstLine.match(/,/g) || []).length;
-              const semicolonCount = (firstLine.match(/;/g) || []).length;
-              const tabCount = (firstLine.match(/\t/g) || []).length;
-              
-              let delimiter = ',';
-              if (tabCount > Math.max(commaCount, semicolonCount)) {
-                delimiter = '\t';
-              } else if (semicolonCount > commaCount) {
-                delimiter = ';';
-              }
-              
-              // Parse cada linha considerando aspas
-              return lines.map(line => {
-                const row: string[] = [];
-                let currentCell = '';
-                let inQuotes = false;
-                
-                for (let i = 0; i < line.length; i++) {
-                  const char = line[i];
-                  const nextChar = line[i + 1];
-                  
-                  if (char === '"') {
-                    if (inQuotes && nextChar === '"') {
-                      // Aspas duplas dentro de aspas = caractere literal
-                      currentCell += '"';
-                      i++; // Pular próximo caractere
-                    } else {
-                      // Alternar estado de aspas
-                      inQuotes = !inQuotes;
-                    }
-                  } else if (char === delimiter && !inQuotes) {
-                    // Fim da célula
-                    row.push(currentCell);
-                    currentCell = '';
-                  } else {
-                    currentCell += char;
-                  }
-                }
-                
-                // Adicionar última célula
-                row.push(currentCell);
-                
-                return row;
-              });
-            };
-            
-            // Converter CSV para array de arrays
-            const csvData = parseCSV(text);
-            
-            if (csvData.length === 0) {
-              setIsLoading(false);
-              toast({
-                title: 'Erro',
-                description: 'Não foi possível ler dados do arquivo CSV',
-                variant: 'destructive',
-              });
-              return;
-            }
-            
-            // Criar workbook a partir dos dados CSV
-            loadedWorkbook = XLSX.utils.book_new();
-            const sheet = XLSX.utils.aoa_to_sheet(csvData);
-            XLSX.utils.book_append_sheet(loadedWorkbook, sheet, 'Sheet1');
-          } else {
-            // Processar arquivo Excel (.xlsx, .xls, .xlsm)
-            const data = new Uint8Array(event.target?.result as ArrayBuffer);
-            
-            // Opções otimizadas para arquivos grandes
-            loadedWorkbook = XLSX.read(data, {
-              type: 'array',
-              cellFormula: false,
-              cellStyles: false,
-              cellDates: false,
-              dense: false,
-              sheetStubs: false,
-            });
+
+      const carregar = async (): Promise<PlanilhaLida | null> => {
+        if (fileExtension !== 'csv') {
+          // Abas, cabeçalhos e primeiras linhas vêm do índice do servidor; sem a API, ler tudo aqui
+          try {
+            return planilhaDoIndice(await indexarPlanilha(selectedFile));
+          } catch (error) {
+            console.warn('Índice de planilhas indisponível, lendo no navegador:', error);
+            return planilhaDoWorkbook(await lerExcel(selectedFile));
           }
-          
-          const sheetNames = loadedWorkbook.SheetNames;
-          
-          if (sheetNames.length === 0) {
-            setIsLoading(false);
+        }
+
+        // Processar arquivo CSV como texto
+        const text = await selectedFile.text();
+
+        if (!text || text.trim() === '') {
+          toast({
+            title: 'Erro',
+            description: 'O arquivo CSV está vazio',
+            variant: 'destructive',
+          });
+          return null;
+        }
+
+        // Converter CSV para array de arrays
+        const csvData = parseCSV(text);
+
+        if (csvData.length === 0) {
+          toast({
+            title: 'Erro',
+            description: 'Não foi possível ler dados do arquivo CSV',
+            variant: 'destructive',
+          });
+          return null;
+        }
+
+        // Criar workbook a partir dos dados CSV
+        const loadedWorkbook = XLSX.utils.book_new();
+        const sheet = XLSX.utils.aoa_to_sheet(csvData);
+        XLSX.utils.book_append_sheet(loadedWorkbook, sheet, 'Sheet1');
+        return planilhaDoWorkbook(loadedWorkbook);
+      };
+
+      carregar()
+        .then((lida) => {
+          setIsLoading(false);
+          if (!lida) return;
+
+          if (lida.abas.length === 0) {
             toast({
               title: 'Erro',
               description: 'A planilha não possui abas',
@@ -169,58 +178,46 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
             return;
           }
 
-          // Salvar workbook e mostrar interface de configuração
-          setWorkbook(loadedWorkbook);
+          // Salvar planilha e mostrar interface de configuração
+          setPlanilha(lida);
+          setArquivo(selectedFile);
           setFileName(selectedFile.name);
           setIsConfiguring(true);
-          setIsLoading(false);
-          
+
           toast({
             title: 'Arquivo carregado',
-            description: `${sheetNames.length} aba(s) encontrada(s). Configure a leitura abaixo.`,
+            description: `${lida.abas.length} aba(s) encontrada(s). Configure a leitura abaixo.`,
           });
-        } catch (error) {
+        })
+        .catch((error) => {
           setIsLoading(false);
           console.error('Error reading file:', error);
-          
-          // Mensagens de erro mais específicas
-          let errorMessage = 'Erro ao ler o arquivo. Verifique se é um arquivo Excel válido.';
-          if (error instanceof Error) {
-            if (error.message.includes('memory') || error.message.includes('out of memory')) {
-              errorMessage = 'Arquivo muito grande. Tente dividir em arquivos menores ou usar uma versão mais recente do navegador.';
-            } else if (error.message.includes('corrupt') || error.message.includes('invalid')) {
-              errorMessage = 'Arquivo corrompido ou inválido. Verifique se o arquivo não está danificado.';
-            }
-          }
-          
           toast({
             title: 'Erro',
-            description: errorMessage,
+            description: mensagemErroLeitura(error),
             variant: 'destructive',
           });
-        }
-      };
-      
-      reader.onerror = () => {
-        setIsLoading(false);
-        toast({
-          title: 'Erro',
-          description: 'Erro ao ler o arquivo. Tente novamente.',
-          variant: 'destructive',
         });
-      };
-      
-      // Ler arquivo CSV como texto, Excel como ArrayBuffer
-      if (fileExtension === 'csv') {
-        reader.readAsText(selectedFile, 'UTF-8');
-      } else {
-        reader.readAsArrayBuffer(selectedFile);
-      }
     },
     [type, toast]
   );
 
-
+  // Cabeçalho além das linhas de amostra do índice: ler a planilha inteira no navegador
+  const handlePlanilhaCompleta = useCallback(() => {
+    if (!arquivo || !planilha?.amostra || lendoCompleta) return;
+    setLendoCompleta(true);
+    lerExcel(arquivo)
+      .then((workbook) => setPlanilha(planilhaDoWorkbook(workbook)))
+      .catch((error) => {
+        console.error('Error reading file:', error);
+        toast({
+          title: 'Erro',
+          description: mensagemErroLeitura(error),
+          variant: 'destructive',
+        });
+      })
+      .finally(() => setLendoCompleta(false));
+  }, [arquivo, planilha, lendoCompleta, toast]);
 
   const getTypeLabel = () => {
     switch (type) {
@@ -258,7 +255,8 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
               size="sm"
               onClick={() => {
                 onFileRemove();
-                setWorkbook(null);
+                setPlanilha(null);
+                setArquivo(null);
                 setIsConfiguring(false);
               }}
               className="h-8 w-8 p-0"
@@ -268,9 +266,9 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
           )}
         </div>
 
-        {isConfiguring && workbook ? (
+        {isConfiguring && planilha ? (
           <PageManager
-            workbook={workbook}
+            planilha={planilha}
             fileName={fileName}
             type={type}
             initialPagesConfig={initialPagesConfig}
@@ -280,6 +278,7 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
               }
             }}
             onFileReady={handleFileReady}
+            onPlanilhaCompleta={handlePlanilhaCompleta}
           />
         ) : !file ? (
           <label className="flex flex-col items-center justify-center gap-2 p-8 border-2 border-dashed border-border rounded-lg cursor-pointer hover:bg-muted/50 transition-colors disabled:opacity-50 disabled:cursor-not-allowed">
@@ -311,7 +310,7 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
                 <FileSpreadsheet className="h-4 w-4 text-success" />
                 <span className="text-sm font-medium text-foreground truncate">{file.name}</span>
               </div>
-              {workbook && (
+              {planilha && (
                 <Button
                   variant="outline"
                   size="sm"
@@ -324,7 +323,7 @@ export const FileUpload = ({ type, file, onFileUpload, onFileRemove, onPagesConf
               )}
             </div>
             <div className="text-xs text-muted-foreground space-y-1">
-              <div>{file.data.length} linhas de dados</div>
+              <div>{file.data.length} linhas de {file.amostra ? 'amostra' : 'dados'}</div>
               <div>{file.columns.length} colunas encontradas</div>
               {file.sheets && (
                 <div>Páginas: {file.sheets.join(', ')}</div>
@@ -13,13 +13,15 @@ import { Copy, Download, CheckCircle2 } from 'lucide-react';
 import { FormEvent, useState } from 'react';
 import { useToast } from '@/hooks/use-toast';
 import { PandasConfig } from '@/types/spreadsheet';
+import { RodarPipeline } from './RodarPipeline';
 
 interface JsonOutputProps {
   config: PandasConfig;
   separadoresConfig?: any;
+  planilhas?: File[]; // Planilhas para rodar a config na API do pipeline
 }
 
-export const JsonOutput = ({ config, separadoresConfig }: JsonOutputProps) => {
+export const JsonOutput = ({ config, separadoresConfig, planilhas = [] }: JsonOutputProps) => {
   const [copied, setCopied] = useState(false);
   const [isDownloadDialogOpen, setIsDownloadDialogOpen] = useState(false);
   const [fileNameInput, setFileNameInput] = useState('');
@@ -134,6 +136,7 @@ export const JsonOutput = ({ config, separadoresConfig }: JsonOutputProps) => {
           </pre>
         </div>
 
+        <RodarPipeline config={finalConfig} planilhas={planilhas} />
       </div>
 
       <Dialog open={isDownloadDialogOpen} onOpenChange={setIsDownloadDialogOpen}>
@@ -1,4 +1,4 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useEffect } from "react";
 import { Card } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -16,6 +16,7 @@ import { Alert, AlertDescription } from "@/components/ui/alert";
 import { useToast } from "@/hooks/use-toast";
 import * as XLSX from "xlsx";
 import { PageConfig, UploadedFile, ColumnMapping } from "@/types/spreadsheet";
+import { PlanilhaLida } from "@/lib/leitorPlanilha";
 import {
   FileSpreadsheet,
   CheckCircle2,
@@ -28,21 +29,23 @@ import {
 } from "lucide-react";
 
 interface PageManagerProps {
-  workbook: XLSX.WorkBook | null;
+  planilha: PlanilhaLida | null;
   fileName: string;
   type: "custo" | "venda" | "gabarito";
   onPagesConfigChange: (pages: PageConfig[]) => void;
   onFileReady: (file: UploadedFile) => void;
   initialPagesConfig?: PageConfig[]; // Configurações iniciais de páginas
+  onPlanilhaCompleta?: () => void; // Pede a planilha inteira quando a amostra do índice não basta
 }
 
 export const PageManager = ({
-  workbook,
+  planilha,
   fileName,
   type,
   onPagesConfigChange,
   onFileReady,
   initialPagesConfig = [],
+  onPlanilhaCompleta,
 }: PageManagerProps) => {
   const { toast } = useToast();
   const [selectedPages, setSelectedPages] = useState<number[]>(initialPagesConfig.map(p => p.pageIndex));
@@ -70,13 +73,13 @@ export const PageManager = ({
 
   const loadPageData = useCallback(
     (pageIndex: number, startCell: string) => {
-      if (!workbook) return;
+      if (!planilha) return;
 
       try {
-        const sheetName = workbook.SheetNames[pageIndex];
-        const sheet = workbook.Sheets[sheetName];
+        const aba = planilha.abas[pageIndex];
+        const sheetName = aba.nome;
 
-        if (!sheet["!ref"]) {
+        if (aba.colunas === 0) {
           toast({
             title: "Erro",
             description: "A aba selecionada está vazia",
@@ -88,44 +91,27 @@ export const PageManager = ({
         // Converter célula inicial
         const startCellAddress = XLSX.utils.decode_cell(startCell);
         const startRow = startCellAddress.r + 1;
-        const startCol = startCellAddress.c;
-
-        const range = sheet["!ref"];
-        const decodedRange = XLSX.utils.decode_range(range);
-        const maxRow = decodedRange.e.r;
-        const maxCol = decodedRange.e.c;
-
-        // Função para obter valor de célula considerando merges
-        const getCellValue = (rowIdx: number, colIdx: number): any => {
-          const merges = sheet["!merges"] || [];
-          for (const merge of merges) {
-            const { s, e } = merge;
-            if (
-              rowIdx >= s.r &&
-              rowIdx <= e.r &&
-              colIdx >= s.c &&
-              colIdx <= e.c
-            ) {
-              const startAddr = XLSX.utils.encode_cell({ r: s.r, c: s.c });
-              const startCell = sheet[startAddr];
-              if (startCell) {
-                if (startCell.w !== undefined) return startCell.w;
-                if (startCell.v !== undefined && startCell.v !== null)
-                  return String(startCell.v);
-              }
-              if (rowIdx !== s.r || colIdx !== s.c) return "";
-            }
-          }
 
-          const cellAddress = XLSX.utils.encode_cell({ r: rowIdx, c: colIdx });
-          const cell = sheet[cellAddress];
+        const linhas = aba.linhas();
+        const maxCol = aba.colunas - 1;
 
-          if (cell) {
-            if (cell.w !== undefined && cell.w !== null) return String(cell.w);
-            if (cell.v !== undefined && cell.v !== null) return String(cell.v);
-          }
-          return "";
-        };
+        // O índice do servidor só traz as primeiras linhas; além delas, ler a planilha inteira
+        if (
+          planilha.amostra &&
+          startRow > linhas.length &&
+          (aba.totalLinhas === null || startRow <= aba.totalLinhas)
+        ) {
+          toast({
+            title: "Lendo a planilha inteira",
+            description: `A célula inicial está além das ${linhas.length} linhas de amostra desta aba`,
+          });
+          onPlanilhaCompleta?.();
+          return null;
+        }
+
+        // Células mescladas já vêm com o valor da primeira
+        const getCellValue = (rowIdx: number, colIdx: number): string =>
+          linhas[rowIdx]?.[colIdx] ?? "";
 
         // Buscar cabeçalho
         let headerRow: any[] = [];
@@ -173,21 +159,6 @@ export const PageManager = ({
         // Criar nomes de colunas
         const columns = headerRow.map((col, idx) => {
           const colStr = String(col || "").trim();
-          if (colStr === "" && headerRowIndex >= 0) {
-            const cellAddr = XLSX.utils.encode_cell({
-              r: headerRowIndex,
-              c: idx,
-            });
-            const cell = sheet[cellAddr];
-            if (cell) {
-              const formatted =
-                cell.w ||
-                (cell.v !== undefined && cell.v !== null ? String(cell.v) : "");
-              if (formatted.trim() !== "") {
-                return formatted.trim();
-              }
-            }
-          }
           return colStr !== "" ? colStr : `Coluna_${idx + 1}`;
         });
 
@@ -202,21 +173,32 @@ export const PageManager = ({
         return null;
       }
     },
-    [workbook, toast]
+    [planilha, toast, onPlanilhaCompleta]
   );
 
+  // Planilha trocada (lida inteira depois da amostra): recarregar as colunas da página em revisão
+  useEffect(() => {
+    if (currentPageIndex === null) return;
+    const result = loadPageData(currentPageIndex, currentStartCell);
+    if (result) {
+      setCurrentColumns(result.columns);
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [planilha]);
+
   const handleConfigurePage = (pageIndex: number) => {
-    if (!workbook) return;
+    if (!planilha) return;
 
-    // Buscar configuração existente ou usar padrão
+    // Buscar configuração existente ou usar padrão (o cabeçalho sugerido pelo índice, se houver)
     const existingConfig = pageConfigs.find((p) => p.pageIndex === pageIndex);
+    const defaultStartCell = planilha.abas[pageIndex].celulaCabecalho || "A1";
     if (existingConfig) {
       setCurrentStartCell(existingConfig.startCell);
       setCurrentColumns(existingConfig.columns);
       setCurrentColumnMappings(existingConfig.columnMappings);
       setCurrentStopRow(existingConfig.stopRow || null);
     } else {
-      setCurrentStartCell("A1");
+      setCurrentStartCell(defaultStartCell);
       setCurrentColumns([]);
       setCurrentColumnMappings([]);
       setCurrentStopRow(null);
@@ -226,21 +208,21 @@ export const PageManager = ({
     setIsReviewing(true);
 
     // Carregar dados da página
-    const result = loadPageData(pageIndex, existingConfig?.startCell || "A1");
+    const result = loadPageData(pageIndex, existingConfig?.startCell || defaultStartCell);
     if (result) {
       setCurrentColumns(result.columns);
     }
   };
 
   const handleApprovePage = () => {
-    if (currentPageIndex === null || !workbook) return;
+    if (currentPageIndex === null || !planilha) return;
 
     const result = loadPageData(currentPageIndex, currentStartCell);
     if (!result) return;
 
     const newPageConfig: PageConfig = {
       pageIndex: currentPageIndex,
-      pageName: result.sheetName || workbook.SheetNames[currentPageIndex],
+      pageName: result.sheetName || planilha.abas[currentPageIndex].nome,
       startCell: currentStartCell,
       columns: result.columns,
       columnMappings: currentColumnMappings,
@@ -278,7 +260,7 @@ export const PageManager = ({
   };
 
   const handleSaveStartCell = (pageIndex: number) => {
-    if (!workbook || !editStartCellValue.trim()) return;
+    if (!planilha || !editStartCellValue.trim()) return;
 
     const config = pageConfigs.find((p) => p.pageIndex === pageIndex);
     if (!config) return;
@@ -378,48 +360,20 @@ export const PageManager = ({
 
   const processPageData = useCallback(
     (pageConfig: PageConfig) => {
-      if (!workbook) return null;
+      if (!planilha) return null;
 
       try {
-        const sheet = workbook.Sheets[pageConfig.pageName];
-        if (!sheet["!ref"]) return null;
+        const aba = planilha.abas[pageConfig.pageIndex];
+        if (!aba || aba.colunas === 0) return null;
 
         const startCellAddress = XLSX.utils.decode_cell(pageConfig.startCell);
         const startRow = startCellAddress.r + 1;
-        const range = sheet["!ref"];
-        const decodedRange = XLSX.utils.decode_range(range);
-        const maxRow = decodedRange.e.r;
-        const maxCol = decodedRange.e.c;
-
-        const getCellValue = (rowIdx: number, colIdx: number): any => {
-          const merges = sheet["!merges"] || [];
-          for (const merge of merges) {
-            const { s, e } = merge;
-            if (
-              rowIdx >= s.r &&
-              rowIdx <= e.r &&
-              colIdx >= s.c &&
-              colIdx <= e.c
-            ) {
-              const startAddr = XLSX.utils.encode_cell({ r: s.r, c: s.c });
-              const startCell = sheet[startAddr];
-              if (startCell) {
-                if (startCell.w !== undefined) return startCell.w;
-                if (startCell.v !== undefined && startCell.v !== null)
-                  return String(startCell.v);
-              }
-              if (rowIdx !== s.r || colIdx !== s.c) return "";
-            }
-          }
+        const linhas = aba.linhas();
+        const maxRow = linhas.length - 1;
+        const maxCol = aba.colunas - 1;
 
-          const cellAddress = XLSX.utils.encode_cell({ r: rowIdx, c: colIdx });
-          const cell = sheet[cellAddress];
-          if (cell) {
-            if (cell.w !== undefined && cell.w !== null) return String(cell.w);
-            if (cell.v !== undefined && cell.v !== null) return String(cell.v);
-          }
-          return "";
-        };
+        const getCellValue = (rowIdx: number, colIdx: number): string =>
+          linhas[rowIdx]?.[colIdx] ?? "";
 
         const allData: any[][] = [];
         const headerRowIndex = startRow - 1;
@@ -476,7 +430,7 @@ export const PageManager = ({
         return null;
       }
     },
-    [workbook]
+    [planilha]
   );
 
   const handleGenerateFile = () => {
@@ -520,19 +474,22 @@ export const PageManager = ({
       data: allData,
       type,
       sheets: pageConfigs.map((p) => p.pageName),
+      amostra: planilha?.amostra,
     };
 
     onFileReady(combinedFile);
 
     toast({
       title: "Sucesso!",
-      description: `Arquivo gerado com ${pageConfigs.length} página(s) e ${allData.length} linhas de dados`,
+      description: `Arquivo gerado com ${pageConfigs.length} página(s) e ${allData.length} linhas de ${
+        planilha?.amostra ? "amostra" : "dados"
+      }`,
     });
   };
 
-  if (!workbook) return null;
+  if (!planilha) return null;
 
-  const sheetNames = workbook.SheetNames;
+  const sheetNames = planilha.abas.map((aba) => aba.nome);
 
   return (
     <Card className="p-6">
@@ -613,7 +570,7 @@ export const PageManager = ({
                     Configurando: Página {currentPageIndex + 1}
                   </h4>
                   <p className="text-sm text-muted-foreground">
-                    {workbook.SheetNames[currentPageIndex]}
+                    {planilha.abas[currentPageIndex].nome}
                   </p>
                 </div>
                 <Button
@@ -0,0 +1,204 @@
+import { useState } from 'react';
+import { Card } from '@/components/ui/card';
+import { Button } from '@/components/ui/button';
+import { Progress } from '@/components/ui/progress';
+import { Alert, AlertDescription } from '@/components/ui/alert';
+import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { useToast } from '@/hooks/use-toast';
+import { AlertCircle, Download, Eye, Loader2, Play } from 'lucide-react';
+import {
+  PipelineJob,
+  PipelineProgresso,
+  acompanharJob,
+  enviarJob,
+  urlArquivo,
+} from '@/lib/pipelineApi';
+
+// Linhas por aba na prévia: roda rápido e mostra se a config lê o que deveria
+const LINHAS_PREVIA = 50;
+// A API só aceita as planilhas que o pipeline lê
+const EXTENSOES_ACEITAS = ['.xlsx', '.xls'];
+
+interface RodarPipelineProps {
+  config: object;
+  planilhas: File[];
+}
+
+const formatarBytes = (bytes: number) =>
+  bytes < 1024 * 1024 ? `${(bytes / 1024).toFixed(1)} KB` : `${(bytes / 1024 / 1024).toFixed(1)} MB`;
+
+export const RodarPipeline = ({ config, planilhas }: RodarPipelineProps) => {
+  const { toast } = useToast();
+  const [executando, setExecutando] = useState(false);
+  const [progresso, setProgresso] = useState<PipelineProgresso | null>(null);
+  const [job, setJob] = useState<PipelineJob | null>(null);
+
+  const recusadas = planilhas.filter(
+    (arquivo) => !EXTENSOES_ACEITAS.some((extensao) => arquivo.name.toLowerCase().endsWith(extensao))
+  );
+
+  const rodar = async (previa: boolean) => {
+    setExecutando(true);
+    setProgresso(null);
+    setJob(null);
+    try {
+      const enviado = await enviarJob(config, planilhas, previa ? { linhas_previa: LINHAS_PREVIA } : {});
+      setJob(enviado);
+      const terminado = await acompanharJob(enviado, setProgresso);
+      setJob(terminado);
+      if (terminado.estado === 'erro') {
+        toast({
+          title: 'Erro no pipeline',
+          description: terminado.erro?.mensagem ?? 'O job terminou com erro',
+          variant: 'destructive',
+        });
+      } else {
+        toast({
+          title: previa ? 'Prévia pronta' : 'Pipeline concluído',
+          description: `${terminado.resultado?.arquivos.length ?? 0} arquivo(s) gerado(s)${
+            terminado.cache ? ' (do cache)' : ''
+          }`,
+        });
+      }
+    } catch (error) {
+      console.error('Error running pipeline:', error);
+      toast({
+        title: 'Erro',
+        description:
+          error instanceof Error
+            ? `Não foi possível rodar o pipeline: ${error.message}`
+            : 'Não foi possível rodar o pipeline. Verifique se o LuiHome está aberto.',
+        variant: 'destructive',
+      });
+    } finally {
+      setExecutando(false);
+    }
+  };
+
+  const resultado = job?.estado === 'concluido' ? job.resultado : null;
+
+  return (
+    <Card className="p-6 border-2 border-primary">
+      <div className="space-y-4">
+        <div className="flex items-center justify-between">
+          <div>
+            <h3 className="font-semibold text-lg text-foreground">Rodar / Prévia</h3>
+            <p className="text-sm text-muted-foreground">
+              Roda esta config contra as planilhas enviadas, sem gravar em MOTOR/configs
+            </p>
+          </div>
+          <div className="flex gap-2">
+            <Button
+              variant="outline"
+              size="sm"
+              onClick={() => rodar(true)}
+              disabled={executando || planilhas.length === 0 || recusadas.length > 0}
+              className="gap-2"
+            >
+              <Eye className="h-4 w-4" />
+              Prévia ({LINHAS_PREVIA} linhas)
+            </Button>
+            <Button
+              size="sm"
+              onClick={() => rodar(false)}
+              disabled={executando || planilhas.length === 0 || recusadas.length > 0}
+              className="gap-2"
+            >
+              {executando ? <Loader2 className="h-4 w-4 animate-spin" /> : <Play className="h-4 w-4" />}
+              Rodar
+            </Button>
+          </div>
+        </div>
+
+        {recusadas.length > 0 && (
+          <Alert className="border-warning bg-warning/5">
+            <AlertCircle className="h-4 w-4 text-warning" />
+            <AlertDescription>
+              O pipeline só lê .xlsx e .xls: {recusadas.map((arquivo) => arquivo.name).join(', ')}
+            </AlertDescription>
+          </Alert>
+        )}
+
+        {executando && (
+          <div className="space-y-2">
+            <Progress value={progresso && progresso.total > 0 ? (progresso.numero / progresso.total) * 100 : 0} />
+            <div className="text-xs text-muted-foreground">
+              {progresso
+                ? `${progresso.descricao ?? 'Processando'} (${progresso.numero}/${progresso.total})` +
+                  `${progresso.arquivo ? ` • ${progresso.arquivo}` : ''}` +
+                  ` • ${progresso.linhas_feitas} linhas • ${progresso.linhas_por_segundo} linhas/s`
+                : job?.estado === 'na_fila'
+                ? 'Na fila...'
+                : 'Enviando planilhas...'}
+            </div>
+          </div>
+        )}
+
+        {job?.estado === 'erro' && job.erro && (
+          <Alert variant="destructive">
+            <AlertCircle className="h-4 w-4" />
+            <AlertDescription>
+              <strong>{job.erro.etapa}:</strong> {job.erro.mensagem}
+            </AlertDescription>
+          </Alert>
+        )}
+
+        {resultado && (
+          <div className="space-y-4">
+            <div className="text-xs text-muted-foreground">
+              {Object.entries(resultado.contagens)
+                .map(([etapa, quantidade]) => `${etapa}: ${quantidade}`)
+                .join(' • ')}
+              {` • ${resultado.segundos.toFixed(1)} s`}
+            </div>
+            {resultado.arquivos.map((arquivo) => {
+              const previa = resultado.previa[arquivo.nome];
+              return (
+                <div key={arquivo.nome} className="space-y-2">
+                  <div className="flex items-center justify-between">
+                    <span className="text-sm font-medium text-foreground">
+                      {arquivo.nome}{' '}
+                      <span className="text-xs text-muted-foreground">({formatarBytes(arquivo.bytes)})</span>
+                    </span>
+                    <Button variant="outline" size="sm" asChild className="gap-2">
+                      <a href={urlArquivo(job, arquivo.nome)} download={arquivo.nome}>
+                        <Download className="h-4 w-4" />
+                        Baixar
+                      </a>
+                    </Button>
+                  </div>
+                  {previa && previa.length > 0 && (
+                    <div className="max-h-64 overflow-auto rounded-lg border">
+                      <Table>
+                        <TableHeader>
+                          <TableRow>
+                            {previa[0].map((celula, indice) => (
+                              <TableHead key={indice} className="text-xs whitespace-nowrap">
+                                {celula ?? ''}
+                              </TableHead>
+                            ))}
+                          </TableRow>
+                        </TableHeader>
+                        <TableBody>
+                          {previa.slice(1).map((linha, numero) => (
+                            <TableRow key={numero}>
+                              {linha.map((celula, indice) => (
+                                <TableCell key={indice} className="text-xs whitespace-nowrap py-1">
+                                  {celula === null || celula === undefined ? '' : String(celula)}
+                                </TableCell>
+                              ))}
+                            </TableRow>
+                          ))}
+                        </TableBody>
+                      </Table>
+                    </div>
+                  )}
+                </div>
+              );
+            })}
+          </div>
+        )}
+      </div>
+    </Card>
+  );
+};
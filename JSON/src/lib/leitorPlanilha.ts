@@ -0,0 +1,88 @@
+// Planilha como o PageManager precisa: nomes das abas e as células de cada aba como texto.
+// Vem do índice do servidor (só as primeiras linhas de cada aba) ou, sem a API, do XLSX.read no navegador.
+import * as XLSX from 'xlsx';
+import { PlanilhaIndice } from '@/lib/pipelineApi';
+
+export interface AbaLida {
+  nome: string;
+  // Linhas conhecidas da aba; na amostra, só as primeiras linhas indexadas
+  linhas: () => string[][];
+  colunas: number;
+  // Total de linhas da aba, quando se sabe
+  totalLinhas: number | null;
+  // Célula da melhor candidata a cabeçalho, quando o índice encontrou uma
+  celulaCabecalho: string | null;
+}
+
+export interface PlanilhaLida {
+  abas: AbaLida[];
+  amostra: boolean;
+}
+
+const texto = (valor: any) => (valor === undefined || valor === null ? '' : String(valor));
+
+export const planilhaDoIndice = (indice: PlanilhaIndice): PlanilhaLida => ({
+  amostra: true,
+  abas: indice.abas.map((aba) => {
+    const colunas = Math.max(aba.colunas ?? 0, ...aba.amostra.map((linha) => linha.length));
+    const linhas = aba.amostra.map((linha) => Array.from({ length: colunas }, (_, c) => texto(linha[c])));
+    return {
+      nome: aba.nome,
+      linhas: () => linhas,
+      colunas,
+      totalLinhas: aba.linhas,
+      celulaCabecalho: aba.cabecalhos[0]?.celula ?? null,
+    };
+  }),
+});
+
+const linhasDaFolha = (folha: XLSX.WorkSheet): string[][] => {
+  if (!folha['!ref']) return [];
+  const { e } = XLSX.utils.decode_range(folha['!ref']);
+  const linhas = Array.from({ length: e.r + 1 }, (_, r) =>
+    Array.from({ length: e.c + 1 }, (_, c) => {
+      const celula = folha[XLSX.utils.encode_cell({ r, c })];
+      return celula ? texto(celula.w ?? celula.v) : '';
+    })
+  );
+  // Células mescladas repetem o valor da primeira
+  for (const { s, e: fim } of folha['!merges'] ?? []) {
+    for (let r = s.r; r <= Math.min(fim.r, e.r); r++) {
+      for (let c = s.c; c <= Math.min(fim.c, e.c); c++) {
+        linhas[r][c] = linhas[s.r][s.c];
+      }
+    }
+  }
+  return linhas;
+};
+
+export const planilhaDoWorkbook = (workbook: XLSX.WorkBook): PlanilhaLida => ({
+  amostra: false,
+  abas: workbook.SheetNames.map((nome) => {
+    const folha = workbook.Sheets[nome];
+    const dimensao = folha['!ref'] ? XLSX.utils.decode_range(folha['!ref']) : null;
+    let linhas: string[][] | null = null;
+    return {
+      nome,
+      // Só monta as linhas da aba que for aberta
+      linhas: () => {
+        if (!linhas) linhas = linhasDaFolha(folha);
+        return linhas;
+      },
+      colunas: dimensao ? dimensao.e.c + 1 : 0,
+      totalLinhas: dimensao ? dimensao.e.r + 1 : 0,
+      celulaCabecalho: null,
+    };
+  }),
+});
+
+// Leitura da planilha inteira no navegador, para quando a API não responde
+export const lerExcel = async (arquivo: File): Promise<XLSX.WorkBook> =>
+  XLSX.read(new Uint8Array(await arquivo.arrayBuffer()), {
+    type: 'array',
+    cellFormula: false,
+    cellStyles: false,
+    cellDates: false,
+    dense: false,
+    sheetStubs: false,
+  });
@@ -0,0 +1,176 @@
+// Cliente da API de jobs do pipeline servida pelo LuiHomeApp (api_pipeline.py).
+// Roda a config gerada contra as planilhas enviadas, sem mexer em MOTOR/configs.
+
+export interface PipelineOpcoes {
+  usar_separador?: boolean;
+  cor_persistente?: boolean;
+  formato?: 'xlsx' | 'csv' | 'parquet';
+  // Prévia rápida: só as primeiras N linhas de cada aba
+  linhas_previa?: number;
+}
+
+export interface PipelineProgresso {
+  tipo: 'tarefa' | 'arquivo' | 'fim_tarefa' | 'concluido' | 'erro';
+  descricao: string | null;
+  numero: number;
+  total: number;
+  arquivo: string | null;
+  linhas: number;
+  arquivos_feitos: number;
+  linhas_feitas: number;
+  segundos: number;
+  linhas_por_segundo: number;
+}
+
+export interface ManifestoContagens {
+  linhas_entrada: number | null;
+  descartadas: Record<string, number>;
+  expandidas: number;
+  linhas_saida: number | null;
+}
+
+export interface ManifestoArquivo extends ManifestoContagens {
+  etapa: string;
+  arquivo: string;
+  tarefa: string | null;
+  situacao: 'executada' | 'em dia' | 'anterior';
+  origens: string[];
+  segundos: number;
+  confere?: boolean;
+}
+
+export interface Manifesto {
+  situacao: string;
+  segundos: number;
+  etapas: Record<string, ManifestoContagens & { segundos: number; arquivos: number }>;
+  arquivos: ManifestoArquivo[];
+}
+
+export interface PipelineResultado {
+  contagens: Record<string, number>;
+  segundos: number;
+  arquivos: { nome: string; bytes: number }[];
+  previa: Record<string, any[][] | null>;
+  manifesto: Manifesto | null;
+}
+
+export interface PipelineJob {
+  id: string;
+  estado: 'na_fila' | 'executando' | 'concluido' | 'erro';
+  cache: boolean;
+  progresso: PipelineProgresso | null;
+  resultado: PipelineResultado | null;
+  erro: { etapa: string; mensagem: string } | null;
+}
+
+// Em desenvolvimento (vite na porta 8080) aponte para o servidor do LuiHomeApp
+const BASE_URL = import.meta.env.VITE_PIPELINE_API ?? '';
+
+const lerComoBase64 = (arquivo: File) =>
+  new Promise<string>((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(String(reader.result).split(',', 2)[1] ?? '');
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(arquivo);
+  });
+
+const lerResposta = async <T>(resposta: Response): Promise<T> => {
+  const dados = await resposta.json();
+  if (!resposta.ok) {
+    throw new Error(dados?.erro ?? `Erro ${resposta.status}`);
+  }
+  return dados as T;
+};
+
+export const enviarJob = async (
+  config: object,
+  planilhas: File[],
+  opcoes: PipelineOpcoes = {},
+  nomeConfig?: string
+): Promise<PipelineJob> => {
+  const corpo = {
+    config,
+    nome_config: nomeConfig,
+    opcoes,
+    planilhas: await Promise.all(
+      planilhas.map(async (arquivo) => ({ nome: arquivo.name, conteudo: await lerComoBase64(arquivo) }))
+    ),
+  };
+  const resposta = await fetch(`${BASE_URL}/api/jobs`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(corpo),
+  });
+  return lerResposta<PipelineJob>(resposta);
+};
+
+export const consultarJob = async (id: string): Promise<PipelineJob> =>
+  lerResposta<PipelineJob>(await fetch(`${BASE_URL}/api/jobs/${id}`));
+
+// Chama onProgresso a cada evento e resolve com o job terminado (concluído ou com erro)
+export const acompanharJob = (
+  job: PipelineJob,
+  onProgresso?: (progresso: PipelineProgresso) => void
+): Promise<PipelineJob> => {
+  if (job.estado === 'concluido' || job.estado === 'erro') {
+    return Promise.resolve(job);
+  }
+  return new Promise((resolve, reject) => {
+    const eventos = new EventSource(`${BASE_URL}/api/jobs/${job.id}/eventos`);
+    const terminar = (evento: MessageEvent) => {
+      eventos.close();
+      resolve(JSON.parse(evento.data));
+    };
+    eventos.addEventListener('progresso', (evento) => onProgresso?.(JSON.parse((evento as MessageEvent).data)));
+    eventos.addEventListener('concluido', (evento) => terminar(evento as MessageEvent));
+    eventos.addEventListener('erro', (evento) => terminar(evento as MessageEvent));
+    // Quedas passageiras o EventSource reconecta sozinho; só desiste quando ele fecha de vez
+    eventos.onerror = () => {
+      if (eventos.readyState === EventSource.CLOSED) {
+        consultarJob(job.id).then(resolve, reject);
+      }
+    };
+  });
+};
+
+export const urlArquivo = (job: PipelineJob, nome: string) =>
+  `${BASE_URL}/api/jobs/${job.id}/arquivos/${encodeURIComponent(nome)}`;
+
+export interface PlanilhaAba {
+  nome: string;
+  indice: number;
+  visivel: boolean;
+  dimensao: string | null;
+  linhas: number | null;
+  colunas: number | null;
+  cabecalhos: { linha: number; celula: string; colunas: number; valores: any[] }[];
+  amostra: any[][];
+}
+
+export interface PlanilhaIndice {
+  hash: string;
+  arquivo: string;
+  bytes: number;
+  linhas_amostra: number;
+  abas: PlanilhaAba[];
+}
+
+const hashArquivo = async (arquivo: File) => {
+  const digest = await crypto.subtle.digest('SHA-256', await arquivo.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+// Abas, dimensões, candidatas a cabeçalho e primeiras linhas sem ler a planilha inteira no navegador.
+// Pergunta pelo hash antes; só envia o arquivo se o servidor ainda não o indexou.
+export const indexarPlanilha = async (arquivo: File): Promise<PlanilhaIndice> => {
+  const emCache = await fetch(`${BASE_URL}/api/planilhas/${await hashArquivo(arquivo)}`);
+  if (emCache.ok) {
+    return { ...(await emCache.json()), arquivo: arquivo.name };
+  }
+  const resposta = await fetch(`${BASE_URL}/api/planilhas?nome=${encodeURIComponent(arquivo.name)}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/octet-stream' },
+    body: arquivo,
+  });
+  return lerResposta<PlanilhaIndice>(resposta);
+};
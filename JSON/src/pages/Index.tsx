@@ -550,7 +550,13 @@ const Index = () => {
                   JSON Gerado
                 </h2>
               </div>
-              <JsonOutput config={generatedConfig} separadoresConfig={separadoresConfig} />
+              <JsonOutput
+                config={generatedConfig}
+                separadoresConfig={separadoresConfig}
+                planilhas={[custoFile?.arquivo, vendaFile?.arquivo].filter(
+                  (arquivo): arquivo is File => !!arquivo
+                )}
+              />
             </section>
           )}
         </div>
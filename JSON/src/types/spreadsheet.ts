@@ -20,6 +20,8 @@ export interface UploadedFile {
   data: any[][];
   type: 'custo' | 'venda' | 'gabarito';
   sheets?: string[]; // Nomes das abas/páginas
+  amostra?: boolean; // data tem só as primeiras linhas de cada aba (índice do servidor)
+  arquivo?: File; // Planilha original, enviada à API para rodar o pipeline
   cellData?: CellData[][]; // Dados com informações de localização
 }
 
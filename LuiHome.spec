@@ -3,10 +3,13 @@
 
 a = Analysis(
     ['LuiHomeApp.py'],
-    pathex=[],
+    pathex=['MOTOR', 'TRADUTOR', 'COMUM'],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=[
+        'conversor_etl', 'geradorJSON', 'mescladorJSON', 'separadorVariacoes', 'tradutor_final',
+        'agendador', 'progresso', 'metricas', 'perfil', 'manifesto', 'cache_etapas', 'trava_arquivo', 'indice_planilhas', 'openpyxl', 'pandas',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -4,14 +4,19 @@ import os
 import sys
 import tkinter as tk
 from tkinter import messagebox, ttk
-import http.server
-import socketserver
 import threading
 import socket
-import shutil
+import multiprocessing
+import queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'COMUM'))
+from pipeline_etl import ErroEtapa, PipelineETL, configurar_logging
+from progresso import Cancelado, Progresso
+from api_pipeline import ApiPipeline, ServidorPipeline
 
 SERVER_PROCESS = None
 HTTP_SERVER = None
+API_PIPELINE = None
 
 # Corrige o caminho base para funcionar como executável
 if getattr(sys, 'frozen', False):
@@ -38,31 +43,12 @@ def find_available_port(start_port=8000):
     for port in range(start_port, start_port + 100):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             try:
-                s.bind(('localhost', port))
+                s.bind(('127.0.0.1', port))
                 return port
             except OSError:
                 continue
     return None
 
-def get_python_executable():
-    """Retorna o caminho do Python correto"""
-    python_commands = ['python', 'python3', 'py']
-    
-    for cmd in python_commands:
-        try:
-            result = subprocess.run(
-                [cmd, '--version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return cmd
-        except:
-            continue
-    
-    return 'python'
-
 def restart_app():
     """Reinicia o aplicativo"""
     global HTTP_SERVER
@@ -113,28 +99,19 @@ def build_project():
         messagebox.showerror("Erro", f"Erro ao executar build:\n{str(e)}")
         return False
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    """Handler customizado para evitar logs no console"""
-    def log_message(self, format, *args):
-        pass
-
 def serve_static_files(port):
-    """Serve arquivos estáticos da pasta dist"""
-    global HTTP_SERVER
+    """Serve arquivos estáticos da pasta dist e a API de jobs (/api/)"""
+    global HTTP_SERVER, API_PIPELINE
     
     try:
-        original_dir = os.getcwd()
-        os.chdir(DIST_PATH)
-        
-        HTTP_SERVER = socketserver.TCPServer(("", port), MyHTTPRequestHandler)
+        if API_PIPELINE is None:
+            API_PIPELINE = ApiPipeline()
+        # Sem os.chdir: o pipeline roda neste mesmo processo com caminhos relativos
+        # Só na interface local: a API roda o pipeline e não deve ficar exposta na rede
+        HTTP_SERVER = ServidorPipeline(("127.0.0.1", port), DIST_PATH, API_PIPELINE)
         HTTP_SERVER.serve_forever()
     except Exception as e:
         print(f"Erro no servidor: {e}")
-    finally:
-        try:
-            os.chdir(original_dir)
-        except:
-            pass
 
 def start_server_thread():
     """Inicia o servidor em thread separada"""
@@ -234,189 +211,109 @@ def toggle_server():
         
         threading.Thread(target=desligar_thread, daemon=True).start()
 
-def run_script(script_path, cwd, script_name):
-    """Executa um script Python e retorna o resultado"""
-    try:
-        python_cmd = get_python_executable()
-        
-        result = subprocess.run(
-            [python_cmd, script_path],
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=300,
-            shell=False
-        )
-        
-        if result.returncode == 0:
-            return True, result.stdout
-        else:
-            return False, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, f"{script_name} demorou muito tempo (timeout)"
-    except Exception as e:
-        return False, str(e)
-
-def count_files(directory, extension=""):
-    """Conta arquivos em um diretório"""
-    try:
-        if not os.path.exists(directory):
-            return 0
-        files = [f for f in os.listdir(directory) if f.endswith(extension)]
-        return len(files)
-    except:
-        return 0
+# Sem nenhum sinal de vida das etapas por esse tempo, o processo é considerado travado
+LIMITE_SEM_PROGRESSO = 600
+INTERVALO_PROGRESSO_MS = 200
 
 def iniciar_processo():
     """Inicia o processo ETL completo"""
     
+    # PERGUNTA: Usar separadorVariacoes?
+    usar_separador = messagebox.askyesno(
+        "Separador de Variações",
+        "Deseja usar o separadorVariacoes.py?\n\n"
+        "Sim = Usa json_com_rgex\n"
+        "Não = Usa jsons_mesclados"
+    )
+    
     btn_processo.config(state="disabled", text="Processando...")
-    app.update()
+    status_label.config(text="⏳ Preparando...", fg="blue")
     
-    try:
-        # ETAPA 1: Conversor ETL (Excel → TXT)
-        status_label.config(text="⏳ Etapa 1/5: Conversor ETL (Excel → TXT)...", fg="blue")
-        app.update()
-        
-        conversor_path = os.path.join(MOTOR_PATH, "conversor_etl.py")
-        success, output = run_script(conversor_path, MOTOR_PATH, "conversor_etl")
-        
-        if not success:
-            messagebox.showerror("Erro no Conversor", f"Erro ao executar conversor_etl.py:\n{output}")
-            btn_processo.config(state="normal", text="Iniciar Processo")
-            status_label.config(text="✗ Erro no conversor", fg="red")
-            return
-        
-        txt_bruto_path = os.path.join(MOTOR_PATH, "txt_bruto")
-        txt_count = count_files(txt_bruto_path, ".txt")
-        
-        # ETAPA 2: Gerador JSON (TXT → JSON)
-        status_label.config(text="⏳ Etapa 2/5: Gerador JSON (TXT → JSON)...", fg="blue")
-        app.update()
-        
-        gerador_path = os.path.join(MOTOR_PATH, "geradorJSON.py")
-        success, output = run_script(gerador_path, MOTOR_PATH, "geradorJSON")
-        
-        if not success:
-            messagebox.showerror("Erro no Gerador JSON", f"Erro ao executar geradorJSON.py:\n{output}")
-            btn_processo.config(state="normal", text="Iniciar Processo")
-            status_label.config(text="✗ Erro no gerador JSON", fg="red")
-            return
-        
-        json_final_path = os.path.join(MOTOR_PATH, "json_final")
-        json_count = count_files(json_final_path, ".json")
-        
-        # ETAPA 3: Mesclador JSON
-        status_label.config(text="⏳ Etapa 3/5: Mesclador JSON...", fg="blue")
-        app.update()
-        
-        mesclador_path = os.path.join(MOTOR_PATH, "mescladorJSON.py")
-        success, output = run_script(mesclador_path, MOTOR_PATH, "mescladorJSON")
-        
-        if not success:
-            messagebox.showerror("Erro no Mesclador", f"Erro ao executar mescladorJSON.py:\n{output}")
-            btn_processo.config(state="normal", text="Iniciar Processo")
-            status_label.config(text="✗ Erro no mesclador", fg="red")
+    # A thread do pipeline só escreve na fila; a interface é atualizada pelo acompanhar_processo
+    fila = queue.Queue()
+    progresso = Progresso(fila.put)
+    
+    def executar():
+        try:
+            arquivo_log = configurar_logging(os.path.join(MOTOR_PATH, "logs"))
+            PipelineETL(
+                pasta_motor=MOTOR_PATH,
+                pasta_tradutor=TRADUTOR_PATH,
+                usar_separador=usar_separador,
+                arquivo_log=arquivo_log,
+                progresso=progresso
+            ).executar()
+        except (ErroEtapa, Cancelado):
+            pass  # o pipeline já enviou o evento de erro
+        except Exception as e:
+            progresso.falhar({'etapa': None, 'mensagem': str(e)})
+    
+    threading.Thread(target=executar, daemon=True).start()
+    app.after(INTERVALO_PROGRESSO_MS, acompanhar_processo, fila, progresso)
+
+def acompanhar_processo(fila, progresso):
+    """Lê os eventos do pipeline e atualiza a interface (roda na thread do Tk)"""
+    ultimo = None
+    while True:
+        try:
+            evento = fila.get_nowait()
+        except queue.Empty:
+            break
+        if evento.tipo == 'concluido':
+            processo_concluido(evento.dados)
             return
-        
-        jsons_mesclados_path = os.path.join(MOTOR_PATH, "jsons_mesclados")
-        mesclados_count = count_files(jsons_mesclados_path, ".json")
-        
-        # PERGUNTA: Usar separadorVariacoes?
-        status_label.config(text="⏸️ Aguardando escolha do usuário...", fg="orange")
-        app.update()
-        
-        usar_regex = messagebox.askyesno(
-            "Separador de Variações",
-            "Deseja usar o separadorVariacoes.py?\n\n"
-            "Sim = Usa json_com_rgex\n"
-            "Não = Usa jsons_mesclados"
-        )
-        
-        source_folder = ""
-        etapa_atual = 4
-        
-        if usar_regex:
-            # ETAPA 4: Separador de Variações
-            status_label.config(text="⏳ Etapa 4/5: Separador de Variações...", fg="blue")
-            app.update()
-            
-            separador_path = os.path.join(MOTOR_PATH, "separadorVariacoes.py")
-            success, output = run_script(separador_path, MOTOR_PATH, "separadorVariacoes")
-            
-            if not success:
-                messagebox.showerror("Erro no Separador", f"Erro ao executar separadorVariacoes.py:\n{output}")
-                btn_processo.config(state="normal", text="Iniciar Processo")
-                status_label.config(text="✗ Erro no separador", fg="red")
-                return
-            
-            source_folder = os.path.join(MOTOR_PATH, "json_com_rgex")
-            regex_count = count_files(source_folder, ".json")
-        else:
-            source_folder = jsons_mesclados_path
-        
-        # Copia JSONs para pasta do TRADUTOR
-        status_label.config(text=f"⏳ Etapa {etapa_atual}/5: Copiando JSONs...", fg="blue")
-        app.update()
-        
-        tradutor_jsons_path = os.path.join(TRADUTOR_PATH, "jsons")
-        
-        os.makedirs(tradutor_jsons_path, exist_ok=True)
-        
-        for file in os.listdir(tradutor_jsons_path):
-            file_path = os.path.join(tradutor_jsons_path, file)
-            try:
-                if os.path.isfile(file_path):
-                    os.unlink(file_path)
-            except Exception as e:
-                print(f"Erro ao deletar {file_path}: {e}")
-        
-        copied_count = 0
-        for file in os.listdir(source_folder):
-            if file.endswith(".json"):
-                src = os.path.join(source_folder, file)
-                dst = os.path.join(tradutor_jsons_path, file)
-                shutil.copy2(src, dst)
-                copied_count += 1
-        
-        # ETAPA FINAL: Tradutor
-        status_label.config(text="⏳ Etapa 5/5: Tradutor Final (JSON → Excel)...", fg="blue")
-        app.update()
-        
-        tradutor_script_path = os.path.join(TRADUTOR_PATH, "tradutor_final.py")
-        success, output = run_script(tradutor_script_path, TRADUTOR_PATH, "tradutor_final")
-        
-        if not success:
-            messagebox.showerror("Erro no Tradutor", f"Erro ao executar tradutor_final.py:\n{output}")
-            btn_processo.config(state="normal", text="Iniciar Processo")
-            status_label.config(text="✗ Erro no tradutor", fg="red")
+        if evento.tipo == 'erro':
+            processo_com_erro(evento.dados['etapa'], evento.dados['mensagem'])
             return
-        
-        saidas_path = os.path.join(TRADUTOR_PATH, "saidas")
-        excel_count = count_files(saidas_path, ".xlsx")
-        
-        # SUCESSO!
-        status_label.config(text="✓ Processo concluído com sucesso!", fg="green")
-        
-        response = messagebox.askyesno(
-            "Processo Concluído! 🎉",
-            f"Todo o processo ETL foi executado com sucesso!\n\n"
-            f"📄 {txt_count} arquivos TXT\n"
-            f"📋 {json_count} JSONs individuais\n"
-            f"🔗 {mesclados_count} JSONs mesclados\n"
-            f"📊 {copied_count} JSONs copiados\n"
-            f"📁 {excel_count} planilhas Excel geradas\n\n"
-            f"Deseja abrir a pasta de saída?"
+        ultimo = evento
+    
+    if ultimo is not None:
+        status_label.config(
+            text=f"⏳ Etapa {ultimo.numero}/{ultimo.total}: {ultimo.descricao}\n"
+                 f"{ultimo.arquivos_feitos} arquivos, {ultimo.linhas_feitas} linhas "
+                 f"({ultimo.linhas_por_segundo:.0f} linhas/s)",
+            fg="blue"
         )
-        
-        if response:
-            os.startfile(saidas_path)
-        
-    except Exception as e:
-        messagebox.showerror("Erro Inesperado", f"Erro durante o processo:\n{str(e)}")
+    
+    parado = progresso.parado_ha()
+    if parado > LIMITE_SEM_PROGRESSO:
+        # A thread não pode ser encerrada à força: ela para no próximo sinal de vida
+        progresso.cancelar()
+        processo_com_erro("processo", f"Nenhum progresso há {parado:.0f} s; o processo foi interrompido.")
+        return
+    
+    app.after(INTERVALO_PROGRESSO_MS, acompanhar_processo, fila, progresso)
+
+def processo_concluido(contagens):
+    saidas_path = os.path.join(TRADUTOR_PATH, "saidas")
+    
+    # SUCESSO!
+    status_label.config(text="✓ Processo concluído com sucesso!", fg="green")
+    btn_processo.config(state="normal", text="Iniciar Processo")
+    
+    response = messagebox.askyesno(
+        "Processo Concluído! 🎉",
+        f"Todo o processo ETL foi executado com sucesso!\n\n"
+        f"📄 {contagens['txt']} arquivos TXT\n"
+        f"📋 {contagens['json']} JSONs individuais\n"
+        f"🔗 {contagens['mesclados']} JSONs mesclados\n"
+        f"📊 {contagens['entregues']} JSONs entregues ao tradutor\n"
+        f"📁 {contagens['excel']} planilhas Excel geradas\n"
+        f"🔁 {contagens['executadas']} tarefas executadas, {contagens['em_dia']} já em dia\n\n"
+        f"Deseja abrir a pasta de saída?"
+    )
+    
+    if response:
+        os.startfile(saidas_path)
+
+def processo_com_erro(etapa, mensagem):
+    if etapa:
+        messagebox.showerror(f"Erro no {etapa}", f"Erro ao executar {etapa}:\n{mensagem}")
+        status_label.config(text=f"✗ Erro no {etapa.lower()}", fg="red")
+    else:
+        messagebox.showerror("Erro Inesperado", f"Erro durante o processo:\n{mensagem}")
         status_label.config(text="✗ Erro no processo", fg="red")
-    finally:
-        btn_processo.config(state="normal", text="Iniciar Processo")
+    btn_processo.config(state="normal", text="Iniciar Processo")
 
 def open_configs():
     if os.path.exists(CONFIG_PATH):
@@ -431,104 +328,110 @@ def open_planilhas():
         messagebox.showerror("Erro", f"Pasta planilhas não encontrada em:\n{PLANILHAS_PATH}")
 
 # Interface
-app = tk.Tk()
-app.title("Lui Home - ETL Manager")
-app.geometry("550x550")
-app.configure(bg="#e7e7e7")
-app.resizable(False, False)
-
-main_frame = tk.Frame(app, bg="#e7e7e7")
-main_frame.pack(fill="both", expand=True, padx=15, pady=15)
-
-# Seção Servidor
-server_frame = tk.Frame(main_frame, bg="#ffffff", padx=20, pady=15)
-server_frame.pack(fill="x", pady=(0, 10))
-
-server_title = tk.Label(server_frame, text="Servidor de Configuração", 
-                        font=("Segoe UI", 12, "bold"), bg="#ffffff")
-server_title.pack(pady=(0, 12))
-
-btn_toggle = tk.Button(
-    server_frame,
-    text="Ligar servidor",
-    width=25,
-    height=2,
-    command=toggle_server,
-    bg="#c8ffc8",
-    relief="flat",
-    font=("Segoe UI", 10)
-)
-btn_toggle.pack(pady=(0, 8))
-
-btn_build = tk.Button(
-    server_frame,
-    text="Gerar novo build",
-    width=25,
-    height=1,
-    command=build_project,
-    bg="#e0e0e0",
-    relief="flat",
-    font=("Segoe UI", 9)
-)
-btn_build.pack(pady=(0, 5))
-
-# Seção Processo ETL
-etl_frame = tk.Frame(main_frame, bg="#ffffff", padx=20, pady=15)
-etl_frame.pack(fill="x", pady=(0, 10))
-
-etl_title = tk.Label(etl_frame, text="Processamento ETL", 
-                     font=("Segoe UI", 12, "bold"), bg="#ffffff")
-etl_title.pack(pady=(0, 12))
-
-btn_processo = tk.Button(
-    etl_frame,
-    text="Iniciar Processo",
-    width=25,
-    height=2,
-    command=lambda: threading.Thread(target=iniciar_processo, daemon=True).start(),
-    bg="#aac8ff",
-    relief="flat",
-    font=("Segoe UI", 10, "bold")
-)
-btn_processo.pack(pady=(0, 10))
-
-status_label = tk.Label(etl_frame, text="", font=("Segoe UI", 8), bg="#ffffff", fg="#666", wraplength=450)
-status_label.pack(pady=(0, 5))
-
-if os.path.exists(DIST_PATH) and os.listdir(DIST_PATH):
-    status_label.config(text="✓ Pronto para iniciar", fg="green")
-else:
-    status_label.config(text="⚠ Build não encontrado (gere o build primeiro)", fg="orange")
-
-# Botões de acesso rápido
-bottom_frame = tk.Frame(main_frame, bg="#e7e7e7", padx=5, pady=10)
-bottom_frame.pack(fill="x", pady=(10, 0))
-
-btn_configs = tk.Button(
-    bottom_frame,
-    text="Abrir configs",
-    width=18,
-    command=open_configs,
-    bg="#dcdcdc",
-    relief="flat",
-    font=("Segoe UI", 9)
-)
-btn_configs.pack(side="left", padx=5, expand=True)
-
-btn_planilhas = tk.Button(
-    bottom_frame,
-    text="Abrir planilhas",
-    width=18,
-    command=open_planilhas,
-    bg="#dcdcdc",
-    relief="flat",
-    font=("Segoe UI", 9)
-)
-btn_planilhas.pack(side="right", padx=5, expand=True)
-
-def on_closing():
-    stop_server()
-    app.destroy()
-
-app.protocol("WM_DELETE_WINDOW", on_closing)
-app.mainloop()
+if __name__ == '__main__':
+    # Os processos do pool (api_pipeline, --paralelo) importam este módulo; só o principal abre a janela
+    multiprocessing.freeze_support()
+
+    app = tk.Tk()
+    app.title("Lui Home - ETL Manager")
+    app.geometry("550x550")
+    app.configure(bg="#e7e7e7")
+    app.resizable(False, False)
+
+    main_frame = tk.Frame(app, bg="#e7e7e7")
+    main_frame.pack(fill="both", expand=True, padx=15, pady=15)
+
+    # Seção Servidor
+    server_frame = tk.Frame(main_frame, bg="#ffffff", padx=20, pady=15)
+    server_frame.pack(fill="x", pady=(0, 10))
+
+    server_title = tk.Label(server_frame, text="Servidor de Configuração", 
+                            font=("Segoe UI", 12, "bold"), bg="#ffffff")
+    server_title.pack(pady=(0, 12))
+
+    btn_toggle = tk.Button(
+        server_frame,
+        text="Ligar servidor",
+        width=25,
+        height=2,
+        command=toggle_server,
+        bg="#c8ffc8",
+        relief="flat",
+        font=("Segoe UI", 10)
+    )
+    btn_toggle.pack(pady=(0, 8))
+
+    btn_build = tk.Button(
+        server_frame,
+        text="Gerar novo build",
+        width=25,
+        height=1,
+        command=build_project,
+        bg="#e0e0e0",
+        relief="flat",
+        font=("Segoe UI", 9)
+    )
+    btn_build.pack(pady=(0, 5))
+
+    # Seção Processo ETL
+    etl_frame = tk.Frame(main_frame, bg="#ffffff", padx=20, pady=15)
+    etl_frame.pack(fill="x", pady=(0, 10))
+
+    etl_title = tk.Label(etl_frame, text="Processamento ETL", 
+                         font=("Segoe UI", 12, "bold"), bg="#ffffff")
+    etl_title.pack(pady=(0, 12))
+
+    btn_processo = tk.Button(
+        etl_frame,
+        text="Iniciar Processo",
+        width=25,
+        height=2,
+        command=iniciar_processo,
+        bg="#aac8ff",
+        relief="flat",
+        font=("Segoe UI", 10, "bold")
+    )
+    btn_processo.pack(pady=(0, 10))
+
+    status_label = tk.Label(etl_frame, text="", font=("Segoe UI", 8), bg="#ffffff", fg="#666", wraplength=450)
+    status_label.pack(pady=(0, 5))
+
+    if os.path.exists(DIST_PATH) and os.listdir(DIST_PATH):
+        status_label.config(text="✓ Pronto para iniciar", fg="green")
+    else:
+        status_label.config(text="⚠ Build não encontrado (gere o build primeiro)", fg="orange")
+
+    # Botões de acesso rápido
+    bottom_frame = tk.Frame(main_frame, bg="#e7e7e7", padx=5, pady=10)
+    bottom_frame.pack(fill="x", pady=(10, 0))
+
+    btn_configs = tk.Button(
+        bottom_frame,
+        text="Abrir configs",
+        width=18,
+        command=open_configs,
+        bg="#dcdcdc",
+        relief="flat",
+        font=("Segoe UI", 9)
+    )
+    btn_configs.pack(side="left", padx=5, expand=True)
+
+    btn_planilhas = tk.Button(
+        bottom_frame,
+        text="Abrir planilhas",
+        width=18,
+        command=open_planilhas,
+        bg="#dcdcdc",
+        relief="flat",
+        font=("Segoe UI", 9)
+    )
+    btn_planilhas.pack(side="right", padx=5, expand=True)
+
+    def on_closing():
+        stop_server()
+        if API_PIPELINE is not None:
+            API_PIPELINE.encerrar()
+        app.destroy()
+
+    app.protocol("WM_DELETE_WINDOW", on_closing)
+    app.mainloop()
@@ -6,8 +6,83 @@ import sys
 import json
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'COMUM'))
+from progresso import arquivo_concluido, pulso
+from metricas import contar, gravar_contagens, origem, trecho
+from perfil import perfilado
+from indice_planilhas import IndicePlanilhas
+from cache_etapas import parte_config
+
+
+def normalizar_nome(nome):
+    return re.sub(r'[^a-zA-Z0-9]', '', str(nome).lower().strip())
+
+
+def config_para_planilha(pasta_config, nome_arquivo_excel):
+    """Config cujo 'files' mais se parece com o nome da planilha (a primeira, se nenhuma casar).
+
+    Só lê as configs, sem criar as pastas do conversor, para o pipeline planejar o grafo."""
+    config_dir = Path(pasta_config)
+    if not config_dir.exists():
+        logging.error("Pasta configs não encontrada")
+        exit(1)
+        
+    config_files = list(config_dir.glob('*.json'))
+    if not config_files:
+        logging.error(f"Nenhum arquivo JSON encontrado em {config_dir}/")
+        exit(1)
+    
+    nome_arquivo_sem_ext = Path(nome_arquivo_excel).stem
+    nome_arquivo_limpo = normalizar_nome(nome_arquivo_sem_ext)
+    correspondencias = []
+    
+    for config_file in config_files:
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config_temp = json.load(f)
+            
+            if 'files' in config_temp:
+                for tipo, info in config_temp['files'].items():
+                    if 'path' in info:
+                        nome_xlsx = Path(info['path']).stem
+                        nome_xlsx_limpo = normalizar_nome(nome_xlsx)
+                        score = 0
+                        
+                        if nome_xlsx_limpo == nome_arquivo_limpo:
+                            score = 100
+                        elif nome_arquivo_limpo.startswith(nome_xlsx_limpo):
+                            proporcao = len(nome_xlsx_limpo) / len(nome_arquivo_limpo) if nome_arquivo_limpo else 0
+                            score = 90 + (proporcao * 10)
+                        elif nome_xlsx_limpo.startswith(nome_arquivo_limpo):
+                            proporcao = len(nome_arquivo_limpo) / len(nome_xlsx_limpo) if nome_xlsx_limpo else 0
+                            score = 70 + (proporcao * 10)
+                        elif nome_xlsx_limpo in nome_arquivo_limpo:
+                            proporcao = len(nome_xlsx_limpo) / len(nome_arquivo_limpo) if nome_arquivo_limpo else 0
+                            if proporcao < 0.3:
+                                score = 30
+                            else:
+                                score = 50 + (proporcao * 20)
+                        
+                        if score > 0:
+                            correspondencias.append((config_file, score, nome_xlsx, tipo))
+        except Exception as e:
+            logging.warning(f"Erro ao ler config {config_file}: {e}")
+            continue
+    
+    if correspondencias:
+        correspondencias.sort(key=lambda x: (x[1], len(x[2])), reverse=True)
+        return correspondencias[0][0]
+    
+    return config_files[0]
+
+
 class ConversorPlanilhasTXT:
-    def __init__(self, config_path=None, pasta_origem='./planilhas', pasta_destino='./txt_bruto'):
+    def __init__(self, config_path=None, pasta_origem='./planilhas', pasta_destino='./txt_bruto', pasta_config='./configs', linhas_previa=None, pasta_indice=None, cache=None):
+        # Prévia: lê no máximo linhas_previa linhas de dados por aba (nrows no read_excel)
+        self.linhas_previa = linhas_previa
+        # cache_etapas.CacheEtapas: planilha e config já vistas saem de lá
+        self.cache = cache
+        self.pasta_config = Path(pasta_config)
         if config_path is None:
             config_path = self.encontrar_config()
         
@@ -15,9 +90,12 @@ class ConversorPlanilhasTXT:
         self.pasta_origem = Path(pasta_origem)
         self.pasta_destino = Path(pasta_destino)
         self.pasta_destino.mkdir(parents=True, exist_ok=True)
+        # Nomes das abas vêm do índice (cache por hash), sem abrir a planilha só para isso
+        self.indice = IndicePlanilhas(pasta_indice or self.pasta_origem.parent / 'cache' / 'indice_planilhas')
+        self.gerados = []
     
     def normalizar_nome(self, nome):
-        return re.sub(r'[^a-zA-Z0-9]', '', str(nome).lower().strip())
+        return normalizar_nome(nome)
 
     def normalizar_coluna(self, nome):
         if nome is None:
@@ -27,71 +105,20 @@ class ConversorPlanilhasTXT:
         return nome
 
     def encontrar_config(self):
-        config_dir = Path('./configs')
+        config_dir = self.pasta_config
         if not config_dir.exists():
             logging.error("Pasta configs não encontrada")
             exit(1)
             
         config_files = list(config_dir.glob('*.json'))
         if not config_files:
-            logging.error("Nenhum arquivo JSON encontrado em ./configs/")
+            logging.error(f"Nenhum arquivo JSON encontrado em {config_dir}/")
             exit(1)
         
         return config_files[0]
     
     def encontrar_config_para_arquivo(self, nome_arquivo_excel):
-        config_dir = Path('./configs')
-        if not config_dir.exists():
-            logging.error("Pasta configs não encontrada")
-            exit(1)
-            
-        config_files = list(config_dir.glob('*.json'))
-        if not config_files:
-            logging.error("Nenhum arquivo JSON encontrado em ./configs/")
-            exit(1)
-        
-        nome_arquivo_sem_ext = Path(nome_arquivo_excel).stem
-        nome_arquivo_limpo = self.normalizar_nome(nome_arquivo_sem_ext)
-        correspondencias = []
-        
-        for config_file in config_files:
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config_temp = json.load(f)
-                
-                if 'files' in config_temp:
-                    for tipo, info in config_temp['files'].items():
-                        if 'path' in info:
-                            nome_xlsx = Path(info['path']).stem
-                            nome_xlsx_limpo = self.normalizar_nome(nome_xlsx)
-                            score = 0
-                            
-                            if nome_xlsx_limpo == nome_arquivo_limpo:
-                                score = 100
-                            elif nome_arquivo_limpo.startswith(nome_xlsx_limpo):
-                                proporcao = len(nome_xlsx_limpo) / len(nome_arquivo_limpo) if nome_arquivo_limpo else 0
-                                score = 90 + (proporcao * 10)
-                            elif nome_xlsx_limpo.startswith(nome_arquivo_limpo):
-                                proporcao = len(nome_arquivo_limpo) / len(nome_xlsx_limpo) if nome_xlsx_limpo else 0
-                                score = 70 + (proporcao * 10)
-                            elif nome_xlsx_limpo in nome_arquivo_limpo:
-                                proporcao = len(nome_xlsx_limpo) / len(nome_arquivo_limpo) if nome_arquivo_limpo else 0
-                                if proporcao < 0.3:
-                                    score = 30
-                                else:
-                                    score = 50 + (proporcao * 20)
-                            
-                            if score > 0:
-                                correspondencias.append((config_file, score, nome_xlsx, tipo))
-            except Exception as e:
-                logging.warning(f"Erro ao ler config {config_file}: {e}")
-                continue
-        
-        if correspondencias:
-            correspondencias.sort(key=lambda x: (x[1], len(x[2])), reverse=True)
-            return correspondencias[0][0]
-        
-        return config_files[0]
+        return config_para_planilha(self.pasta_config, nome_arquivo_excel)
     
     def carregar_config(self, config_path):
         config_path = Path(config_path)
@@ -128,7 +155,7 @@ class ConversorPlanilhasTXT:
             colunas_config = pagina_config['columns']
 
         
-        df = pd.read_excel(arquivo, sheet_name=nome_aba, header=0, skiprows=skip_rows)
+        df = pd.read_excel(arquivo, sheet_name=nome_aba, header=0, skiprows=skip_rows, nrows=self.linhas_previa)
 
         if stop_row:
             limite_final = stop_row - start_row
@@ -153,8 +180,12 @@ class ConversorPlanilhasTXT:
         return df
 
 
-    def fase1_conversao_bruta(self):
+    @perfilado('conversor')
+    def fase1_conversao_bruta(self, arquivos=None):
         arquivos_do_config = list(self.pasta_origem.glob('*.xlsx')) + list(self.pasta_origem.glob('*.xls'))
+        if arquivos is not None:
+            nomes = {Path(a).name for a in arquivos}
+            arquivos_do_config = [a for a in arquivos_do_config if a.name in nomes]
         
         if not arquivos_do_config:
             logging.warning(f"Nenhum arquivo Excel encontrado em {self.pasta_origem}")
@@ -166,8 +197,19 @@ class ConversorPlanilhasTXT:
             try:
                 config_path = self.encontrar_config_para_arquivo(arquivo.name)
                 config_atual = self.carregar_config(config_path)
+
+                chave = None
+                if self.cache is not None:
+                    chave = self.cache.chave('conversor', arquivos=[arquivo], codigo=[__file__],
+                                             config=parte_config(config_atual, 'files', 'pages'),
+                                             linhas_previa=self.linhas_previa)
+                    entrada = self.cache.restaurar(chave, self.pasta_destino)
+                    if entrada is not None:
+                        self.gerados.extend(entrada['caminhos'])
+                        total_txt += len(entrada['caminhos'])
+                        continue
                 
-                xls = pd.ExcelFile(arquivo)
+                nomes_abas = self.indice.nomes_abas(arquivo)
                 
                 tipo_arquivo_atual = None
                 if 'files' in config_atual:
@@ -189,10 +231,10 @@ class ConversorPlanilhasTXT:
                         page_index = pagina.get('pageIndex', 0)
                         
                         nome_aba_encontrada = None
-                        if page_name and page_name in xls.sheet_names:
+                        if page_name and page_name in nomes_abas:
                             nome_aba_encontrada = page_name
-                        elif isinstance(page_index, int) and page_index < len(xls.sheet_names):
-                            nome_aba_encontrada = xls.sheet_names[page_index]
+                        elif isinstance(page_index, int) and page_index < len(nomes_abas):
+                            nome_aba_encontrada = nomes_abas[page_index]
                         
                         if nome_aba_encontrada:
                             if nome_aba_encontrada not in paginas_por_aba:
@@ -200,28 +242,33 @@ class ConversorPlanilhasTXT:
                             paginas_por_aba[nome_aba_encontrada].append(pagina)
                     
                     if not paginas_por_aba:
-                        for nome_aba in xls.sheet_names:
+                        for nome_aba in nomes_abas:
                             paginas_por_aba[nome_aba] = []
                 else:
-                    paginas_por_aba = {nome_aba: [] for nome_aba in xls.sheet_names}
+                    paginas_por_aba = {nome_aba: [] for nome_aba in nomes_abas}
                 
+                # Uma abertura da planilha para todas as abas lidas
+                xls = pd.ExcelFile(arquivo)
+                gerados_planilha, registros, contagens, com_erro = [], {}, [], False
                 for nome_aba, paginas_desta_aba in paginas_por_aba.items():
                     try:
-                        if paginas_desta_aba and tipo_arquivo_atual:
-                            pagina_config = paginas_desta_aba[0]
-                            df = self.processar_pagina_com_config(arquivo, nome_aba, pagina_config, tipo_arquivo_atual, config_atual)
-                        else:
-                            df = pd.read_excel(xls, sheet_name=nome_aba)
-                            df.columns = df.columns.str.replace('\n', ' ').str.strip()
-                            df = df.dropna(how='all')
-                            df = df.dropna(axis=1, how='all')
-                        
                         nome_base = arquivo.stem
                         nome_txt = f"{nome_base}_{nome_aba}.txt"
                         caminho_txt = self.pasta_destino / nome_txt
+
+                        with trecho('leitura_excel', nome_txt):
+                            if paginas_desta_aba and tipo_arquivo_atual:
+                                pagina_config = paginas_desta_aba[0]
+                                df = self.processar_pagina_com_config(xls, nome_aba, pagina_config, tipo_arquivo_atual, config_atual)
+                            else:
+                                df = pd.read_excel(xls, sheet_name=nome_aba, nrows=self.linhas_previa)
+                                df.columns = df.columns.str.replace('\n', ' ').str.strip()
+                                df = df.dropna(how='all')
+                                df = df.dropna(axis=1, how='all')
                         
-                        with open(caminho_txt, 'w', encoding='utf-8') as f:
+                        with trecho('escrita_txt', nome_txt), open(caminho_txt, 'w', encoding='utf-8') as f:
                             for idx, row in df.iterrows():
+                                pulso()
                                 f.write(f"========== REGISTRO {idx + 1} ==========\n")
                                 for col in df.columns:
                                     valor = row[col]
@@ -231,11 +278,26 @@ class ConversorPlanilhasTXT:
 
                                     f.write(f"{col_str}: {valor_str}\n")
                         
+                        self.gerados.append(caminho_txt)
+                        gerados_planilha.append(caminho_txt)
+                        registros[nome_txt] = len(df)
                         total_txt += 1
+                        # Linhas não vazias lidas da aba; cada uma vira um REGISTRO do TXT
+                        with gravar_contagens() as gravadas:
+                            contar('linhas_entrada', len(df), nome_txt)
+                            contar('linhas_saida', len(df), nome_txt)
+                            origem(nome_txt, arquivo.name)
+                        contagens.extend(gravadas)
                         logging.info(f"Gerado: {nome_txt} ({len(df)} registros)")
+                        arquivo_concluido(nome_txt, len(df))
                     except Exception as e:
+                        com_erro = True
                         logging.error(f"Erro ao processar aba {nome_aba} do arquivo {arquivo.name}: {str(e)}")
                         continue
+
+                # Com uma aba que falhou a planilha não vai para o cache: o erro precisa voltar a aparecer
+                if chave is not None and not com_erro:
+                    self.cache.guardar(chave, 'conversor', gerados_planilha, contagens, registros=registros)
                     
             except Exception as e:
                 logging.error(f"Erro ao processar {arquivo.name}: {str(e)}")
@@ -2,24 +2,36 @@ import json
 import logging
 from pathlib import Path
 import re
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'COMUM'))
+from memoria_json import gravar_json
+from progresso import arquivo_concluido, pulso
+from metricas import contar, gravar_contagens, origem, trecho
+from perfil import perfilado
+from cache_etapas import parte_config
 
 class GeradorJSON:
-    def __init__(self, config_path=None, pasta_txt='./txt_bruto', pasta_destino='./json_final'):
+    def __init__(self, config_path=None, pasta_txt='./txt_bruto', pasta_destino='./json_final', pasta_config='./configs', memoria=None, cache=None):
         self.config = None
         self.config_path = config_path
         self.pasta_txt = Path(pasta_txt)
         self.pasta_destino = Path(pasta_destino)
         self.pasta_destino.mkdir(exist_ok=True)
+        self.pasta_config = Path(pasta_config)
+        self.memoria = memoria
+        self.cache = cache
+        self.gerados = []
         
     def encontrar_config(self, nome_arquivo_txt=None):
-        config_dir = Path('./configs')
+        config_dir = self.pasta_config
         if not config_dir.exists():
             logging.error("Pasta configs não encontrada")
             exit(1)
             
         config_files = list(config_dir.glob('*.json'))
         if not config_files:
-            logging.error("Nenhum arquivo JSON encontrado em ./configs/")
+            logging.error(f"Nenhum arquivo JSON encontrado em {config_dir}/")
             exit(1)
         
         if nome_arquivo_txt is None:
@@ -237,6 +249,7 @@ class GeradorJSON:
         
         return False
     
+    @perfilado()
     def processar_arquivo_txt(self, arquivo_txt, tipo_arquivo=None, config=None):
         registros = []
         nomes_usados = {}
@@ -273,11 +286,14 @@ class GeradorJSON:
             conteudo = f.read()
         
         blocos = conteudo.split('========== REGISTRO ')[1:]
+        cabecalhos = 0
         
         for bloco in blocos:
+            pulso()
             linhas = bloco.split('\n')
             
             if self.registro_eh_header(linhas, colunas_source):
+                cabecalhos += 1
                 continue
             
             registro = {}
@@ -324,26 +340,50 @@ class GeradorJSON:
 
             registros.append(registro)
 
+        nome_json = Path(arquivo_txt).stem + '.json'
+        contar('linhas_entrada', len(blocos), nome_json)
+        contar('descartadas_cabecalho', cabecalhos, nome_json)
+        contar('linhas_saida', len(registros), nome_json)
+        origem(nome_json, Path(arquivo_txt).name)
         return registros
 
     
-    def gerar_json_final(self):
+    @perfilado('gerador')
+    def gerar_json_final(self, arquivos=None):
         arquivos_txt = list(self.pasta_txt.glob('*.txt'))
+        if arquivos is not None:
+            nomes = {Path(a).name for a in arquivos}
+            arquivos_txt = [a for a in arquivos_txt if a.name in nomes]
         total_gerados = 0
         
         for arquivo in arquivos_txt:
             config_path = self.encontrar_config(arquivo.name)
             config = self.carregar_config(config_path)
-            dados = self.processar_arquivo_txt(arquivo, config=config)
-            
             nome_json = arquivo.stem + '.json'
             caminho_json = self.pasta_destino / nome_json
+
+            chave = None
+            if self.cache is not None:
+                chave = self.cache.chave('gerador', arquivos=[arquivo], codigo=[__file__],
+                                         config=parte_config(config, 'files', 'columnMapping'))
+                entrada = self.cache.restaurar(chave, self.pasta_destino)
+                if entrada is not None:
+                    self.gerados.extend(entrada['caminhos'])
+                    total_gerados += 1
+                    continue
+
+            with trecho('parse_registros', nome_json), gravar_contagens() as contagens:
+                dados = self.processar_arquivo_txt(arquivo, config=config)
             
-            with open(caminho_json, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, ensure_ascii=False, indent=2)
+            with trecho('escrita_json', nome_json):
+                gravar_json(caminho_json, dados, self.memoria)
+            self.gerados.append(caminho_json)
+            if chave is not None:
+                self.cache.guardar(chave, 'gerador', [caminho_json], contagens, registros={nome_json: len(dados)})
             
             total_gerados += 1
             logging.info(f"Gerado: {nome_json} ({len(dados)} registros)")
+            arquivo_concluido(nome_json, len(dados))
         
         return total_gerados
 
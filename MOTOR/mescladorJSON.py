@@ -2,28 +2,44 @@ import json
 import logging
 from pathlib import Path
 import re
+import sys
 import unicodedata
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'COMUM'))
+from precos import converter_para_centavos, formatar_centavos_decimal
+from memoria_json import gravar_json, ler_json
+from progresso import arquivo_concluido, pulso
+from metricas import contar, gravar_contagens, origem, trecho
+from perfil import perfilado
+from cache_etapas import parte_config
+
+# Código que muda o mesclado, para a chave do cache das etapas
+CODIGO_CACHE = [__file__, str(Path(__file__).resolve().parent.parent / 'COMUM' / 'precos.py')]
+
 class GeradorJSONMesclado:
-    def __init__(self, config_path=None, pasta_json='./json_final', pasta_destino='./jsons_mesclados'):
+    def __init__(self, config_path=None, pasta_json='./json_final', pasta_destino='./jsons_mesclados', pasta_config='./configs', memoria=None, cache=None):
         self.config = None
         self.config_path = config_path
         self.pasta_json = Path(pasta_json)
         self.pasta_destino = Path(pasta_destino)
         self.pasta_destino.mkdir(exist_ok=True)
+        self.pasta_config = Path(pasta_config)
+        self.memoria = memoria
+        self.cache = cache
+        self.gerados = []
         
     def normalizar_nome(self, nome):
         return re.sub(r'[^a-zA-Z0-9]', '', str(nome).lower().strip())
     
     def encontrar_config(self, nome_arquivo_json=None):
-        config_dir = Path('./configs')
+        config_dir = self.pasta_config
         if not config_dir.exists():
             logging.error("Pasta configs não encontrada")
             exit(1)
             
         config_files = list(config_dir.glob('*.json'))
         if not config_files:
-            logging.error("Nenhum arquivo JSON encontrado em ./configs/")
+            logging.error(f"Nenhum arquivo JSON encontrado em {config_dir}/")
             exit(1)
         
         if nome_arquivo_json is None:
@@ -113,19 +129,25 @@ class GeradorJSONMesclado:
         return re.sub(r'\s+', ' ', str(nome).lower().strip())
     
     def formatar_valor(self, valor):
-        if not valor or valor == "" or valor is None:
-            return ""
-        
-        valor_limpo = re.sub(r'[^\d,\.]', '', str(valor))
-        valor_limpo = valor_limpo.replace(',', '.')
-        
-        try:
-            valor_float = float(valor_limpo)
-            return f"{valor_float:.2f}"
-        except (ValueError, TypeError):
-            return valor
-    
+        return self.formatar_valores([valor])[0]
+
+    def formatar_valores(self, valores):
+        """Formata uma lista de preços como "1234.56" numa única passada vetorizada.
+
+        Valores vazios viram "" e valores que não são preço são mantidos como vieram.
+        """
+        valores = list(valores)
+        if not valores:
+            return []
+
+        formatados = formatar_centavos_decimal(converter_para_centavos(valores))
+        return [
+            "" if not valor else (formatado if formatado is not None else valor)
+            for valor, formatado in zip(valores, formatados)
+        ]
+
     def expandir_variacoes_cores(self, dados, tipo_arquivo):
+        # Os preços das variações ficam brutos; mesclar_dados formata tudo de uma vez
         dados_expandidos = []
         
         for produto in dados:
@@ -137,9 +159,9 @@ class GeradorJSONMesclado:
                     novo_produto['COR'] = variacao.get('nome_cor', '')
                     
                     if tipo_arquivo == 'custo':
-                        novo_produto['CUSTO'] = self.formatar_valor(variacao.get('preco', ''))
+                        novo_produto['CUSTO'] = variacao.get('preco', '')
                     elif tipo_arquivo == 'venda':
-                        novo_produto['PRECO1'] = self.formatar_valor(variacao.get('preco', ''))
+                        novo_produto['PRECO1'] = variacao.get('preco', '')
                     
                     dados_expandidos.append(novo_produto)
             else:
@@ -147,8 +169,11 @@ class GeradorJSONMesclado:
         
         return dados_expandidos
     
-    def agrupar_arquivos_por_config(self):
+    def agrupar_arquivos_por_config(self, arquivos=None):
         arquivos_json = list(self.pasta_json.glob('*.json'))
+        if arquivos is not None:
+            nomes = {Path(a).name for a in arquivos}
+            arquivos_json = [a for a in arquivos_json if a.name in nomes]
         
         if not arquivos_json:
             logging.error(f"Nenhum arquivo JSON encontrado em {self.pasta_json}")
@@ -173,17 +198,19 @@ class GeradorJSONMesclado:
     def carregar_jsons_do_grupo(self, arquivos, config):
         dados_custo = []
         dados_venda = []
+        # Registros de custo como vieram do gerador, antes de virar uma linha por cor
+        lidos_custo = 0
         
         for arquivo in arquivos:
             try:
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    dados = json.load(f)
+                dados = ler_json(arquivo, self.memoria)
                 
                 tipo = self.identificar_tipo_arquivo(arquivo.name, config)
                 
                 if tipo == 'custo':
                     dados_expandidos = self.expandir_variacoes_cores(dados, 'custo')
                     dados_custo.extend(dados_expandidos)
+                    lidos_custo += len(dados)
                 elif tipo == 'venda':
                     dados_expandidos = self.expandir_variacoes_cores(dados, 'venda')
                     dados_venda.extend(dados_expandidos)
@@ -192,8 +219,17 @@ class GeradorJSONMesclado:
                 logging.error(f"Erro ao carregar {arquivo.name}: {e}")
                 continue
         
+        # O custo é o lado esquerdo do join: é ele que vira as linhas do mesclado
+        nome_mesclado = self.nome_arquivo_mesclado(config)
+        contar('linhas_entrada', lidos_custo, nome_mesclado)
+        contar('expandidas', len(dados_custo) - lidos_custo, nome_mesclado)
+        contar('linhas_venda', len(dados_venda), nome_mesclado)
+        origem(nome_mesclado, *(arquivo.name for arquivo in arquivos))
         return dados_custo, dados_venda
     
+    def nome_arquivo_mesclado(self, config):
+        return f"{self.obter_nome_arquivo_venda(config)}_mesclado.json"
+
     def obter_nome_arquivo_venda(self, config):
         if 'files' in config and 'venda' in config['files']:
             nome_venda = Path(config['files']['venda'].get('path', 'venda')).stem
@@ -236,6 +272,7 @@ class GeradorJSONMesclado:
         # Se não encontrou, assumir que é o nome do gabarito e retornar em maiúsculas
         return key_value.upper()
     
+    @perfilado()
     def mesclar_dados(self, dados_custo, dados_venda):
         merge_config = self.config.get('mergeConfig', {})
         
@@ -260,6 +297,7 @@ class GeradorJSONMesclado:
         logging.info(f"Merge usando leftKey: {left_key} (original: {left_key_raw}), rightKey: {right_key} (original: {right_key_raw}), includeVariation: {include_variation}")
         
         produtos_mesclados = []
+        com_preco_venda = []
 
         def gerar_chave_left(produto):
             """Gera chave para o arquivo left (custo) usando leftKey do gabarito"""
@@ -302,6 +340,7 @@ class GeradorJSONMesclado:
         # Mesclar dados usando leftKey para custo e rightKey para venda
         # Inner join: só incluir produtos que existem em ambos
         for produto_custo in dados_custo:
+            pulso()
             chave = gerar_chave_left(produto_custo)
             produto_mesclado = produto_custo.copy()
 
@@ -311,14 +350,18 @@ class GeradorJSONMesclado:
 
                 # Adicionar PRECO1 do produto de venda
                 if 'PRECO1' in produto_venda and produto_venda['PRECO1']:
-                    produto_mesclado['PRECO1'] = self.formatar_valor(produto_venda['PRECO1'])
-
-                # Formatar CUSTO se existir
-                if 'CUSTO' in produto_mesclado:
-                    produto_mesclado['CUSTO'] = self.formatar_valor(produto_mesclado['CUSTO'])
+                    produto_mesclado['PRECO1'] = produto_venda['PRECO1']
+                    com_preco_venda.append(produto_mesclado)
 
                 produtos_mesclados.append(produto_mesclado)
 
+        # Formatar PRECO1 e CUSTO de todos os produtos de uma vez (cada preço é convertido uma única vez)
+        com_custo = [produto for produto in produtos_mesclados if 'CUSTO' in produto]
+        for campo, produtos in (('PRECO1', com_preco_venda), ('CUSTO', com_custo)):
+            valores = self.formatar_valores(produto[campo] for produto in produtos)
+            for produto, valor in zip(produtos, valores):
+                produto[campo] = valor
+
         return produtos_mesclados
 
     
@@ -365,29 +408,51 @@ class GeradorJSONMesclado:
         config = self.carregar_config(config_path)
         self.config = config
         
-        dados_custo, dados_venda = self.carregar_jsons_do_grupo(arquivos, config)
+        nome_arquivo_final = self.nome_arquivo_mesclado(config)
+
+        chave = None
+        if self.cache is not None:
+            chave = self.cache.chave('mesclador', arquivos=arquivos, codigo=CODIGO_CACHE,
+                                     config=parte_config(config, 'files', 'columnMapping', 'mergeConfig'))
+            entrada = self.cache.restaurar(chave, self.pasta_destino)
+            if entrada is not None:
+                self.gerados.extend(entrada['caminhos'])
+                return entrada['registros'][nome_arquivo_final]
+
+        with trecho('carregar_jsons', nome_arquivo_final), gravar_contagens() as contagens:
+            dados_custo, dados_venda = self.carregar_jsons_do_grupo(arquivos, config)
         
         if not dados_custo and not dados_venda:
             return 0
         
-        produtos_mesclados = self.mesclar_dados(dados_custo, dados_venda)
-        produtos_com_codigo = self.gerar_codigos_produto(produtos_mesclados)
-        produtos_finais = self.converter_para_maiusculas(produtos_com_codigo)
-        produtos_finais = self.limpar_dados(produtos_finais)
-        
-        nome_arquivo_venda = self.obter_nome_arquivo_venda(config)
-        nome_arquivo_final = f"{nome_arquivo_venda}_mesclado.json"
+        with trecho('mesclar_dados', nome_arquivo_final):
+            produtos_mesclados = self.mesclar_dados(dados_custo, dados_venda)
+        with trecho('codigos_e_limpeza', nome_arquivo_final):
+            produtos_com_codigo = self.gerar_codigos_produto(produtos_mesclados)
+            produtos_finais = self.converter_para_maiusculas(produtos_com_codigo)
+            produtos_finais = self.limpar_dados(produtos_finais)
         
         caminho_json = self.pasta_destino / nome_arquivo_final
-        with open(caminho_json, 'w', encoding='utf-8') as f:
-            json.dump(produtos_finais, f, ensure_ascii=False, indent=2)
+        with trecho('escrita_json', nome_arquivo_final):
+            gravar_json(caminho_json, produtos_finais, self.memoria)
+        self.gerados.append(caminho_json)
+        # Inner join: linhas de custo (uma por cor) sem par na venda ficam de fora
+        with gravar_contagens() as gravadas:
+            contar('descartadas_sem_par', len(dados_custo) - len(produtos_mesclados), nome_arquivo_final)
+            contar('linhas_saida', len(produtos_finais), nome_arquivo_final)
+        contagens.extend(gravadas)
+        if chave is not None:
+            self.cache.guardar(chave, 'mesclador', [caminho_json], contagens,
+                               registros={nome_arquivo_final: len(produtos_finais)})
         
         logging.info(f"Gerado: {nome_arquivo_final} ({len(produtos_finais)} produtos)")
+        arquivo_concluido(nome_arquivo_final, len(produtos_finais))
         
         return len(produtos_finais)
     
-    def gerar_json_final(self):
-        grupos_por_config = self.agrupar_arquivos_por_config()
+    @perfilado('mesclador')
+    def gerar_json_final(self, arquivos=None):
+        grupos_por_config = self.agrupar_arquivos_por_config(arquivos)
         
         if not grupos_por_config:
             logging.error("Nenhum arquivo encontrado para processar")
@@ -405,11 +470,10 @@ def main():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
     
     gerador = GeradorJSONMesclado()
-    gerador.gerar_json_final()
-    
-    from separadorVariacoes import SeparadorVariacoes
-    separador = SeparadorVariacoes()
-    separador.processar_todos()
+    total = gerador.gerar_json_final()
+    logging.info(f"Mesclagem concluída: {total} produtos")
+    # Só mescla; os separadores e o tradutor rodam pelo pipeline completo
+    logging.info("Para separar variações e traduzir, rode: python pipeline_etl.py")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
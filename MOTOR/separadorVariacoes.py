@@ -1,12 +1,20 @@
 import json
 import re
+import sys
 from pathlib import Path
 import logging
 import unicodedata
 from itertools import product
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'COMUM'))
+from memoria_json import gravar_json, ler_json
+from progresso import arquivo_concluido, pulso
+from metricas import contar, gravar_contagens, origem, trecho
+from perfil import perfilado
+from cache_etapas import parte_config
+
 class SeparadorVariacoes:
-    def __init__(self, pasta_json_mesclado=None, pasta_config=None, pasta_destino=None):
+    def __init__(self, pasta_json_mesclado=None, pasta_config=None, pasta_destino=None, memoria=None, cache=None):
         script_dir = Path(__file__).parent.absolute()
         
         if pasta_json_mesclado is None:
@@ -20,6 +28,9 @@ class SeparadorVariacoes:
         self.pasta_config = Path(pasta_config)
         self.pasta_destino = Path(pasta_destino)
         self.pasta_destino.mkdir(exist_ok=True)
+        self.memoria = memoria
+        self.cache = cache
+        self.gerados = []
 
     def normalizar_nome(self, nome):
         """Normaliza nome de arquivo (mesma lógica dos outros módulos)"""
@@ -220,6 +231,7 @@ class SeparadorVariacoes:
         
         return variacoes if variacoes else [produto]
 
+    @perfilado()
     def gerar_produto_cartesiano(self, produto, separadores_config):
         """
         Gera todas as combinações possíveis (produto cartesiano) entre as variações
@@ -332,13 +344,6 @@ class SeparadorVariacoes:
 
     def processar_arquivo_com_config(self, arquivo_json, config_path):
         """Processa um arquivo JSON com uma config específica"""
-        try:
-            with open(arquivo_json, 'r', encoding='utf-8') as f:
-                produtos = json.load(f)
-        except Exception as e:
-            logging.error(f"Erro ao ler {arquivo_json}: {e}")
-            return False
-        
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
                 config = json.load(f)
@@ -354,28 +359,58 @@ class SeparadorVariacoes:
             logging.debug(f"Nenhum separador configurado em {config_path.name}, pulando...")
             return False
         
-        produtos_finais = []
-        
-        for produto in produtos:
-            produtos_gerados = self.gerar_produto_cartesiano(produto, separadores_config)
-            produtos_finais.extend(produtos_gerados)
-        
         # Gerar nome do arquivo de saída
         nome_base = arquivo_json.stem
         nome_config = config_path.stem
         nome_saida = f"{nome_base}_{nome_config}.json"
         arquivo_destino = self.pasta_destino / nome_saida
+
+        # O JSON só é lido depois da config: com separadores e saída no cache ele nem é aberto
+        chave = None
+        if self.cache is not None:
+            chave = self.cache.chave('separador', arquivos=[arquivo_json], codigo=[__file__],
+                                     config=parte_config(config, 'separadores'), nome_saida=nome_saida)
+            entrada = self.cache.restaurar(chave, self.pasta_destino)
+            if entrada is not None:
+                self.gerados.extend(entrada['caminhos'])
+                return True
+
+        try:
+            produtos = ler_json(arquivo_json, self.memoria)
+        except Exception as e:
+            logging.error(f"Erro ao ler {arquivo_json}: {e}")
+            return False
+
+        produtos_finais = []
         
-        with open(arquivo_destino, 'w', encoding='utf-8') as f:
-            json.dump(produtos_finais, f, ensure_ascii=False, indent=2)
+        with trecho('produto_cartesiano', nome_saida):
+            for produto in produtos:
+                pulso()
+                produtos_gerados = self.gerar_produto_cartesiano(produto, separadores_config)
+                produtos_finais.extend(produtos_gerados)
+        
+        with trecho('escrita_json', nome_saida):
+            gravar_json(arquivo_destino, produtos_finais, self.memoria)
+        self.gerados.append(arquivo_destino)
+        with gravar_contagens() as contagens:
+            contar('linhas_entrada', len(produtos), nome_saida)
+            contar('expandidas', len(produtos_finais) - len(produtos), nome_saida)
+            contar('linhas_saida', len(produtos_finais), nome_saida)
+            origem(nome_saida, arquivo_json.name)
+        if chave is not None:
+            self.cache.guardar(chave, 'separador', [arquivo_destino], contagens,
+                               registros={nome_saida: len(produtos_finais)})
         
         logging.info(f"Processado {arquivo_json.name} com {config_path.name}: {len(produtos)} produtos -> {len(produtos_finais)} produtos")
+        arquivo_concluido(nome_saida, len(produtos_finais))
         return True
 
-    def processar_todos(self):
+    @perfilado('separador')
+    def processar_todos(self, arquivos=None, configs=None):
         """
         Processa TODOS os arquivos JSON mesclados com TODAS as configs
         Seguindo a regra: para cada config, processar todos os arquivos
+        (ou só os mesclados em `arquivos` e as configs em `configs`, quando informados)
         """
         if not self.pasta_json_mesclado.exists():
             logging.warning(f"Pasta de JSONs mesclados não encontrada: {self.pasta_json_mesclado}")
@@ -388,6 +423,12 @@ class SeparadorVariacoes:
         arquivos_json = list(self.pasta_json_mesclado.glob('*_mesclado.json'))
         config_files = list(self.pasta_config.glob('*.json'))
         config_files = [f for f in config_files if f.name != '.gitkeep']
+        if arquivos is not None:
+            nomes = {Path(a).name for a in arquivos}
+            arquivos_json = [a for a in arquivos_json if a.name in nomes]
+        if configs is not None:
+            nomes_configs = {Path(c).name for c in configs}
+            config_files = [f for f in config_files if f.name in nomes_configs]
         
         if not arquivos_json:
             logging.warning(f"Nenhum arquivo JSON mesclado encontrado em {self.pasta_json_mesclado}")
@@ -0,0 +1,50 @@
+"""Codificação de colunas por fatoração (pd.factorize).
+
+A coluna é percorrida uma única vez: cada valor distinto recebe um índice
+inteiro e todo o resto (validação, ordenação, consulta ao dicionário
+persistente, formatação do código) é feito só sobre os valores distintos.
+As colunas de código geradas são categóricas, então cada código repetido
+ocupa um inteiro pequeno por linha em vez de uma string.
+"""
+import numpy as np
+import pandas as pd
+
+
+def codificar(serie, invalidos=(), ordenar=False, manter_nulos=False):
+    """Retorna (codigos, valores) para a coluna.
+
+    `valores` são os valores distintos válidos, na ordem da primeira ocorrência
+    (ou ordenados, com `ordenar=True`), e `codigos[i]` é a posição do valor da
+    linha i em `valores`, ou -1 quando o valor está em `invalidos` ou é nulo
+    (a menos que `manter_nulos=True`, em que o nulo vira um valor como outro).
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    unicos = pd.Index(unicos)
+    validos = ~unicos.isin(list(invalidos))
+    if not manter_nulos:
+        validos &= ~unicos.isna()
+
+    posicoes = np.flatnonzero(validos)
+    if ordenar:
+        posicoes = posicoes[np.argsort(unicos[posicoes].to_numpy(), kind='stable')]
+
+    # Posição em `unicos` -> posição em `valores` (-1 para os inválidos)
+    novo_indice = np.full(len(unicos), -1, dtype=np.int64)
+    novo_indice[posicoes] = np.arange(len(posicoes))
+
+    return novo_indice[codigos], unicos[posicoes]
+
+
+def categorica(codigos, rotulos, index=None, vazio=''):
+    """Monta a coluna categórica com rotulos[codigo] e `vazio` onde o código é -1."""
+    rotulos = list(rotulos)
+    codigos = np.where(codigos < 0, len(rotulos), codigos)
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=rotulos + [vazio]),
+        index=index,
+    )
+
+
+def rotulos_sequenciais(quantidade, inicio=1, largura=3):
+    """Códigos "001", "002", ... para `quantidade` valores."""
+    return [f"{numero:0{largura}d}" for numero in range(inicio, inicio + quantidade)]
@@ -0,0 +1,136 @@
+"""Dicionário persistente valor -> código sequencial, guardado em SQLite.
+
+Substitui o antigo cache/ncm_codes.json: cada consulta busca e cria os códigos
+de uma coluna inteira numa única transação, sem reescrever o arquivo todo, e o
+modo WAL com BEGIN IMMEDIATE impede que duas execuções simultâneas entreguem o
+mesmo código.
+"""
+import json
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS codigos (
+    dominio TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    numero INTEGER,
+    PRIMARY KEY (dominio, valor)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_codigos_numero ON codigos (dominio, numero);
+"""
+
+
+class DicionarioCodigos:
+    def __init__(self, caminho_db, dominio, largura=4, caminho_json_legado=None):
+        self.caminho_db = caminho_db
+        self.dominio = dominio
+        self.largura = largura
+
+        with self._conectar() as conn:
+            conn.executescript(_SCHEMA)
+
+        if caminho_json_legado and os.path.exists(caminho_json_legado):
+            self._importar_json_legado(caminho_json_legado)
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho_db, timeout=60, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transacao(self):
+        with self._conectar() as conn:
+            # IMMEDIATE pega a trava de escrita já no início: quem chegar depois espera
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _importar_json_legado(self, caminho_json):
+        try:
+            with open(caminho_json, 'r', encoding='utf-8') as f:
+                legado = json.load(f)
+        except Exception as e:
+            logger.warning(f"Não foi possível ler {caminho_json}: {e}")
+            return
+
+        with self._transacao() as conn:
+            existe = conn.execute(
+                "SELECT 1 FROM codigos WHERE dominio = ? LIMIT 1", (self.dominio,)
+            ).fetchone()
+            if not existe:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO codigos (dominio, valor, codigo, numero) VALUES (?, ?, ?, ?)",
+                    [
+                        (self.dominio, str(valor), str(codigo), int(codigo) if str(codigo).isdigit() else None)
+                        for valor, codigo in legado.items()
+                    ]
+                )
+                logger.info(f"Importados {len(legado)} códigos de {os.path.basename(caminho_json)}")
+
+        # Renomeia para não reimportar nem dar a impressão de que o JSON ainda é usado
+        try:
+            os.replace(caminho_json, caminho_json + '.migrado')
+        except OSError as e:
+            logger.warning(f"Não foi possível renomear {caminho_json}: {e}")
+
+    def obter_codigos(self, valores):
+        """Retorna {valor: codigo} para todos os valores, criando os que faltam.
+
+        Os códigos novos seguem a ordem em que os valores aparecem, a partir do
+        maior código numérico já existente no domínio.
+        """
+        valores = list(dict.fromkeys(str(v) for v in valores))
+        if not valores:
+            return {}
+
+        with self._transacao() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS consulta (valor TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM consulta")
+            conn.executemany("INSERT INTO consulta (valor) VALUES (?)", ((v,) for v in valores))
+
+            codigos = dict(conn.execute(
+                "SELECT c.valor, c.codigo FROM consulta q "
+                "JOIN codigos c ON c.dominio = ? AND c.valor = q.valor",
+                (self.dominio,)
+            ))
+
+            novos = [v for v in valores if v not in codigos]
+            if novos:
+                (maior,) = conn.execute(
+                    "SELECT MAX(numero) FROM codigos WHERE dominio = ?", (self.dominio,)
+                ).fetchone()
+                proximo = (maior or 0) + 1
+
+                linhas = []
+                for numero, valor in enumerate(novos, start=proximo):
+                    codigo = f"{numero:0{self.largura}d}"
+                    codigos[valor] = codigo
+                    linhas.append((self.dominio, valor, codigo, numero))
+
+                conn.executemany(
+                    "INSERT INTO codigos (dominio, valor, codigo, numero) VALUES (?, ?, ?, ?)",
+                    linhas
+                )
+
+        return codigos
+
+    def total(self):
+        with self._conectar() as conn:
+            (quantidade,) = conn.execute(
+                "SELECT COUNT(*) FROM codigos WHERE dominio = ?", (self.dominio,)
+            ).fetchone()
+        return quantidade
@@ -0,0 +1,99 @@
+"""Escrita das planilhas finais do tradutor em modo streaming.
+
+O openpyxl em modo write-only grava as linhas direto no arquivo temporário do
+.xlsx em vez de montar a planilha inteira em memória, e as larguras das colunas
+são calculadas a partir do DataFrame antes da escrita. Acima do limite de
+linhas de uma aba os dados continuam em novas abas (Dados, Dados_2, ...).
+Cada bloco de linhas escrito é um sinal de vida para quem acompanha o
+progresso, então um arquivo enorme não parece travado.
+"""
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+
+from progresso import pulso
+
+LARGURA_MAXIMA = 50
+
+# Limite do Excel é 1.048.576 linhas por aba, contando o cabeçalho
+LIMITE_LINHAS_ABA = 1048576 - 1
+
+# Linhas convertidas por vez; limita a memória extra usada na conversão
+LINHAS_POR_BLOCO = 10000
+
+_LADO_FINO = Side(style='thin')
+_BORDA_CABECALHO = Border(left=_LADO_FINO, right=_LADO_FINO, top=_LADO_FINO, bottom=_LADO_FINO)
+
+
+def calcular_larguras(df):
+    """Largura de cada coluna: maior texto (cabeçalho incluso) + 2, limitada a LARGURA_MAXIMA."""
+    larguras = []
+    for col in df.columns:
+        serie = df[col]
+        maior = serie.astype(str).where(serie.notna(), '').str.len().max() if len(serie) else 0
+        maior = max(int(maior or 0), len(str(col)))
+        larguras.append(min(maior + 2, LARGURA_MAXIMA))
+    return larguras
+
+
+def _celulas_cabecalho(ws, colunas):
+    celulas = []
+    for col in colunas:
+        celula = WriteOnlyCell(ws, value=str(col))
+        celula.font = Font(bold=True)
+        celula.border = _BORDA_CABECALHO
+        celula.alignment = Alignment(horizontal='center', vertical='top')
+        celulas.append(celula)
+    return celulas
+
+
+def _linhas(df):
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        pulso()
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+        colunas = [
+            bloco[col].astype(object).where(bloco[col].notna(), None).tolist()
+            for col in bloco.columns
+        ]
+        yield from zip(*colunas)
+
+
+def nome_parte(nome, numero):
+    """Nome da parte `numero` (a partir de 1): "Dados", "Dados_2", "Dados_3", ..."""
+    return nome if numero == 1 else f"{nome}_{numero}"
+
+
+def fatiar(df, linhas_por_parte):
+    """Divide o DataFrame em fatias de até `linhas_por_parte` linhas (sempre ao menos uma)."""
+    if linhas_por_parte < 1:
+        raise ValueError(f"linhas_por_parte precisa ser maior que zero: {linhas_por_parte!r}")
+    if len(df) <= linhas_por_parte:
+        return [df]
+    return [df.iloc[inicio:inicio + linhas_por_parte] for inicio in range(0, len(df), linhas_por_parte)]
+
+
+def escrever_excel(df, caminho, nome_aba='Dados', linhas_por_aba=LIMITE_LINHAS_ABA):
+    """Grava o DataFrame em um .xlsx sem índice, em memória constante.
+
+    Passando de `linhas_por_aba` os dados são divididos em várias abas.
+    Retorna [(aba, linhas), ...].
+    """
+    linhas_por_aba = min(linhas_por_aba, LIMITE_LINHAS_ABA)
+    wb = Workbook(write_only=True)
+    abas = []
+
+    for numero, parte in enumerate(fatiar(df, linhas_por_aba), start=1):
+        aba = nome_parte(nome_aba, numero)
+        ws = wb.create_sheet(aba)
+
+        for indice, largura in enumerate(calcular_larguras(parte), start=1):
+            ws.column_dimensions[get_column_letter(indice)].width = largura
+
+        ws.append(_celulas_cabecalho(ws, parte.columns))
+        for linha in _linhas(parte):
+            ws.append(linha)
+        abas.append((aba, len(parte)))
+
+    wb.save(caminho)
+    return abas
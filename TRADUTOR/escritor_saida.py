@@ -0,0 +1,111 @@
+"""Gravação das saídas do tradutor em .xlsx, .csv ou .parquet, dividida em partes.
+
+Cada parte tem no máximo `linhas_por_parte` linhas. No .xlsx as partes viram
+abas do mesmo arquivo ou arquivos separados (nome.xlsx, nome_2.xlsx, ...);
+CSV e Parquet não têm limite de linhas e só são divididos quando
+`linhas_por_parte` é informado. Os arquivos que cada saída gravou ficam
+anotados em um RegistroPartes, para que as partes de uma execução anterior
+dividida em mais arquivos sejam apagadas sem tocar em outra saída de nome
+parecido (foo_2.xlsx pode ser a saída de foo_2.json, não uma parte de foo).
+"""
+import importlib.util
+import json
+import os
+
+from escritor_excel import LIMITE_LINHAS_ABA, escrever_excel, fatiar, nome_parte
+from progresso import pulso
+from trava_arquivo import destravar_arquivo, travar_arquivo
+
+FORMATOS = ('xlsx', 'csv', 'parquet')
+
+
+def _escrever_csv(df, caminho):
+    # ; e BOM para o Excel brasileiro abrir direto, já que os preços usam vírgula decimal
+    df.to_csv(caminho, sep=';', index=False, encoding='utf-8-sig')
+
+
+def _escrever_parquet(df, caminho):
+    df.to_parquet(caminho, index=False)
+
+
+def verificar_formato(formato):
+    """Falha logo no início, antes de processar qualquer arquivo, se o formato não puder ser gravado."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída inválido: {formato!r} (use {', '.join(FORMATOS)})")
+    if formato == 'parquet' and not any(importlib.util.find_spec(m) for m in ('pyarrow', 'fastparquet')):
+        raise RuntimeError("Saída em Parquet requer o pacote 'pyarrow' (pip install pyarrow)")
+
+
+def verificar_linhas_por_parte(linhas_por_parte):
+    if linhas_por_parte is not None and (isinstance(linhas_por_parte, bool) or not isinstance(linhas_por_parte, int)
+                                         or linhas_por_parte < 1):
+        raise ValueError(f"linhas_por_parte precisa ser um inteiro maior que zero: {linhas_por_parte!r}")
+
+
+class RegistroPartes:
+    """Arquivos gravados por cada saída de `pasta`, em `arquivo` (JSON), atualizado sob trava."""
+
+    def __init__(self, arquivo, pasta):
+        self.arquivo = arquivo
+        self.pasta = os.path.abspath(pasta)
+
+    def _ler(self):
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def trocar(self, nome, arquivos):
+        """Anota `arquivos` como os de `nome` e retorna os que estavam anotados antes e que
+        nenhuma outra saída anotou depois (esses podem ser apagados)."""
+        with open(self.arquivo + '.lock', 'a+b') as trava:
+            travar_arquivo(trava)
+            try:
+                registro = self._ler()
+                saidas = registro.setdefault(self.pasta, {})
+                anteriores = saidas.get(nome, [])
+                # Quem gravou por último é o dono do arquivo
+                for outro, lista in list(saidas.items()):
+                    saidas[outro] = [arquivo for arquivo in lista if arquivo not in arquivos]
+                saidas[nome] = list(arquivos)
+                temporario = f"{self.arquivo}.{os.getpid()}.tmp"
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump(registro, f, ensure_ascii=False, indent=1)
+                os.replace(temporario, self.arquivo)
+            finally:
+                destravar_arquivo(trava)
+        outras = {arquivo for outro, lista in saidas.items() if outro != nome for arquivo in lista}
+        return [arquivo for arquivo in anteriores if arquivo not in outras]
+
+
+def escrever_saida(df, pasta, nome, formato='xlsx', linhas_por_parte=None, dividir_em='abas', nome_aba='Dados'):
+    """Grava o DataFrame em `pasta` e retorna as partes geradas: [(descricao, linhas), ...].
+
+    `dividir_em` vale só para .xlsx: 'abas' (várias abas em nome.xlsx) ou
+    'arquivos' (nome.xlsx, nome_2.xlsx, ...).
+    """
+    verificar_formato(formato)
+    verificar_linhas_por_parte(linhas_por_parte)
+
+    if formato == 'xlsx':
+        limite = min(linhas_por_parte or LIMITE_LINHAS_ABA, LIMITE_LINHAS_ABA)
+        if dividir_em == 'abas':
+            abas = escrever_excel(df, os.path.join(pasta, f"{nome}.xlsx"), nome_aba, linhas_por_aba=limite)
+            return [(f"{nome}.xlsx [{aba}]" if len(abas) > 1 else f"{nome}.xlsx", linhas) for aba, linhas in abas]
+        if dividir_em != 'arquivos':
+            raise ValueError(f"dividir_em inválido: {dividir_em!r} (use 'abas' ou 'arquivos')")
+    else:
+        limite = linhas_por_parte or max(len(df), 1)
+
+    escrever = {'xlsx': lambda parte, caminho: escrever_excel(parte, caminho, nome_aba),
+                'csv': _escrever_csv,
+                'parquet': _escrever_parquet}[formato]
+
+    partes = []
+    for numero, parte in enumerate(fatiar(df, limite), start=1):
+        pulso()
+        arquivo = f"{nome_parte(nome, numero)}.{formato}"
+        escrever(parte, os.path.join(pasta, arquivo))
+        partes.append((arquivo, len(parte)))
+    return partes
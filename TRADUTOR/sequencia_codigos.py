@@ -0,0 +1,205 @@
+"""Alocação de faixas de COD_PRODUTO a partir do start_cod_produto.txt.
+
+Cada arquivo de saída reserva, antes de ser gerado, uma faixa contígua de
+códigos do tamanho da sua quantidade de DESCRICAO distintas. O contador é
+atualizado na hora da reserva, sob uma trava de arquivo, então execuções em
+paralelo nunca recebem a mesma faixa.
+
+As reservas ainda não confirmadas ficam registradas em
+cache/reservas_cod_produto.json junto com o id da execução dona. Cada execução
+mantém travado o arquivo cache/execucoes/<id>.lock enquanto está viva; se a
+trava estiver livre, a execução morreu no meio e a faixa dela é recuperada:
+volta para o contador quando está no fim da sequência, ou é reaproveitada pela
+próxima reserva que couber nela. Assim uma execução interrompida não deixa
+buracos nem duplicidades.
+
+A faixa é confirmada antes de a saída aparecer em saidas/ (o tradutor grava
+em uma pasta temporária e só move depois da confirmação). Se a execução
+parar entre os dois passos, os códigos ficam como usados sem arquivo: um
+buraco na sequência, nunca uma faixa entregue que volta para as livres.
+"""
+import json
+import logging
+import os
+import sys
+import uuid
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'COMUM'))
+from trava_arquivo import destravar_arquivo as _destravar_arquivo, travar_arquivo as _travar_arquivo
+
+logger = logging.getLogger(__name__)
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class SequenciaCodigos:
+    def __init__(self, arquivo_cod, pasta_estado):
+        self.arquivo_cod = arquivo_cod
+        self.caminho_trava = arquivo_cod + '.lock'
+        self.caminho_reservas = os.path.join(pasta_estado, 'reservas_cod_produto.json')
+        self.pasta_execucoes = os.path.join(pasta_estado, 'execucoes')
+        os.makedirs(self.pasta_execucoes, exist_ok=True)
+
+        self.id_execucao = uuid.uuid4().hex
+        self._arquivo_execucao = open(self._caminho_execucao(self.id_execucao), 'a+b')
+        _travar_arquivo(self._arquivo_execucao)
+
+    def _caminho_execucao(self, id_execucao):
+        return os.path.join(self.pasta_execucoes, f"{id_execucao}.lock")
+
+    @contextmanager
+    def _travado(self):
+        with open(self.caminho_trava, 'a+b') as f:
+            _travar_arquivo(f)
+            try:
+                yield
+            finally:
+                _destravar_arquivo(f)
+
+    def _ler_contador(self):
+        if not os.path.exists(self.arquivo_cod):
+            return 1
+        with open(self.arquivo_cod, 'r') as f:
+            valor = f.read().strip()
+        if not valor.isdigit():
+            raise ValueError(f"Conteúdo inválido em {self.arquivo_cod}: {valor!r}")
+        return int(valor)
+
+    def _ler_estado(self):
+        if not os.path.exists(self.caminho_reservas):
+            return {'reservas': [], 'livres': []}
+        with open(self.caminho_reservas, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _gravar(self, contador, estado):
+        _gravar_atomico(self.caminho_reservas, json.dumps(estado, ensure_ascii=False, indent=2))
+        _gravar_atomico(self.arquivo_cod, str(contador))
+
+    def execucao_viva(self, id_execucao):
+        """Se a execução `id_execucao` ainda está rodando (a trava dela está presa)."""
+        if id_execucao == self.id_execucao:
+            return True
+        caminho = self._caminho_execucao(id_execucao)
+        if not os.path.exists(caminho):
+            return False
+        with open(caminho, 'a+b') as f:
+            if not _travar_arquivo(f, bloquear=False):
+                return True
+            _destravar_arquivo(f)
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        return False
+
+    def _compactar(self, contador, estado):
+        """Junta faixas livres vizinhas e devolve ao contador as que estão no fim."""
+        livres = sorted(estado['livres'])
+        juntas = []
+        for inicio, quantidade in livres:
+            if juntas and juntas[-1][0] + juntas[-1][1] == inicio:
+                juntas[-1][1] += quantidade
+            else:
+                juntas.append([inicio, quantidade])
+
+        while juntas and juntas[-1][0] + juntas[-1][1] == contador:
+            contador = juntas.pop()[0]
+
+        estado['livres'] = juntas
+        return contador
+
+    def _recuperar(self, contador, estado):
+        pendentes = []
+        for reserva in estado['reservas']:
+            if self.execucao_viva(reserva['execucao']):
+                pendentes.append(reserva)
+            else:
+                logger.warning(
+                    f"Recuperando faixa {reserva['inicio']}-{reserva['inicio'] + reserva['quantidade'] - 1} "
+                    f"de uma execução interrompida ({reserva['chave']})"
+                )
+                estado['livres'].append([reserva['inicio'], reserva['quantidade']])
+        estado['reservas'] = pendentes
+        return self._compactar(contador, estado)
+
+    def reservar(self, chave, quantidade):
+        """Reserva `quantidade` códigos contíguos para `chave` e retorna o primeiro."""
+        with self._travado():
+            contador = self._ler_contador()
+            estado = self._ler_estado()
+            contador = self._recuperar(contador, estado)
+
+            inicio = None
+            for faixa in estado['livres']:
+                if faixa[1] >= quantidade:
+                    inicio = faixa[0]
+                    faixa[0] += quantidade
+                    faixa[1] -= quantidade
+                    break
+            estado['livres'] = [faixa for faixa in estado['livres'] if faixa[1] > 0]
+
+            if inicio is None:
+                inicio = contador
+                contador += quantidade
+
+            estado['reservas'].append({
+                'execucao': self.id_execucao,
+                'chave': chave,
+                'inicio': inicio,
+                'quantidade': quantidade,
+            })
+            self._gravar(contador, estado)
+
+        return inicio
+
+    def _finalizar(self, chave, devolver):
+        with self._travado():
+            contador = self._ler_contador()
+            estado = self._ler_estado()
+            restantes = []
+            for reserva in estado['reservas']:
+                if reserva['execucao'] == self.id_execucao and chave in (None, reserva['chave']):
+                    if devolver:
+                        estado['livres'].append([reserva['inicio'], reserva['quantidade']])
+                else:
+                    restantes.append(reserva)
+            if len(restantes) == len(estado['reservas']):
+                return
+            estado['reservas'] = restantes
+            contador = self._compactar(contador, estado)
+            self._gravar(contador, estado)
+
+    def confirmar(self, chave):
+        """Marca a faixa de `chave` como usada (o arquivo de saída foi gravado)."""
+        self._finalizar(chave, devolver=False)
+
+    def liberar(self, chave):
+        """Devolve a faixa de `chave` (o arquivo de saída não foi gerado)."""
+        self._finalizar(chave, devolver=True)
+
+    def liberar_pendentes(self):
+        """Devolve todas as faixas desta execução que não foram confirmadas."""
+        self._finalizar(None, devolver=True)
+
+    def proximo_codigo(self):
+        with self._travado():
+            return self._ler_contador()
+
+    def fechar(self):
+        if self._arquivo_execucao is None:
+            return
+        _destravar_arquivo(self._arquivo_execucao)
+        self._arquivo_execucao.close()
+        self._arquivo_execucao = None
+        try:
+            os.remove(self._caminho_execucao(self.id_execucao))
+        except OSError:
+            pass
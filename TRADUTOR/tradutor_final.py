@@ -1,55 +1,83 @@
 import os
 import json
+import glob
+import hashlib
 import pandas as pd
 from datetime import datetime
 import logging
 import numpy as np
 import re
+import shutil
+import sys
+import tempfile
+import argparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from pandas.io.parsers import TextParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'COMUM'))
+from precos import converter_para_centavos, formatar_centavos_brasileiro
+from escritor_saida import FORMATOS, RegistroPartes, escrever_saida, verificar_formato, verificar_linhas_por_parte
+from dicionario_codigos import DicionarioCodigos
+from sequencia_codigos import SequenciaCodigos
+from codificador import categorica, codificar, rotulos_sequenciais
+from memoria_json import ler_json
+from progresso import arquivo_concluido, pulso
+from metricas import contar, origem, trecho
+from perfil import perfilado
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
+# Código que muda as saídas, para a chave do cache das etapas
+_PASTA_TRADUTOR = os.path.dirname(os.path.abspath(__file__))
+CODIGO_CACHE = sorted(glob.glob(os.path.join(_PASTA_TRADUTOR, '*.py'))) + [
+    os.path.join(_PASTA_TRADUTOR, '..', 'COMUM', 'precos.py')
+]
+
+# Pastas ocultas em saidas/ onde cada saída é gravada antes de a faixa de COD_PRODUTO ser confirmada
+PREFIXO_TEMPORARIO = '.novo_'
+
+# Segundos entre sinais de vida enquanto o processo principal espera os processos do modo paralelo
+INTERVALO_PULSO = 5
+
 class TradutorFinal:
-    def __init__(self, pasta_gabarito='gabarito', pasta_json='jsons', pasta_saida='saidas', pasta_cache='cache', arquivo_cod='start_cod_produto.txt'):
+    def __init__(self, pasta_gabarito='gabarito', pasta_json='jsons', pasta_saida='saidas', pasta_cache='cache', arquivo_cod='start_cod_produto.txt', processos=1, cor_persistente=False,
+                 formato='xlsx', linhas_por_parte=None, dividir_em='abas', memoria=None, cache=None):
         self.pasta_gabarito = pasta_gabarito
         self.pasta_json = pasta_json
         self.pasta_saida = pasta_saida
         self.pasta_cache = pasta_cache
         self.arquivo_cod = arquivo_cod
+        self.processos = processos if processos and processos > 0 else (os.cpu_count() or 1)
+        self.formato = formato
+        self.linhas_por_parte = linhas_por_parte
+        self.dividir_em = dividir_em
+        # JSONs já carregados por etapas anteriores quando roda dentro do pipeline_etl
+        self.memoria = memoria
+        # cache_etapas.CacheEtapas: saídas já geradas para os mesmos dados e a mesma faixa de COD_PRODUTO
+        self.cache = cache
+        verificar_formato(formato)
+        verificar_linhas_por_parte(linhas_por_parte)
 
         os.makedirs(self.pasta_saida, exist_ok=True)
         os.makedirs(self.pasta_cache, exist_ok=True)
 
-        # Aqui carregamos o código inicial do TXT
-        self.start_cod_produto = self._carregar_codigo_inicial()
-
+        # ncm_codes.json é o cache antigo; se existir, é importado uma vez para o SQLite
         self.cache_ncm_path = os.path.join(self.pasta_cache, 'ncm_codes.json')
-        self.ncm_cache = self._carregar_cache_ncm()
-
-    # =========================
-    # LEITURA E GRAVAÇÃO DO TXT
-    # =========================
-    def _carregar_codigo_inicial(self):
-        if not os.path.exists(self.arquivo_cod):
-            with open(self.arquivo_cod, 'w') as f:
-                f.write("1")
-            return 1
-        
-        try:
-            with open(self.arquivo_cod, 'r') as f:
-                valor = f.read().strip()
-                return int(valor)
-        except:
-            return 1
+        self.dicionario_ncm = DicionarioCodigos(
+            os.path.join(self.pasta_cache, 'codigos.sqlite3'), 'ncm', largura=4,
+            caminho_json_legado=self.cache_ncm_path
+        )
 
-    def _salvar_codigo_final(self, novo_codigo):
-        try:
-            with open(self.arquivo_cod, 'w') as f:
-                f.write(str(novo_codigo))
-        except:
-            pass
+        # Com cor_persistente, a mesma cor tem o mesmo COD_COR em todos os arquivos e execuções
+        self.dicionario_cor = None
+        if cor_persistente:
+            self.dicionario_cor = DicionarioCodigos(os.path.join(self.pasta_cache, 'codigos.sqlite3'), 'cor', largura=3)
 
-    # =========================
+        self.cache_gabarito_path = os.path.join(self.pasta_cache, 'gabarito_schema.json')
+        self.registro_partes = RegistroPartes(os.path.join(self.pasta_cache, 'partes_saidas.json'), self.pasta_saida)
+        self.gabarito = None
 
     def _limpar_texto(self, texto):
         if isinstance(texto, str):
@@ -75,41 +103,77 @@ class TradutorFinal:
         nome_extraido = self._extrair_nome_arquivo(nome_arquivo_json)
         return nome_extraido if nome_extraido else nome_base
 
-    def _carregar_cache_ncm(self):
-        if os.path.exists(self.cache_ncm_path):
-            try:
-                with open(self.cache_ncm_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _salvar_cache_ncm(self):
-        try:
-            with open(self.cache_ncm_path, 'w', encoding='utf-8') as f:
-                json.dump(self.ncm_cache, f, ensure_ascii=False, indent=2)
-        except:
-            pass
-
-    def _carregar_gabarito(self):
+    def _localizar_gabarito(self):
         arquivos = [f for f in os.listdir(self.pasta_gabarito) if f.endswith('.xlsx')]
         if not arquivos:
             raise FileNotFoundError("Nenhum arquivo .xlsx encontrado em 'gabarito/'")
+        return os.path.join(self.pasta_gabarito, arquivos[0])
 
-        path_gabarito = os.path.join(self.pasta_gabarito, arquivos[0])
-        
-        gabarito_df = pd.read_excel(path_gabarito, dtype=str)
-        gabarito_df = gabarito_df.fillna('')
+    def _ler_cache_gabarito(self, path_gabarito, stat):
+        if not os.path.exists(self.cache_gabarito_path):
+            return None
+        try:
+            with open(self.cache_gabarito_path, 'r', encoding='utf-8') as f:
+                schema = json.load(f)
+        except Exception:
+            return None
+
+        # O cache só vale para o mesmo arquivo, com o mesmo mtime e tamanho
+        if (schema.get('arquivo') != os.path.basename(path_gabarito)
+                or schema.get('mtime_ns') != stat.st_mtime_ns
+                or schema.get('tamanho') != stat.st_size):
+            return None
+        return schema
+
+    def _salvar_cache_gabarito(self, schema):
+        try:
+            with open(self.cache_gabarito_path, 'w', encoding='utf-8') as f:
+                json.dump(schema, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar o cache do gabarito: {e}")
+
+    def _ler_gabarito_excel(self, path_gabarito, stat):
+        # Uma leitura só, com os valores como estão nas células ('000001' continua texto)
+        gabarito_df = pd.read_excel(path_gabarito, dtype=object)
         colunas = list(gabarito_df.columns)
-        valores_padrao = gabarito_df.iloc[0].to_dict()
-        
-        return colunas, valores_padrao
+        primeira = list(gabarito_df.iloc[0])
+        # Tipos que o read_excel inferiria da primeira linha, pelo mesmo parser que ele usa
+        with TextParser([colunas, primeira], header=0) as parser:
+            tipos = parser.read().dtypes
+
+        return {
+            'arquivo': os.path.basename(path_gabarito),
+            'mtime_ns': stat.st_mtime_ns,
+            'tamanho': stat.st_size,
+            'colunas': colunas,
+            'valores_padrao': {col: '' if pd.isna(valor) else str(valor) for col, valor in zip(colunas, primeira)},
+            'tipos': {col: str(tipo) for col, tipo in tipos.items()},
+        }
+
+    def _carregar_gabarito(self):
+        """Retorna (colunas, valores_padrao) do gabarito, lendo o Excel no máximo uma vez por execução.
+
+        O schema fica persistido em cache/gabarito_schema.json e só é refeito
+        quando o mtime ou o tamanho do .xlsx mudam.
+        """
+        if self.gabarito is not None:
+            return self.gabarito['colunas'], self.gabarito['valores_padrao']
+
+        path_gabarito = self._localizar_gabarito()
+        stat = os.stat(path_gabarito)
+
+        schema = self._ler_cache_gabarito(path_gabarito, stat)
+        if schema is None:
+            schema = self._ler_gabarito_excel(path_gabarito, stat)
+            self._salvar_cache_gabarito(schema)
+
+        self.gabarito = schema
+        return schema['colunas'], schema['valores_padrao']
 
     def _ler_json_arquivo(self, nome_arquivo):
         try:
-            with open(os.path.join(self.pasta_json, nome_arquivo), 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                return dados if isinstance(dados, list) else [dados]
+            dados = ler_json(os.path.join(self.pasta_json, nome_arquivo), self.memoria)
+            return dados if isinstance(dados, list) else [dados]
         except:
             return []
 
@@ -125,127 +189,99 @@ class TradutorFinal:
         
         df['CLASSIFICACAO_FIS'] = df['CLASSIFICACAO_FIS'].astype(str).str.strip().str.upper()
         valores_invalidos = ['', 'NAN', 'NONE', 'NULL', 'NA']
-        
-        codigos_existentes = []
-        if self.ncm_cache:
-            codigos_existentes = [int(v) for v in self.ncm_cache.values() if v.isdigit()]
-
-        proximo_codigo = max(codigos_existentes) + 1 if codigos_existentes else 1
-        ncms_unicos = [ncm for ncm in df['CLASSIFICACAO_FIS'].unique() if ncm not in valores_invalidos]
-
-        novos_ncms = []
-        for ncm in ncms_unicos:
-            if ncm not in self.ncm_cache:
-                novo_codigo = f"{proximo_codigo:04d}"
-                self.ncm_cache[ncm] = novo_codigo
-                novos_ncms.append((ncm, novo_codigo))
-                proximo_codigo += 1
-
-        df['COD_CLASSIFICACAO_FIS'] = df['CLASSIFICACAO_FIS'].apply(
-            lambda ncm: self.ncm_cache.get(ncm, '') if ncm not in valores_invalidos else ''
-        )
 
-        if novos_ncms:
-            self._salvar_cache_ncm()
+        codigos, ncms = codificar(df['CLASSIFICACAO_FIS'], valores_invalidos)
+        mapa = self.dicionario_ncm.obter_codigos(ncms)
 
-        return df
-
-    def _converter_preco_para_numero(self, valor):
-        if valor is None:
-            return None
+        df['COD_CLASSIFICACAO_FIS'] = categorica(codigos, [mapa[ncm] for ncm in ncms], index=df.index)
 
-        valor_str = str(valor)
-        valor_str = valor_str.replace('\xa0', '').replace('\u200b', '').replace('\u200e', '').replace('\u200f', '')
-        valor_str = re.sub(r'[^\d.,]', '', valor_str)
-
-        if valor_str.startswith(','):
-            valor_str = '0' + valor_str
-
-        if valor_str.count(',') == 1:
-            valor_str = valor_str.replace('.', '')
+        return df
 
-        valor_str = valor_str.replace(',', '.')
-
-        try:
-            return float(valor_str)
-        except:
-            return None
+    # Colunas auxiliares com o preço já convertido em centavos
+    COLUNAS_CENTAVOS = {'CUSTO': '_custo', 'PRECO1': '_preco'}
 
     def _filtrar_produtos_invalidos(self, df):
-        df['_custo'] = df['CUSTO'].apply(self._converter_preco_para_numero)
-        df['_preco'] = df['PRECO1'].apply(self._converter_preco_para_numero)
-
-        df_validos = df[
-            ((df['_custo'].notna()) & (df['_custo'] > 0)) |
-            ((df['_preco'].notna()) & (df['_preco'] > 0))
-        ].copy()
+        df['_custo'] = converter_para_centavos(df['CUSTO'])
+        df['_preco'] = converter_para_centavos(df['PRECO1'])
 
-        df_validos = df_validos.drop(columns=['_custo', '_preco'], errors='ignore')
+        validos = (df['_custo'].fillna(0) > 0) | (df['_preco'].fillna(0) > 0)
+        df_validos = df[validos.to_numpy(dtype=bool)].copy()
 
+        # _custo e _preco seguem no DataFrame para _corrigir_valores não converter de novo
         return df_validos
 
     def _renumerar_cod_produto(self, df, start_cod):
         if 'DESCRICAO' not in df.columns:
-            return df
-
-        descricoes_unicas = df['DESCRICAO'].drop_duplicates().tolist()
-
-        mapeamento = {}
-        codigo_atual = start_cod
+            return df, start_cod
 
-        for descricao in descricoes_unicas:
-            mapeamento[descricao] = codigo_atual
-            codigo_atual += 1
+        codigos, descricoes = codificar(df['DESCRICAO'], manter_nulos=True)
+        df['COD_PRODUTO'] = codigos + start_cod
 
-        df['COD_PRODUTO'] = df['DESCRICAO'].map(mapeamento)
-
-        return df, codigo_atual
+        return df, start_cod + len(descricoes)
 
     def _gerar_cod_cor(self, df):
         if 'COR' not in df.columns:
             return df
         
         df['COR'] = df['COR'].astype(str).str.strip().str.upper()
-        cores_validas = df['COR'].replace(['', 'NAN', 'NONE', 'NULL'], pd.NA)
-        cores_unicas = sorted([c for c in cores_validas.dropna().unique() if c])
+        codigos, cores = codificar(df['COR'], ['', 'NAN', 'NONE', 'NULL'], ordenar=True)
 
-        cor_to_code = {cor: f"{i:03d}" for i, cor in enumerate(cores_unicas, start=1)}
-        
-        df['COD_COR'] = df['COR'].map(cor_to_code).fillna('')
+        if self.dicionario_cor is not None:
+            mapa = self.dicionario_cor.obter_codigos(cores)
+            rotulos = [mapa[cor] for cor in cores]
+        else:
+            rotulos = rotulos_sequenciais(len(cores))
+
+        df['COD_COR'] = categorica(codigos, rotulos, index=df.index)
 
         return df
 
-    def _formatar_numero_brasileiro(self, valor):
-        try:
-            num = float(valor)
-            inteira = int(num)
-            decimal = f"{num:.2f}".split('.')[1]
-            return f"{inteira:,}".replace(',', '.') + "," + decimal
-        except:
-            return valor
+    def _mascara_invalidos(self, serie, invalidos):
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Testa só as categorias; o código -1 (nulo) cai no True acrescentado no fim
+            categorias = serie.cat.categories.astype(str).str.strip().isin(invalidos)
+            return np.append(categorias, True)[serie.cat.codes.to_numpy()]
+
+        mascara = serie.isna()
+        if serie.dtype == 'object' or pd.api.types.is_string_dtype(serie.dtype):
+            mascara |= serie.astype(str).str.strip().isin(invalidos)
+        return mascara.to_numpy(dtype=bool)
 
+    @perfilado()
     def _corrigir_valores(self, df, colunas, valores_padrao):
-        for col in colunas:
-            if col not in df.columns:
-                df[col] = valores_padrao.get(col, '')
+        faltantes = [col for col in colunas if col not in df.columns]
+        if faltantes:
+            df = pd.concat(
+                [df, pd.DataFrame({col: valores_padrao.get(col, '') for col in faltantes}, index=df.index)],
+                axis=1
+            )
 
-        invalidos = {'', None, np.nan, 'NaN', 'nan', 'undefined', 'null', 'NULL', 'None'}
+        invalidos = ['', 'NaN', 'nan', 'undefined', 'null', 'NULL', 'None']
 
-        colunas_formatar = ['CUSTO', 'PRECO1']
-        for col in colunas_formatar:
-            if col in df.columns:
-                df[col] = df[col].apply(
-                    lambda v: self._formatar_numero_brasileiro(self._converter_preco_para_numero(v))
-                    if not (pd.isna(v) or str(v).strip() in invalidos)
-                    else valores_padrao.get(col, '')
-                )
+        for col, col_centavos in self.COLUNAS_CENTAVOS.items():
+            if col not in df.columns:
+                continue
+            if col_centavos in df.columns and col not in faltantes:
+                centavos = df[col_centavos]
+            else:
+                centavos = converter_para_centavos(df[col])
+            formatados = formatar_centavos_brasileiro(centavos)
+            formatados[pd.isna(formatados)] = valores_padrao.get(col, '')
+            df[col] = pd.Series(formatados, index=df.index, dtype=object)
 
         df = df[colunas]
 
+        # Colunas criadas acima já contêm o valor padrão e os preços já foram formatados
         for col in colunas:
-            df[col] = df[col].apply(
-                lambda v: valores_padrao.get(col, '') if (pd.isna(v) or str(v).strip() in invalidos) else v
-            )
+            if col in faltantes or col in self.COLUNAS_CENTAVOS:
+                continue
+            mascara = self._mascara_invalidos(df[col], invalidos)
+            if mascara.any():
+                padrao = valores_padrao.get(col, '')
+                serie = df[col]
+                if isinstance(serie.dtype, pd.CategoricalDtype) and padrao not in serie.cat.categories:
+                    serie = serie.cat.add_categories([padrao])
+                df[col] = serie.where(~mascara, padrao)
 
         if 'TAMANHO' in df.columns:
             df['TAMANHO'] = df['TAMANHO'].astype(str).replace(
@@ -254,68 +290,318 @@ class TradutorFinal:
 
         return df
 
-    def _processar_arquivo_json(self, nome_arquivo_json, start_cod_produto):
+    def _preparar_arquivo_json(self, nome_arquivo_json):
+        """Lê o JSON e aplica limpeza, NCM, filtro e COD_COR. Retorna None se não sobrar nenhum produto."""
+        pulso()
         nome_saida = self._obter_nome_saida(nome_arquivo_json)
-        colunas, valores_padrao = self._carregar_gabarito()
-        dados_json = self._ler_json_arquivo(nome_arquivo_json)
-        
+        with trecho('leitura_json', nome_saida):
+            dados_json = self._ler_json_arquivo(nome_arquivo_json)
         if not dados_json:
-            return 0, start_cod_produto
-        
-        df_json = pd.DataFrame(dados_json)
-        df_json = self._limpar_dataframe(df_json)
-        df_json = self._gerar_cod_classificacao_fis(df_json)
-        df_json = self._filtrar_produtos_invalidos(df_json)
+            return None
+        contar('linhas_entrada', len(dados_json), nome_saida)
+        origem(nome_saida, nome_arquivo_json)
+
+        with trecho('limpeza_e_filtro', nome_saida):
+            df_json = pd.DataFrame(dados_json)
+            df_json = self._limpar_dataframe(df_json)
+            df_json = self._gerar_cod_classificacao_fis(df_json)
+            df_json = self._filtrar_produtos_invalidos(df_json)
+        # Sem custo nem preço de venda
+        contar('descartadas_sem_preco', len(dados_json) - len(df_json), nome_saida)
 
         if len(df_json) == 0:
-            return 0, start_cod_produto
+            return None
+        return self._gerar_cod_cor(df_json)
 
-        df_json, novo_cod_produto = self._renumerar_cod_produto(df_json, start_cod_produto)
-        df_json = self._gerar_cod_cor(df_json)
-        df_final = self._corrigir_valores(df_json, colunas, valores_padrao)
+    def _quantidade_codigos(self, df):
+        return df['DESCRICAO'].nunique(dropna=False) if 'DESCRICAO' in df.columns else 0
 
-        path_saida = os.path.join(self.pasta_saida, f"{nome_saida}.xlsx")
-        
-        with pd.ExcelWriter(path_saida, engine='openpyxl') as writer:
-            df_final.to_excel(writer, index=False, sheet_name='Dados')
-            
-            workbook = writer.book
-            worksheet = writer.sheets['Dados']
-            
-            if hasattr(worksheet, 'merged_cells'):
-                for merged_cell in list(worksheet.merged_cells):
-                    worksheet.unmerge_cells(str(merged_cell))
-            
-            for column in worksheet.columns:
-                max_length = 0
-                col_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                worksheet.column_dimensions[col_letter].width = min(max_length + 2, 50)
-        
-        logger.info(f"Gerado: {nome_saida}.xlsx ({len(df_final)} registros)")
-        return len(df_final), novo_cod_produto
+    def _gerar_saida(self, df_json, nome_saida, start_cod_produto, pasta=None):
+        pulso()
+        colunas, valores_padrao = self._carregar_gabarito()
 
-    def processar(self):
-        arquivos_json = self._listar_arquivos_json()
+        df_json, _ = self._renumerar_cod_produto(df_json, start_cod_produto)
+        with trecho('correcao_valores', nome_saida):
+            df_final = self._corrigir_valores(df_json, colunas, valores_padrao)
+
+        with trecho(f'escrita_{self.formato}', nome_saida):
+            return escrever_saida(
+                df_final, pasta or self.pasta_saida, nome_saida, self.formato,
+                linhas_por_parte=self.linhas_por_parte, dividir_em=self.dividir_em, nome_aba='Dados'
+            )
+
+    def _chave_cache(self, df_json, nome_saida, start_cod_produto):
+        """Chave do cache para o DataFrame já preparado: NCM e COD_COR estão nele, então
+        dicionários diferentes dão chaves diferentes. None sem cache."""
+        if self.cache is None:
+            return None
+        self._carregar_gabarito()
+        return self.cache.chave(
+            'tradutor', codigo=CODIGO_CACHE, dados=_hash_dataframe(df_json), nome_saida=nome_saida, start_cod_produto=start_cod_produto,
+            gabarito={k: self.gabarito.get(k) for k in ('colunas', 'valores_padrao', 'tipos')},
+            formato=self.formato, linhas_por_parte=self.linhas_por_parte, dividir_em=self.dividir_em
+        )
+
+    def _saida_do_cache(self, chave, nome_saida, pasta):
+        """Partes da saída restaurada do cache em `pasta`, ou None."""
+        if chave is None:
+            return None
+        entrada = self.cache.restaurar(chave, pasta)
+        if entrada is None:
+            return None
+        contar('do_cache', 1, nome_saida)
+        return [tuple(parte) for parte in entrada['partes']]
+
+    def _arquivos_partes(self, partes):
+        # "nome.xlsx [Dados_2]" -> nome.xlsx
+        return list(dict.fromkeys(descricao.split(' [')[0] for descricao, _ in partes))
+
+    def _guardar_saida(self, chave, partes, pasta):
+        if chave is None:
+            return
+        arquivos = [os.path.join(pasta, arquivo) for arquivo in self._arquivos_partes(partes)]
+        self.cache.guardar(chave, 'tradutor', arquivos, partes=partes)
+
+    def _pasta_temporaria(self):
+        # O id da execução no nome: a pasta de uma execução que morreu no meio é apagada pela próxima
+        return tempfile.mkdtemp(prefix=f"{PREFIXO_TEMPORARIO}{self.sequencia.id_execucao}_", dir=self.pasta_saida)
+
+    def _limpar_temporarias(self):
+        for caminho in glob.glob(os.path.join(glob.escape(self.pasta_saida), f"{PREFIXO_TEMPORARIO}*")):
+            id_execucao = os.path.basename(caminho)[len(PREFIXO_TEMPORARIO):].split('_')[0]
+            if not self.sequencia.execucao_viva(id_execucao):
+                shutil.rmtree(caminho, ignore_errors=True)
+
+    def _publicar(self, nome_saida, temporaria, partes):
+        """Confirma a faixa de COD_PRODUTO e só então move a saída de `temporaria` para `pasta_saida`.
+
+        Parando entre os dois passos sobra um buraco na sequência, nunca um
+        arquivo entregue com códigos que voltam para a lista de livres.
+        """
+        self.sequencia.confirmar(nome_saida)
+        arquivos = self._arquivos_partes(partes)
+        for arquivo in arquivos:
+            os.replace(os.path.join(temporaria, arquivo), os.path.join(self.pasta_saida, arquivo))
+        shutil.rmtree(temporaria, ignore_errors=True)
+        # nome_3.xlsx de uma execução anterior com mais partes não fica misturado com as novas;
+        # só sai o que esta mesma saída gravou antes, nunca a saída de outro JSON
+        for arquivo in self.registro_partes.trocar(nome_saida, arquivos):
+            if arquivo in arquivos:
+                continue
+            try:
+                os.remove(os.path.join(self.pasta_saida, arquivo))
+            except FileNotFoundError:
+                continue
+            logger.info(f"Removida parte antiga: {arquivo}")
+
+    def _descartar(self, nome_saida, temporaria):
+        self.sequencia.liberar(nome_saida)
+        shutil.rmtree(temporaria, ignore_errors=True)
+
+    def _registrar_saida(self, nome_saida, partes):
+        qtd = sum(linhas for _, linhas in partes)
+        if len(partes) == 1:
+            logger.info(f"Gerado: {partes[0][0]} ({qtd} registros)")
+        else:
+            logger.info(f"Gerado: {nome_saida} ({qtd} registros em {len(partes)} partes)")
+            for descricao, linhas in partes:
+                logger.info(f"  {descricao}: {linhas} registros")
+        self.partes_geradas.append(partes)
+        contar('linhas_saida', qtd, nome_saida)
+        arquivo_concluido(nome_saida, qtd)
+        for arquivo in self._arquivos_partes(partes):
+            caminho = os.path.join(self.pasta_saida, arquivo)
+            if caminho not in self.arquivos_gerados:
+                self.arquivos_gerados.append(caminho)
+        return qtd
+
+    def _processar_arquivo_json(self, nome_arquivo_json):
+        nome_saida = self._obter_nome_saida(nome_arquivo_json)
+        df_json = self._preparar_arquivo_json(nome_arquivo_json)
+        if df_json is None:
+            return 0
+
+        # Reserva a faixa de COD_PRODUTO deste arquivo antes de gerar a saída
+        start_cod_produto = self.sequencia.reservar(nome_saida, self._quantidade_codigos(df_json))
+        temporaria = self._pasta_temporaria()
+        try:
+            chave = self._chave_cache(df_json, nome_saida, start_cod_produto)
+            partes = self._saida_do_cache(chave, nome_saida, temporaria)
+            if partes is None:
+                partes = self._gerar_saida(df_json, nome_saida, start_cod_produto, temporaria)
+                self._guardar_saida(chave, partes, temporaria)
+        except BaseException:
+            self._descartar(nome_saida, temporaria)
+            raise
+        self._publicar(nome_saida, temporaria, partes)
+
+        return self._registrar_saida(nome_saida, partes)
+
+    def _processar_em_paralelo(self, arquivos_json):
+        """Prepara os arquivos aqui, na ordem do modo serial, e grava as saídas nos processos.
+
+        A preparação registra os NCMs (e cores persistentes) novos e reserva a faixa de COD_PRODUTO de
+        cada arquivo na mesma ordem da execução serial, então os códigos saem
+        iguais; os processos só fazem a correção dos valores e a escrita do .xlsx.
+        """
+        # O gabarito vai para o cache antes de os processos começarem
+        self._carregar_gabarito()
         total = 0
-        codigo_atual = self.start_cod_produto
+        pendentes = deque()
 
-        for nome_arquivo in arquivos_json:
-            qtd, codigo_atual = self._processar_arquivo_json(nome_arquivo, codigo_atual)
-            total += qtd
+        def concluir_mais_antigo():
+            # Só sai da fila quando termina: num erro ou cancelamento, a pasta temporária é apagada com as outras
+            nome_saida, chave, temporaria, futuro = pendentes[0]
+            try:
+                # Um arquivo grande demora no processo; o pulso mostra que a execução segue viva
+                while not futuro.done():
+                    wait([futuro], timeout=INTERVALO_PULSO)
+                    pulso()
+                partes = futuro.result()
+            except BaseException:
+                self.sequencia.liberar(nome_saida)
+                raise
+            pendentes.popleft()
+            self._guardar_saida(chave, partes, temporaria)
+            self._publicar(nome_saida, temporaria, partes)
+            return self._registrar_saida(nome_saida, partes)
+
+        parametros = {
+            'pasta_gabarito': self.pasta_gabarito, 'pasta_json': self.pasta_json,
+            'pasta_saida': self.pasta_saida, 'pasta_cache': self.pasta_cache, 'arquivo_cod': self.arquivo_cod,
+            'formato': self.formato, 'linhas_por_parte': self.linhas_por_parte, 'dividir_em': self.dividir_em,
+        }
+        with ProcessPoolExecutor(max_workers=self.processos, initializer=_iniciar_processo, initargs=(parametros,)) as executor:
+            try:
+                for nome_arquivo in arquivos_json:
+                    df_json = self._preparar_arquivo_json(nome_arquivo)
+                    if df_json is None:
+                        continue
+                    nome_saida = self._obter_nome_saida(nome_arquivo)
+                    start_cod_produto = self.sequencia.reservar(nome_saida, self._quantidade_codigos(df_json))
+                    temporaria = self._pasta_temporaria()
+                    chave = self._chave_cache(df_json, nome_saida, start_cod_produto)
+                    partes = self._saida_do_cache(chave, nome_saida, temporaria)
+                    if partes is None:
+                        futuro = executor.submit(_traduzir_arquivo, df_json, nome_saida, start_cod_produto, temporaria)
+                    else:
+                        # Já pronto, mas entra na fila para as saídas serem registradas na ordem do modo serial
+                        futuro = Future()
+                        futuro.set_result(partes)
+                    pendentes.append((nome_saida, chave, temporaria, futuro))
+                    del df_json
+
+                    # Limita quantos DataFrames ficam na fila esperando um processo livre
+                    while len(pendentes) > self.processos:
+                        total += concluir_mais_antigo()
+
+                while pendentes:
+                    total += concluir_mais_antigo()
+            except BaseException:
+                for _, _, _, futuro in pendentes:
+                    futuro.cancel()
+                # As faixas voltam no liberar_pendentes; com o pool já encerrado, as pastas podem sair
+                executor.shutdown(wait=True, cancel_futures=True)
+                for _, _, temporaria, _ in pendentes:
+                    shutil.rmtree(temporaria, ignore_errors=True)
+                raise
+
+        return total
+
+    @perfilado('tradutor')
+    def processar(self, arquivos=None):
+        """Traduz os JSONs da pasta, ou só os de nome em `arquivos`, quando informado."""
+        arquivos_json = self._listar_arquivos_json()
+        if arquivos is not None:
+            nomes = {os.path.basename(a) for a in arquivos}
+            arquivos_json = [a for a in arquivos_json if a in nomes]
+            if not arquivos_json:
+                raise FileNotFoundError(f"Nenhum dos arquivos informados está em {self.pasta_json}: {', '.join(sorted(nomes))}")
+        total = 0
+        self.partes_geradas = []
+        self.arquivos_gerados = []
 
-        # Aqui salvamos o novo código no TXT
-        self._salvar_codigo_final(codigo_atual)
+        self.sequencia = SequenciaCodigos(self.arquivo_cod, self.pasta_cache)
+        self._limpar_temporarias()
+        try:
+            if self.processos > 1 and len(arquivos_json) > 1:
+                total = self._processar_em_paralelo(arquivos_json)
+            else:
+                for nome_arquivo in arquivos_json:
+                    total += self._processar_arquivo_json(nome_arquivo)
+            proximo_codigo = self.sequencia.proximo_codigo()
+        finally:
+            # Faixas de arquivos que não chegaram a ser gerados voltam para a sequência
+            self.sequencia.liberar_pendentes()
+            self.sequencia.fechar()
 
         logger.info(f"Total gerado: {total} registros")
-        logger.info(f"Novo código salvo no TXT: {codigo_atual}")
+        if any(len(partes) > 1 for partes in self.partes_geradas):
+            todas = [parte for partes in self.partes_geradas for parte in partes]
+            logger.info(f"Partes geradas: {len(todas)}")
+            for descricao, linhas in todas:
+                logger.info(f"  {descricao}: {linhas} registros")
+        logger.info(f"Próximo código no TXT: {proximo_codigo}")
+
+
+def _hash_dataframe(df):
+    """Hash dos valores (não da identidade dos objetos, como no pickle): o mesmo DataFrame lido do
+    disco ou montado com os JSONs em memória dá o mesmo hash."""
+    h = hashlib.sha256()
+    for coluna in df.columns:
+        serie = df[coluna]
+        h.update(f"|{coluna}:{serie.dtype}:".encode('utf-8'))
+        try:
+            h.update(pd.util.hash_array(serie.to_numpy()).tobytes())
+        except TypeError:
+            # Listas e dicionários vindos do JSON não têm hash; vão como texto, com as chaves ordenadas
+            h.update(json.dumps(serie.tolist(), sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        if serie.dtype == object:
+            # O hash de colunas object passa tudo para texto; o tipo separa 1 de '1'
+            h.update(','.join(type(valor).__name__ for valor in serie).encode('utf-8'))
+    h.update(pd.util.hash_array(df.index.to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+# Instância usada pelos processos do modo paralelo, criada uma vez por processo
+_tradutor_processo = None
+
+
+def _iniciar_processo(parametros):
+    global _tradutor_processo
+    _tradutor_processo = TradutorFinal(**parametros)
+
+
+def _traduzir_arquivo(df_json, nome_saida, start_cod_produto, pasta):
+    return _tradutor_processo._gerar_saida(df_json, nome_saida, start_cod_produto, pasta)
+
+
+def _inteiro_positivo(valor):
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError("precisa ser maior que zero")
+    return numero
 
 
 if __name__ == "__main__":
-    tradutor = TradutorFinal()
+    parser = argparse.ArgumentParser(description="Gera as planilhas finais a partir dos JSONs em jsons/")
+    parser.add_argument('--pasta-json', default='jsons',
+                        help="pasta dos JSONs de entrada (ex.: ../MOTOR/json_com_rgex, sem copiar para jsons/)")
+    parser.add_argument('--pasta-saida', default='saidas', help="pasta das planilhas geradas")
+    parser.add_argument('-p', '--processos', type=int, default=1,
+                        help="arquivos traduzidos em paralelo (0 = um por CPU)")
+    parser.add_argument('--cor-persistente', action='store_true',
+                        help="mantém o mesmo COD_COR para cada cor em todos os arquivos (cache/codigos.sqlite3)")
+    parser.add_argument('--formato', choices=FORMATOS, default='xlsx',
+                        help="formato das saídas (csv e parquet não têm limite de linhas)")
+    parser.add_argument('--linhas-por-parte', type=_inteiro_positivo, default=None,
+                        help="divide cada saída em partes de até N linhas (no xlsx, no máximo o limite do Excel)")
+    parser.add_argument('--dividir-em', choices=['abas', 'arquivos'], default='abas',
+                        help="no xlsx, as partes viram abas do mesmo arquivo ou arquivos separados")
+    args = parser.parse_args()
+
+    tradutor = TradutorFinal(
+        pasta_json=args.pasta_json, pasta_saida=args.pasta_saida, processos=args.processos, cor_persistente=args.cor_persistente, formato=args.formato,
+        linhas_por_parte=args.linhas_por_parte, dividir_em=args.dividir_em
+    )
     tradutor.processar()
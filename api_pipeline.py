@@ -0,0 +1,591 @@
+"""API local de jobs do pipeline, servida junto com a interface web pelo LuiHomeApp.
+
+A interface de configs manda uma config e as planilhas; o job roda o
+pipeline completo em uma pasta de trabalho isolada (sem tocar em MOTOR/ e
+TRADUTOR/ nem consumir COD_PRODUTO), em um pool de processos, e devolve as
+saídas com uma prévia das primeiras linhas. Um job com a mesma config, as
+mesmas planilhas, as mesmas opções e o mesmo código/gabarito sai do cache
+em MOTOR/cache/api/resultados na hora.
+
+    POST /api/jobs                        {"config": {...}, "nome_config": "config_X.json" (opcional),
+                                           "planilhas": [{"nome": ..., "conteudo": <base64>}],
+                                           "opcoes": {"usar_separador": bool, "cor_persistente": bool, "formato": ...,
+                                                      "linhas_previa": N}}
+    GET  /api/jobs                        jobs desta sessão
+    GET  /api/jobs/<id>                   situação, último progresso e resultado
+    GET  /api/jobs/<id>/eventos           progresso em text/event-stream (SSE) até o fim do job
+    GET  /api/jobs/<id>/arquivos/<nome>   download de uma saída
+    POST /api/planilhas?nome=<arquivo>    planilha crua no corpo -> abas, dimensões, cabeçalhos e primeiras linhas
+    GET  /api/planilhas/<sha256>          o mesmo índice, se a planilha com esse hash já foi indexada
+
+Só atende conexões da própria máquina, com Host local (contra DNS rebinding)
+e sem Origin de outro site; os POSTs precisam declarar o tipo do corpo
+(application/json nos jobs, application/octet-stream nas planilhas), que um
+formulário de outra página não consegue mandar sem a checagem do CORS.
+"""
+import base64
+import binascii
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from pipeline_etl import COMUM_PATH, MOTOR_PATH, TRADUTOR_PATH, ErroEtapa, PipelineETL, configurar_logging
+from servidor_estatico import ManipuladorEstatico, ServidorEstatico
+
+sys.path.insert(0, str(COMUM_PATH))
+from indice_planilhas import IndicePlanilhas
+from progresso import Progresso
+
+PASTA_API = MOTOR_PATH / 'cache' / 'api'
+# A mesma pasta que o conversor usa, então o que a interface indexou ele não relê
+PASTA_INDICE = MOTOR_PATH / 'cache' / 'indice_planilhas'
+# Também a do pipeline: jobs que repetem planilhas ou configs reaproveitam as etapas já feitas
+PASTA_CACHE_ETAPAS = MOTOR_PATH / 'cache' / 'etapas'
+OPCOES_PERMITIDAS = {'usar_separador': bool, 'cor_persistente': bool, 'formato': str, 'linhas_previa': int}
+FORMATOS = ('xlsx', 'csv', 'parquet')
+EXTENSOES_PLANILHA = ('.xlsx', '.xls')
+EXTENSOES_INDICE = ('.xlsx', '.xlsm', '.xls')
+NOME_CONFIG = 'previa.json'
+
+LIMITE_CORPO = 200 * 1024 * 1024
+LIMITE_CACHE = 50        # resultados guardados; os usados há mais tempo saem primeiro
+LIMITE_JOBS = 200        # jobs terminados lembrados na sessão
+LINHAS_PREVIA = 20
+INTERVALO_SSE = 15       # segundos entre comentários de keep-alive no stream
+HOSTS_LOCAIS = ('127.0.0.1', '::1', '::ffff:127.0.0.1', 'localhost')
+# Tipo do corpo exigido em cada rota de POST
+TIPOS_CORPO = {'jobs': 'application/json', 'planilhas': 'application/octet-stream'}
+
+# Código que muda o resultado de um job (o gabarito entra à parte)
+ARQUIVOS_CODIGO = ((MOTOR_PATH, '*.py'), (TRADUTOR_PATH, '*.py'), (COMUM_PATH, '*.py'))
+
+
+# Lado do processo do pool
+
+_fila_eventos = None
+
+
+def _iniciar_trabalhador(fila):
+    global _fila_eventos
+    _fila_eventos = fila
+
+
+def _evento_json(evento):
+    dados = dict(vars(evento))
+    dados['linhas_por_segundo'] = round(evento.linhas_por_segundo, 1)
+    dados['segundos'] = round(evento.segundos, 3)
+    return dados
+
+
+def _previa(arquivo):
+    """Primeiras linhas de uma saída, para mostrar na interface."""
+    if arquivo.suffix == '.xlsx':
+        import openpyxl
+        planilha = openpyxl.load_workbook(arquivo, read_only=True)
+        try:
+            aba = planilha.worksheets[0]
+            return [list(linha) for linha in aba.iter_rows(max_row=LINHAS_PREVIA, values_only=True)]
+        finally:
+            planilha.close()
+    if arquivo.suffix == '.csv':
+        with open(arquivo, 'r', encoding='utf-8-sig', newline='') as f:
+            return list(itertools.islice(csv.reader(f, delimiter=';'), LINHAS_PREVIA))
+    return None
+
+
+def _rodar_job(id_job, pasta_job, pasta_resultado, pasta_tradutor, arquivo_log, opcoes, pasta_cache_etapas=None):
+    """Roda no processo do pool: pipeline completo na pasta do job, que já tem configs/ e planilhas/."""
+    def enviar(tipo, dados=None):
+        _fila_eventos.put((tipo, id_job, dados))
+
+    pasta_job = Path(pasta_job)
+    motor, tradutor = pasta_job / 'MOTOR', pasta_job / 'TRADUTOR'
+    try:
+        enviar('inicio')
+        configurar_logging(arquivo_log=arquivo_log, console=False)
+        shutil.copytree(Path(pasta_tradutor) / 'gabarito', tradutor / 'gabarito')
+        # A prévia numera a partir do COD_PRODUTO atual, mas não grava de volta no original
+        cod = Path(pasta_tradutor) / 'start_cod_produto.txt'
+        if cod.exists():
+            shutil.copy2(cod, tradutor / 'start_cod_produto.txt')
+
+        opcoes = dict(opcoes)
+        usar_separador = opcoes.pop('usar_separador', True)
+        inicio = time.perf_counter()
+        pipeline = PipelineETL(
+            motor, tradutor, usar_separador=usar_separador, cache_etapas=pasta_cache_etapas or False,
+            # O job numera a partir de uma cópia do contador: o mesmo pedido repete a chave do tradutor
+            cache_tradutor=True,
+            progresso=Progresso(lambda evento: enviar('progresso', _evento_json(evento))), **opcoes
+        )
+        contagens = pipeline.executar()
+
+        # Publica o resultado de uma vez: um job com a mesma chave nunca vê a pasta pela metade
+        temporario = Path(f"{pasta_resultado}.{os.getpid()}.tmp")
+        shutil.rmtree(temporario, ignore_errors=True)
+        shutil.copytree(pipeline.pasta_saida_tradutor / 'saidas', temporario, ignore=shutil.ignore_patterns('.*'))
+        saidas = sorted(p for p in temporario.iterdir() if p.is_file())
+        resultado = {
+            'contagens': contagens,
+            'segundos': round(time.perf_counter() - inicio, 3),
+            'arquivos': [{'nome': p.name, 'bytes': p.stat().st_size} for p in saidas],
+            'previa': {p.name: _previa(p) for p in saidas},
+            # Linhas por etapa e arquivo: cabeçalhos, sem par no join, sem preço, expandidas
+            'manifesto': pipeline.manifesto,
+        }
+        with open(temporario / 'resultado.json', 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, default=str)
+        shutil.rmtree(pasta_resultado, ignore_errors=True)
+        os.replace(temporario, pasta_resultado)
+        enviar('fim', json.loads(json.dumps(resultado, default=str)))
+    except ErroEtapa as e:
+        enviar('erro', {'etapa': e.etapa, 'mensagem': str(e)})
+    except Exception as e:
+        logging.exception("Erro no job")
+        enviar('erro', {'etapa': 'Job', 'mensagem': f"{type(e).__name__}: {e}"})
+    finally:
+        shutil.rmtree(pasta_job, ignore_errors=True)
+
+
+# Lado do servidor
+
+class Job:
+    def __init__(self, id_job, chave):
+        self.id = id_job
+        self.chave = chave
+        self.estado = 'na_fila'  # 'na_fila', 'executando', 'concluido' ou 'erro'
+        self.eventos = []
+        self.resultado = None
+        self.erro = None
+        self.cache = False
+        self.criado = time.time()
+
+    @property
+    def terminado(self):
+        return self.estado in ('concluido', 'erro')
+
+    def resumo(self):
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'cache': self.cache,
+            'progresso': self.eventos[-1] if self.eventos else None,
+            'resultado': self.resultado,
+            'erro': self.erro,
+        }
+
+
+class ApiPipeline:
+    def __init__(self, pasta=PASTA_API, pasta_tradutor=TRADUTOR_PATH, processos=1, pasta_indice=PASTA_INDICE,
+                 pasta_cache_etapas=PASTA_CACHE_ETAPAS):
+        self.pasta = Path(pasta)
+        self.pasta_tradutor = Path(pasta_tradutor)
+        self.pasta_cache_etapas = pasta_cache_etapas
+        self.processos = processos
+        self.indice = IndicePlanilhas(pasta_indice)
+        self.jobs = {}
+        self._em_andamento = {}
+        self._condicao = threading.Condition()
+        self._executor = None
+        self._fila = None
+        for nome in ('jobs', 'resultados', 'logs'):
+            (self.pasta / nome).mkdir(parents=True, exist_ok=True)
+
+    def _iniciar_pool(self):
+        if self._executor is None:
+            contexto = multiprocessing.get_context()
+            self._fila = contexto.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processos, mp_context=contexto,
+                initializer=_iniciar_trabalhador, initargs=(self._fila,)
+            )
+            threading.Thread(target=self._receber_eventos, daemon=True).start()
+
+    def encerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._fila.put((None, None, None))
+            self._executor = None
+
+    def chave(self, config, planilhas, opcoes, nome_config=NOME_CONFIG):
+        """Hash de config, planilhas, opções e da versão do código e do gabarito."""
+        h = hashlib.sha256()
+        dados = {'config': config, 'nome_config': nome_config, 'opcoes': opcoes}
+        h.update(json.dumps(dados, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        for nome in sorted(planilhas):
+            h.update(f"|{nome}={hashlib.sha256(planilhas[nome]).hexdigest()}".encode('utf-8'))
+        for pasta, padrao in ARQUIVOS_CODIGO + ((self.pasta_tradutor / 'gabarito', '*'),):
+            for arquivo in sorted(pasta.glob(padrao)):
+                if arquivo.is_file():
+                    info = arquivo.stat()
+                    h.update(f"|{arquivo.name}:{info.st_size}:{info.st_mtime_ns}".encode('utf-8'))
+        return h.hexdigest()
+
+    def _ler_cache(self, chave):
+        arquivo = self.pasta / 'resultados' / chave / 'resultado.json'
+        try:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                resultado = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(arquivo)  # usado agora: fica por último na fila de limpeza
+        return resultado
+
+    def _limpar_cache(self):
+        resultados = []
+        for pasta in (self.pasta / 'resultados').iterdir():
+            try:
+                resultados.append((os.path.getmtime(pasta / 'resultado.json'), pasta))
+            except OSError:
+                continue
+        for _, pasta in sorted(resultados, reverse=True)[LIMITE_CACHE:]:
+            shutil.rmtree(pasta, ignore_errors=True)
+        logs = sorted((self.pasta / 'logs').glob('*.log'), key=os.path.getmtime, reverse=True)
+        for log in logs[LIMITE_JOBS:]:
+            log.unlink(missing_ok=True)
+
+    def _esquecer_jobs_antigos(self):
+        terminados = sorted((j for j in self.jobs.values() if j.terminado), key=lambda j: j.criado)
+        for job in terminados[:max(len(terminados) - LIMITE_JOBS, 0)]:
+            del self.jobs[job.id]
+
+    def submeter(self, config, planilhas, opcoes=None, nome_config=NOME_CONFIG):
+        """`planilhas` é {nome: bytes}; `nome_config` dá nome às saídas, como nas configs de MOTOR/configs.
+        Retorna o Job (já concluído quando vem do cache)."""
+        opcoes = dict(opcoes or {})
+        chave = self.chave(config, planilhas, opcoes, nome_config)
+        with self._condicao:
+            self._esquecer_jobs_antigos()
+            # Dois pedidos iguais seguidos (duplo clique) acompanham o mesmo job
+            if chave in self._em_andamento:
+                return self._em_andamento[chave]
+            job = Job(uuid.uuid4().hex[:12], chave)
+            self.jobs[job.id] = job
+            resultado = self._ler_cache(chave)
+            if resultado is not None:
+                job.estado, job.resultado, job.cache = 'concluido', resultado, True
+                return job
+            self._em_andamento[chave] = job
+
+        try:
+            pasta_job = self.pasta / 'jobs' / job.id
+            (pasta_job / 'MOTOR' / 'configs').mkdir(parents=True)
+            (pasta_job / 'MOTOR' / 'planilhas').mkdir()
+            with open(pasta_job / 'MOTOR' / 'configs' / nome_config, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+            for nome, conteudo in planilhas.items():
+                (pasta_job / 'MOTOR' / 'planilhas' / nome).write_bytes(conteudo)
+
+            self._iniciar_pool()
+            futuro = self._executor.submit(
+                _rodar_job, job.id, str(pasta_job), str(self.pasta / 'resultados' / chave),
+                str(self.pasta_tradutor), str(self.pasta / 'logs' / f"{job.id}.log"), opcoes,
+                str(self.pasta_cache_etapas) if self.pasta_cache_etapas else None
+            )
+        except Exception as e:
+            self._terminar(job, 'erro', erro={'etapa': 'Início', 'mensagem': f"{type(e).__name__}: {e}"})
+            return job
+        futuro.add_done_callback(lambda f: self._verificar_futuro(job, f))
+        return job
+
+    def _terminar(self, job, estado, resultado=None, erro=None):
+        with self._condicao:
+            if job.terminado:
+                return
+            job.estado, job.resultado, job.erro = estado, resultado, erro
+            self._em_andamento.pop(job.chave, None)
+            self._condicao.notify_all()
+
+    def _verificar_futuro(self, job, futuro):
+        # O normal é o fim chegar pela fila; aqui só sobra o processo que morreu no meio
+        erro = None if futuro.cancelled() else futuro.exception()
+        if futuro.cancelled() or erro is not None:
+            mensagem = "Cancelado" if erro is None else f"{type(erro).__name__}: {erro}"
+            self._terminar(job, 'erro', erro={'etapa': 'Job', 'mensagem': mensagem})
+
+    def _receber_eventos(self):
+        fila = self._fila
+        while True:
+            tipo, id_job, dados = fila.get()
+            if tipo is None:
+                return
+            job = self.jobs.get(id_job)
+            if job is None:
+                continue
+            if tipo == 'fim':
+                self._terminar(job, 'concluido', resultado=dados)
+                self._limpar_cache()
+            elif tipo == 'erro':
+                self._terminar(job, 'erro', erro=dados)
+            else:
+                with self._condicao:
+                    if tipo == 'inicio':
+                        job.estado = 'executando'
+                    else:
+                        job.eventos.append(dados)
+                    self._condicao.notify_all()
+
+    def esperar(self, job, desde, timeout):
+        """Eventos do job a partir do índice `desde`, esperando até `timeout` segundos por novidades."""
+        with self._condicao:
+            self._condicao.wait_for(lambda: len(job.eventos) > desde or job.terminado, timeout)
+            return job.eventos[desde:], job.terminado
+
+    def arquivo(self, job, nome):
+        if job.estado != 'concluido' or nome not in {a['nome'] for a in job.resultado['arquivos']}:
+            return None
+        return self.pasta / 'resultados' / job.chave / nome
+
+
+class ErroPedido(Exception):
+    pass
+
+
+def ler_pedido(corpo):
+    """JSON do POST /api/jobs -> (config, {nome: bytes}, opcoes, nome da config)."""
+    try:
+        pedido = json.loads(corpo)
+    except ValueError as e:
+        raise ErroPedido(f"JSON inválido: {e}")
+    if not isinstance(pedido, dict) or not isinstance(pedido.get('config'), dict):
+        raise ErroPedido("'config' precisa ser um objeto")
+
+    planilhas = {}
+    for item in pedido.get('planilhas') or []:
+        nome = os.path.basename(str(item.get('nome', '')) if isinstance(item, dict) else '')
+        if not nome.lower().endswith(EXTENSOES_PLANILHA) or nome.startswith(('.', '~$')):
+            raise ErroPedido(f"Planilha inválida: {nome!r} (use .xlsx ou .xls)")
+        try:
+            planilhas[nome] = base64.b64decode(item.get('conteudo', ''), validate=True)
+        except (binascii.Error, TypeError, ValueError):
+            raise ErroPedido(f"Conteúdo de {nome} não está em base64")
+    if not planilhas:
+        raise ErroPedido("Envie ao menos uma planilha")
+
+    opcoes = pedido.get('opcoes') or {}
+    if not isinstance(opcoes, dict):
+        raise ErroPedido("'opcoes' precisa ser um objeto")
+    for nome, valor in opcoes.items():
+        if nome not in OPCOES_PERMITIDAS or not isinstance(valor, OPCOES_PERMITIDAS[nome]):
+            raise ErroPedido(f"Opção inválida: {nome}")
+    if isinstance(opcoes.get('linhas_previa'), bool) or opcoes.get('linhas_previa', 1) < 1:
+        raise ErroPedido("'linhas_previa' precisa ser um inteiro maior que zero")
+    if opcoes.get('formato', 'xlsx') not in FORMATOS:
+        raise ErroPedido(f"Formato inválido: {opcoes['formato']}")
+
+    nome_config = os.path.basename(str(pedido.get('nome_config') or NOME_CONFIG))
+    if not nome_config.lower().endswith('.json') or nome_config.startswith('.'):
+        raise ErroPedido(f"Nome de config inválido: {nome_config!r}")
+    return pedido['config'], planilhas, opcoes, nome_config
+
+
+def _nome_host(url):
+    # Porta inválida ou colchetes quebrados: None, que não é um host local
+    try:
+        return urlsplit(url).hostname
+    except ValueError:
+        return None
+
+
+class ManipuladorApi(ManipuladorEstatico):
+    def _rota(self):
+        caminho = urlsplit(self.path).path
+        if not caminho.startswith('/api/'):
+            return None
+        return [unquote(parte) for parte in caminho.split('/')[2:] if parte]
+
+    def _cors(self):
+        # O servidor de desenvolvimento do Vite (outra porta) também pode chamar a API
+        origem = self.headers.get('Origin')
+        if origem and _nome_host(origem) in HOSTS_LOCAIS:
+            self.send_header('Access-Control-Allow-Origin', origem)
+            self.send_header('Vary', 'Origin')
+
+    def _responder_json(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.send_header('Cache-Control', 'no-store')
+        self._cors()
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _recusar_remoto(self):
+        """Recusa conexões de fora, Host que não é desta máquina (DNS rebinding) e Origin de outro site."""
+        host = self.headers.get('Host', '')
+        origem = self.headers.get('Origin')
+        if self.client_address[0] not in HOSTS_LOCAIS:
+            erro = "A API só atende a própria máquina"
+        elif _nome_host(f"//{host}") not in HOSTS_LOCAIS:
+            erro = f"Host não permitido: {host!r}"
+        elif origem is not None and _nome_host(origem) not in HOSTS_LOCAIS:
+            erro = f"Origem não permitida: {origem!r}"
+        else:
+            return False
+        self.close_connection = True
+        self._responder_json(HTTPStatus.FORBIDDEN, {'erro': erro})
+        return True
+
+    def _recusar_tipo(self, rota):
+        tipo = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo == TIPOS_CORPO[rota[0]]:
+            return False
+        self.close_connection = True
+        self._responder_json(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                             {'erro': f"Content-Type precisa ser {TIPOS_CORPO[rota[0]]} (recebido: {tipo or 'nenhum'})"})
+        return True
+
+    def do_OPTIONS(self):
+        if self._rota() is None:
+            self.send_error(HTTPStatus.NOT_IMPLEMENTED, "Unsupported method ('OPTIONS')")
+            return
+        if self._recusar_remoto():
+            return
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self._cors()
+        self.end_headers()
+
+    def do_POST(self):
+        rota = self._rota()
+        if rota is None:
+            self.send_error(HTTPStatus.NOT_IMPLEMENTED, "Unsupported method ('POST')")
+            return
+        if self._recusar_remoto():
+            return
+        if rota not in (['jobs'], ['planilhas']):
+            self._responder_json(HTTPStatus.NOT_FOUND, {'erro': "Rota inexistente"})
+            return
+        if self._recusar_tipo(rota):
+            return
+
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            tamanho = -1
+        if not 0 < tamanho <= LIMITE_CORPO:
+            self.close_connection = True
+            self._responder_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE if tamanho > 0 else HTTPStatus.LENGTH_REQUIRED,
+                                 {'erro': f"Corpo ausente ou maior que {LIMITE_CORPO // (1024 * 1024)} MB"})
+            return
+        corpo = self.rfile.read(tamanho)
+
+        if rota == ['planilhas']:
+            self._indexar(corpo)
+            return
+        try:
+            config, planilhas, opcoes, nome_config = ler_pedido(corpo)
+        except ErroPedido as e:
+            self._responder_json(HTTPStatus.BAD_REQUEST, {'erro': str(e)})
+            return
+
+        job = self.server.api.submeter(config, planilhas, opcoes, nome_config)
+        self._responder_json(HTTPStatus.OK if job.terminado else HTTPStatus.ACCEPTED, job.resumo())
+
+    def _indexar(self, corpo):
+        nome = os.path.basename(parse_qs(urlsplit(self.path).query).get('nome', [''])[0])
+        if not nome.lower().endswith(EXTENSOES_INDICE):
+            self._responder_json(HTTPStatus.BAD_REQUEST, {'erro': f"Planilha inválida: {nome!r} (use .xlsx, .xlsm ou .xls)"})
+            return
+        try:
+            indice = self.server.api.indice.indexar_conteudo(corpo, nome)
+        except Exception as e:
+            # Arquivo corrompido ou que não é planilha
+            self._responder_json(HTTPStatus.UNPROCESSABLE_ENTITY, {'erro': f"Não foi possível ler {nome}: {e}"})
+            return
+        self._responder_json(HTTPStatus.OK, indice)
+
+    def do_GET(self):
+        rota = self._rota()
+        if rota is None:
+            super().do_GET()
+            return
+        if self._recusar_remoto():
+            return
+
+        api = self.server.api
+        if len(rota) == 2 and rota[0] == 'planilhas':
+            indice = api.indice.buscar(rota[1]) if re.fullmatch(r'[0-9a-f]{64}', rota[1]) else None
+            if indice is None:
+                self._responder_json(HTTPStatus.NOT_FOUND, {'erro': "Planilha ainda não indexada"})
+            else:
+                self._responder_json(HTTPStatus.OK, indice)
+            return
+        if rota == ['jobs']:
+            self._responder_json(HTTPStatus.OK, [job.resumo() for job in api.jobs.values()])
+            return
+        job = api.jobs.get(rota[1]) if len(rota) >= 2 and rota[0] == 'jobs' else None
+        if job is None:
+            self._responder_json(HTTPStatus.NOT_FOUND, {'erro': "Job inexistente"})
+        elif len(rota) == 2:
+            self._responder_json(HTTPStatus.OK, job.resumo())
+        elif rota[2:] == ['eventos']:
+            self._transmitir(job)
+        elif len(rota) == 4 and rota[2] == 'arquivos':
+            self._enviar_arquivo(api.arquivo(job, rota[3]))
+        else:
+            self._responder_json(HTTPStatus.NOT_FOUND, {'erro': "Rota inexistente"})
+
+    def _transmitir(self, job):
+        """Server-Sent Events: um 'progresso' por evento e, no fim, 'concluido' ou 'erro' com o resumo."""
+        self.close_connection = True
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self._cors()
+        self.end_headers()
+
+        enviados = 0
+        while True:
+            eventos, terminado = self.server.api.esperar(job, enviados, INTERVALO_SSE)
+            for evento in eventos:
+                self.wfile.write(f"event: progresso\ndata: {json.dumps(evento, ensure_ascii=False, default=str)}\n\n".encode('utf-8'))
+            enviados += len(eventos)
+            if terminado:
+                resumo = json.dumps(job.resumo(), ensure_ascii=False, default=str)
+                self.wfile.write(f"event: {job.estado}\ndata: {resumo}\n\n".encode('utf-8'))
+                return
+            if not eventos:
+                self.wfile.write(b": ativo\n\n")
+
+    def _enviar_arquivo(self, caminho):
+        try:
+            f = open(caminho, 'rb') if caminho else None
+        except OSError:
+            f = None
+        if f is None:
+            self._responder_json(HTTPStatus.NOT_FOUND, {'erro': "Arquivo inexistente"})
+            return
+        with f:
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', self.guess_type(str(caminho)))
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(caminho.name)}")
+            self._cors()
+            self.end_headers()
+            self.copyfile(f, self.wfile)
+
+
+class ServidorPipeline(ServidorEstatico):
+    """ServidorEstatico da interface web com a API de jobs em /api/."""
+    manipulador = ManipuladorApi
+
+    def __init__(self, endereco, pasta, api):
+        self.api = api
+        super().__init__(endereco, pasta)
@@ -0,0 +1 @@
+"""Catálogos sintéticos de fornecedor e medição de tempo e memória das etapas do ETL."""
@@ -0,0 +1,136 @@
+"""Gera um fornecedor sintético: planilhas de custo e venda e a config que as casa.
+
+    python benchmarks/catalogo_sintetico.py MOTOR --produtos 5000 --cores 6 --abas 2
+
+As planilhas imitam as reais: título acima do cabeçalho na de custo, o
+cabeçalho repetido no meio dos dados a cada `cabecalho_a_cada` linhas,
+preços com vírgula, R$ e células vazias, e descrições com os itens dos
+separadores ("MADEIRA/METAL"). `sobreposicao` é a fração dos produtos de
+custo que também aparecem na planilha de venda (o inner join do mesclador).
+Com a mesma semente, o mesmo catálogo.
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+import pandas as pd
+
+CORES = ['PRETO', 'BRANCO', 'AZUL', 'VERDE', 'VERMELHO', 'AMARELO', 'CINZA', 'ROSA', 'MARROM', 'BEGE', 'LARANJA', 'ROXO']
+ITENS_SEPARADOS = ['MADEIRA', 'METAL', 'VIDRO', 'PLASTICO', 'TECIDO', 'COURO', 'BAMBU', 'PEDRA']
+LINHA_TITULO = 3  # startCell da planilha de custo: título na linha 1, cabeçalho na 3
+
+
+def _preco(aleatorio, indice):
+    if aleatorio.random() < 0.2:
+        return ''
+    valor = f"{aleatorio.randint(100, 9999999) / 100:.2f}".replace('.', ',')
+    # Formatos que aparecem nas planilhas dos fornecedores
+    return ('R$ ' + valor) if indice % 53 == 0 else valor
+
+
+def gerar_catalogo(pasta_motor, produtos=1000, cores=4, abas=1, cabecalho_a_cada=40, separadores=2,
+                   sobreposicao=0.9, fornecedor='Sintetico', semente=1):
+    """Grava `<fornecedor> Custo.xlsx`, `<fornecedor> Venda.xlsx` e `configs/<fornecedor>.json`
+    em `pasta_motor`. Retorna o número de linhas escritas em cada planilha (com os cabeçalhos repetidos)."""
+    if not 1 <= cores <= len(CORES):
+        raise ValueError(f"cores precisa estar entre 1 e {len(CORES)}")
+    if abas < 1 or produtos < 1:
+        raise ValueError("produtos e abas precisam ser maiores que zero")
+    if not 0 <= separadores <= len(ITENS_SEPARADOS):
+        raise ValueError(f"separadores precisa estar entre 0 e {len(ITENS_SEPARADOS)}")
+    if not 0 < sobreposicao <= 1:
+        raise ValueError("sobreposicao precisa estar entre 0 (exclusive) e 1")
+
+    aleatorio = random.Random(semente)
+    pasta_motor = Path(pasta_motor)
+    (pasta_motor / 'planilhas').mkdir(parents=True, exist_ok=True)
+    (pasta_motor / 'configs').mkdir(parents=True, exist_ok=True)
+
+    cores_usadas = CORES[:cores]
+    itens = ITENS_SEPARADOS[:separadores]
+    colunas_custo = ['Nome', 'NCM', 'Ref'] + cores_usadas
+    colunas_venda = ['Nome', 'Ref'] + cores_usadas
+    sufixo = f" {'/'.join(itens)}" if itens else ''
+
+    linhas_custo, linhas_venda = [], []
+    for i in range(produtos):
+        nome = f"Produto {i} modelo {i % 97}{sufixo}"
+        precos = [_preco(aleatorio, i) for _ in cores_usadas]
+        linhas_custo.append([nome, f"9403.{i % 89:02d}.00", f"REF{i}"] + precos)
+        if aleatorio.random() < sobreposicao:
+            linhas_venda.append([nome, f"REF{i}"] + [_preco(aleatorio, i) for _ in cores_usadas])
+        if cabecalho_a_cada and (i + 1) % cabecalho_a_cada == 0:
+            linhas_custo.append(list(colunas_custo))
+            linhas_venda.append(list(colunas_venda))
+    aleatorio.shuffle(linhas_venda)
+
+    nome_custo, nome_venda = f"{fornecedor} Custo.xlsx", f"{fornecedor} Venda.xlsx"
+    paginas = []
+    tamanho_aba = -(-len(linhas_custo) // abas)
+    with pd.ExcelWriter(pasta_motor / 'planilhas' / nome_custo) as escritor:
+        for indice in range(abas):
+            aba = f"Custo{indice + 1}"
+            parte = pd.DataFrame(linhas_custo[indice * tamanho_aba:(indice + 1) * tamanho_aba], columns=colunas_custo)
+            pd.DataFrame([[f"Tabela de custo {fornecedor}"]]).to_excel(escritor, sheet_name=aba, index=False, header=False)
+            parte.to_excel(escritor, sheet_name=aba, index=False, startrow=LINHA_TITULO - 1)
+            paginas.append({'pageIndex': indice, 'pageName': aba, 'startCell': f"A{LINHA_TITULO}",
+                            'columns': [], 'columnMappings': [], 'isApproved': True})
+    pd.DataFrame(linhas_venda, columns=colunas_venda).to_excel(
+        pasta_motor / 'planilhas' / nome_venda, sheet_name='Venda', index=False
+    )
+
+    config = {
+        'files': {
+            'custo': {'path': nome_custo, 'columns': colunas_custo},
+            'venda': {'path': nome_venda, 'columns': colunas_venda},
+        },
+        'columnMapping': [
+            {'gabaritoColumn': 'DESCRICAO', 'sourceColumn': 'Nome', 'sourceFile': 'custo'},
+            {'gabaritoColumn': 'CLASSIFICACAO_FIS', 'sourceColumn': 'NCM', 'sourceFile': 'custo'},
+            {'gabaritoColumn': 'REFERENCIA', 'sourceColumn': 'Ref', 'sourceFile': 'custo'},
+            {'gabaritoColumn': 'COR', 'sourceColumn': cores_usadas, 'sourceFile': 'custo'},
+            {'gabaritoColumn': 'MARCA', 'sourceColumn': '__EMPTY__', 'sourceFile': 'custo', 'name': fornecedor.upper()},
+            {'gabaritoColumn': 'DESCRICAO', 'sourceColumn': 'Nome', 'sourceFile': 'venda'},
+            {'gabaritoColumn': 'COR', 'sourceColumn': cores_usadas, 'sourceFile': 'venda'},
+        ],
+        'mergeConfig': {'leftFile': 'custo', 'rightFile': 'venda', 'leftKey': 'Nome', 'rightKey': 'Nome',
+                        'how': 'inner', 'includeVariationKey': True},
+        'pages': paginas,
+        'separadores': [{'coluna': 'DESCRICAO', 'valorOriginal': '', 'itensSeparados': itens}] if itens else [],
+    }
+    with open(pasta_motor / 'configs' / f"{fornecedor}.json", 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+
+    return {'custo': len(linhas_custo), 'venda': len(linhas_venda)}
+
+
+def adicionar_argumentos(parser):
+    """Formato do catálogo; o número de produtos fica com quem chama."""
+    parser.add_argument('--cores', type=int, default=4, help="colunas de cor com preço (padrão: 4)")
+    parser.add_argument('--abas', type=int, default=1, help="abas da planilha de custo (padrão: 1)")
+    parser.add_argument('--cabecalho-a-cada', type=int, default=40,
+                        help="repete o cabeçalho a cada N produtos; 0 desliga (padrão: 40)")
+    parser.add_argument('--separadores', type=int, default=2,
+                        help="itens de separador em cada descrição (MADEIRA/METAL...); 0 desliga (padrão: 2)")
+    parser.add_argument('--sobreposicao', type=float, default=0.9,
+                        help="fração dos produtos de custo que também estão na venda (padrão: 0.9)")
+    parser.add_argument('--semente', type=int, default=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera planilhas e config de um fornecedor sintético")
+    parser.add_argument('pasta_motor', help="pasta com planilhas/ e configs/ (ex.: MOTOR)")
+    parser.add_argument('--fornecedor', default='Sintetico')
+    parser.add_argument('--produtos', type=int, default=1000, help="produtos na planilha de custo (padrão: 1000)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+    linhas = gerar_catalogo(
+        args.pasta_motor, args.produtos, args.cores, args.abas, args.cabecalho_a_cada, args.separadores,
+        args.sobreposicao, args.fornecedor, args.semente
+    )
+    print(f"Custo: {linhas['custo']} linhas, venda: {linhas['venda']} linhas")
+
+
+if __name__ == '__main__':
+    main()
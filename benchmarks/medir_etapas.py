@@ -0,0 +1,231 @@
+"""Mede tempo, vazão e pico de memória de cada etapa do ETL em catálogos sintéticos de vários tamanhos.
+
+    python benchmarks/medir_etapas.py --escalas 1000,10000,50000 [--cores 6 --abas 2 ...]
+
+Para cada escala, gera um fornecedor sintético (catalogo_sintetico.py) em
+uma pasta temporária e roda as etapas em sequência, cada uma em um processo
+novo, para que o pico de RSS medido seja o da etapa:
+
+    conversor   ConversorPlanilhasTXT.fase1_conversao_bruta
+    gerador     GeradorJSON.gerar_json_final
+    mesclador   GeradorJSONMesclado.gerar_json_final (mesclar_dados)
+    separador   SeparadorVariacoes.processar_todos
+    tradutor    TradutorFinal.processar
+
+O relatório (JSON) vai para benchmarks/resultados/, com segundos, linhas de
+entrada e saída, linhas por segundo e pico de RSS por etapa e escala.
+Sem o módulo resource (Windows), o pico de memória fica null.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from catalogo_sintetico import adicionar_argumentos, gerar_catalogo
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PASTA_RESULTADOS = Path(__file__).resolve().parent / 'resultados'
+ETAPAS = ('conversor', 'gerador', 'mesclador', 'separador', 'tradutor')
+PASTAS_MOTOR = ('planilhas', 'configs', 'txt_bruto', 'json_final', 'jsons_mesclados', 'json_com_rgex')
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo até agora, em MB."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _rodar_etapa(etapa, pasta_motor, pasta_tradutor, entrada_tradutor):
+    """Roda em um processo novo. Retorna segundos, memória e os arquivos (ou linhas) gerados."""
+    for pasta in ('COMUM', 'MOTOR', 'TRADUTOR'):
+        sys.path.insert(0, str(BASE_DIR / pasta))
+    motor, tradutor = Path(pasta_motor), Path(pasta_tradutor)
+    # O "Gerado: ..." de cada arquivo só atrapalharia a tabela; avisos e erros continuam
+    logging.disable(logging.INFO)
+
+    if etapa == 'conversor':
+        from conversor_etl import ConversorPlanilhasTXT
+        objeto = ConversorPlanilhasTXT(pasta_origem=motor / 'planilhas', pasta_destino=motor / 'txt_bruto',
+                                       pasta_config=motor / 'configs')
+        executar = objeto.fase1_conversao_bruta
+    elif etapa == 'gerador':
+        from geradorJSON import GeradorJSON
+        objeto = GeradorJSON(pasta_txt=motor / 'txt_bruto', pasta_destino=motor / 'json_final',
+                             pasta_config=motor / 'configs')
+        executar = objeto.gerar_json_final
+    elif etapa == 'mesclador':
+        from mescladorJSON import GeradorJSONMesclado
+        objeto = GeradorJSONMesclado(pasta_json=motor / 'json_final', pasta_destino=motor / 'jsons_mesclados',
+                                     pasta_config=motor / 'configs')
+        executar = objeto.gerar_json_final
+    elif etapa == 'separador':
+        from separadorVariacoes import SeparadorVariacoes
+        objeto = SeparadorVariacoes(pasta_json_mesclado=motor / 'jsons_mesclados', pasta_config=motor / 'configs',
+                                    pasta_destino=motor / 'json_com_rgex')
+        executar = objeto.processar_todos
+    else:
+        from tradutor_final import TradutorFinal
+        objeto = TradutorFinal(
+            pasta_gabarito=str(BASE_DIR / 'TRADUTOR' / 'gabarito'), pasta_json=str(motor / entrada_tradutor),
+            pasta_saida=str(tradutor / 'saidas'), pasta_cache=str(tradutor / 'cache'),
+            arquivo_cod=str(tradutor / 'start_cod_produto.txt')
+        )
+        executar = objeto.processar
+
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    executar()
+    segundos = time.perf_counter() - inicio
+
+    resultado = {'segundos': segundos, 'rss_inicial_mb': rss_inicial, 'pico_rss_mb': pico_rss_mb()}
+    if etapa == 'tradutor':
+        resultado['linhas_saida'] = sum(linhas for partes in objeto.partes_geradas for _, linhas in partes)
+    else:
+        resultado['arquivos'] = [str(arquivo) for arquivo in objeto.gerados]
+    return resultado
+
+
+def contar_linhas(etapa, arquivos):
+    """Registros nas saídas de uma etapa do MOTOR (contados fora do processo medido)."""
+    total = 0
+    for arquivo in arquivos:
+        if etapa == 'conversor':
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                total += sum(1 for linha in f if linha.startswith('========== REGISTRO'))
+        else:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                total += len(json.load(f))
+    return total
+
+
+def preparar_pastas(pasta, codigo_inicial=None):
+    """MOTOR/ e TRADUTOR/ vazios em `pasta`. Sem `codigo_inicial`, a sequência de COD_PRODUTO começa
+    onde está a do TRADUTOR."""
+    motor, tradutor = pasta / 'MOTOR', pasta / 'TRADUTOR'
+    for nome in PASTAS_MOTOR:
+        (motor / nome).mkdir(parents=True, exist_ok=True)
+    for nome in ('saidas', 'cache'):
+        (tradutor / nome).mkdir(parents=True, exist_ok=True)
+    if codigo_inicial is None:
+        shutil.copy2(BASE_DIR / 'TRADUTOR' / 'start_cod_produto.txt', tradutor / 'start_cod_produto.txt')
+    else:
+        (tradutor / 'start_cod_produto.txt').write_text(str(codigo_inicial), encoding='utf-8')
+    return motor, tradutor
+
+
+def medir_pasta(motor, tradutor, linhas_entrada, com_separador=True):
+    """Roda as etapas sobre as planilhas e configs de `motor`, cada uma em um processo novo."""
+    # Sem separadores na config, o tradutor lê os mesclados (como no --sem-separador)
+    etapas_medidas = ETAPAS if com_separador else tuple(e for e in ETAPAS if e != 'separador')
+    entrada_tradutor = 'json_com_rgex' if com_separador else 'jsons_mesclados'
+    contexto = multiprocessing.get_context('spawn')
+    etapas = []
+    for etapa in etapas_medidas:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            medida = executor.submit(_rodar_etapa, etapa, str(motor), str(tradutor), entrada_tradutor).result()
+        linhas_saida = medida.pop('linhas_saida', None)
+        if linhas_saida is None:
+            linhas_saida = contar_linhas(etapa, medida.pop('arquivos'))
+        segundos = medida['segundos']
+        etapas.append({
+            'etapa': etapa,
+            'segundos': round(segundos, 4),
+            'linhas_entrada': linhas_entrada,
+            'linhas_saida': linhas_saida,
+            'linhas_por_segundo': round(linhas_entrada / segundos, 1) if segundos > 0 else None,
+            'rss_inicial_mb': medida['rss_inicial_mb'],
+            'pico_rss_mb': medida['pico_rss_mb'],
+        })
+        linhas_entrada = linhas_saida
+    return etapas
+
+
+def medir_escala(produtos, parametros, manter=False):
+    pasta = Path(tempfile.mkdtemp(prefix=f"benchmark_etl_{produtos}_"))
+    try:
+        motor, tradutor = preparar_pastas(pasta)
+        linhas_planilhas = gerar_catalogo(motor, produtos, **parametros)
+        etapas = medir_pasta(motor, tradutor, linhas_planilhas['custo'] + linhas_planilhas['venda'],
+                             com_separador=bool(parametros.get('separadores')))
+        return {
+            'produtos': produtos,
+            'linhas_planilhas': linhas_planilhas,
+            'segundos_total': round(sum(e['segundos'] for e in etapas), 4),
+            'etapas': etapas,
+            'pasta': str(pasta) if manter else None,
+        }
+    finally:
+        if not manter:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+def imprimir_escala(escala):
+    print(f"\n{escala['produtos']} produtos ({escala['linhas_planilhas']['custo']} linhas de custo, "
+          f"{escala['linhas_planilhas']['venda']} de venda): {escala['segundos_total']:.2f} s")
+    print(f"  {'etapa':<10} {'segundos':>9} {'entrada':>9} {'saída':>9} {'linhas/s':>10} {'pico MB':>8}")
+    for e in escala['etapas']:
+        pico = f"{e['pico_rss_mb']:.0f}" if e['pico_rss_mb'] is not None else '-'
+        print(f"  {e['etapa']:<10} {e['segundos']:>9.3f} {e['linhas_entrada']:>9} {e['linhas_saida']:>9} "
+              f"{e['linhas_por_segundo'] or 0:>10.0f} {pico:>8}")
+
+
+def _escalas(texto):
+    try:
+        escalas = [int(parte) for parte in texto.split(',') if parte.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError("use números separados por vírgula, ex.: 1000,10000")
+    if not escalas or min(escalas) < 1:
+        raise argparse.ArgumentTypeError("as escalas precisam ser maiores que zero")
+    return escalas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede cada etapa do ETL em catálogos sintéticos")
+    parser.add_argument('--escalas', type=_escalas, default=[1000, 10000],
+                        help="números de produtos, separados por vírgula (padrão: 1000,10000)")
+    adicionar_argumentos(parser)
+    parser.add_argument('--saida', help="arquivo do relatório (padrão: benchmarks/resultados/etapas_<data>.json)")
+    parser.add_argument('--manter', action='store_true', help="não apaga as pastas temporárias das escalas")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        'cores': args.cores, 'abas': args.abas, 'cabecalho_a_cada': args.cabecalho_a_cada,
+        'separadores': args.separadores, 'sobreposicao': args.sobreposicao, 'semente': args.semente,
+    }
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'catalogo': parametros,
+        'escalas': [],
+    }
+    for produtos in args.escalas:
+        escala = medir_escala(produtos, parametros, args.manter)
+        relatorio['escalas'].append(escala)
+        imprimir_escala(escala)
+
+    saida = Path(args.saida) if args.saida else PASTA_RESULTADOS / f"etapas_{datetime.now():%Y%m%d_%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\nRelatório: {saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+"""Portão de regressão: roda um corpus fixo pelas etapas e compara com as saídas de referência e o orçamento.
+
+    python benchmarks/verificar_regressao.py                        # sai com 1 se alguma saída mudou ou ficou lenta
+    python benchmarks/verificar_regressao.py --repeticoes 3         # menor tempo de 3 rodadas, menos ruído
+    python benchmarks/verificar_regressao.py --atualizar            # grava novas referências e orçamento
+    python benchmarks/verificar_regressao.py --atualizar-orcamento  # só tempos e memória, medidos nesta máquina
+
+Os casos (benchmarks/referencia/casos.json) são catálogos sintéticos com
+semente fixa (catalogo_sintetico.py), com cabeçalhos repetidos, várias abas,
+preços em formatos diferentes e separadores. As saídas de cada etapa são
+comparadas arquivo a arquivo com benchmarks/referencia/saidas/<caso>/<etapa>/:
+o texto dos TXT, o conteúdo dos JSON e as células dos xlsx. Uma etapa falha no
+orçamento (benchmarks/referencia/orcamento.json) quando o tempo passa do
+medido em mais de `tolerancia_tempo` e de `folga_segundos`, ou o pico de RSS
+passa em mais de `tolerancia_memoria`. O orçamento é da máquina em que foi
+medido; em outra máquina, rode --atualizar-orcamento antes.
+
+Depois dos casos vêm os cenários incrementais: dois fornecedores passam pelo
+pipeline_etl, uma entrada é editada (separadores de uma config, uma planilha)
+e a execução incremental é comparada com uma limpa sobre as mesmas entradas.
+Os JSONs que chegam ao tradutor precisam ser iguais e os xlsx iguais fora os
+códigos numerados pelo histórico (COD_PRODUTO, NCM); os xlsx cujo JSON não
+mudou precisam sair idênticos aos da execução anterior, COD_PRODUTO inclusive. Não têm referência gravada nem
+orçamento; --sem-incrementais os pula. Por último, o tradutor traduz foo_2.json
+e depois foo.json, e depois foo dividido em arquivos e de novo inteiro: as
+partes antigas de foo saem, a saída foo_2.xlsx do outro JSON fica. E o
+--simular, normal, na prévia e com --paralelo, não pode criar nenhuma pasta.
+
+Roda offline, só com as dependências do projeto. --atualizar só depois de
+revisar o diff: ele aceita as saídas atuais como corretas.
+"""
+import argparse
+import difflib
+import json
+import logging
+import multiprocessing
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from catalogo_sintetico import gerar_catalogo
+from medir_etapas import BASE_DIR, medir_pasta, preparar_pastas
+
+PASTA_REFERENCIA = Path(__file__).resolve().parent / 'referencia'
+ARQUIVO_CASOS = PASTA_REFERENCIA / 'casos.json'
+ARQUIVO_ORCAMENTO = PASTA_REFERENCIA / 'orcamento.json'
+PASTA_SAIDAS = PASTA_REFERENCIA / 'saidas'
+
+# Onde cada etapa grava, relativo à pasta do caso
+PASTAS_ETAPA = {
+    'conversor': ('MOTOR', 'txt_bruto'),
+    'gerador': ('MOTOR', 'json_final'),
+    'mesclador': ('MOTOR', 'jsons_mesclados'),
+    'separador': ('MOTOR', 'json_com_rgex'),
+    'tradutor': ('TRADUTOR', 'saidas'),
+}
+# Referências fixas: a sequência de COD_PRODUTO começa sempre no mesmo número
+CODIGO_INICIAL = 1000
+TOLERANCIAS_PADRAO = {'tolerancia_tempo': 0.5, 'tolerancia_memoria': 0.25, 'folga_segundos': 0.25}
+LINHAS_DIFF = 30
+
+# Fornecedores dos cenários incrementais: Beta com três itens de separador, que os cenários editam
+FORNECEDORES_INCREMENTAIS = (
+    {'fornecedor': 'Alfa', 'produtos': 120, 'separadores': 2, 'semente': 1},
+    {'fornecedor': 'Beta', 'produtos': 80, 'separadores': 3, 'semente': 2},
+)
+
+
+def _editar_config(motor, fornecedor, editar):
+    caminho = motor / 'configs' / f"{fornecedor}.json"
+    config = json.loads(caminho.read_text(encoding='utf-8'))
+    editar(config)
+    caminho.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def _menos_separadores(motor):
+    def editar(config):
+        config['separadores'][0]['itensSeparados'] = config['separadores'][0]['itensSeparados'][:1]
+    _editar_config(motor, 'Beta', editar)
+
+
+def _sem_separadores(motor):
+    _editar_config(motor, 'Beta', lambda config: config.update(separadores=[]))
+
+
+def _planilha_trocada(motor):
+    gerar_catalogo(motor, 140, separadores=2, fornecedor='Alfa', semente=5)
+
+
+# Códigos que dependem de tudo o que já foi numerado antes (a sequência de COD_PRODUTO e o
+# dicionário de NCMs): uma execução limpa numera diferente, e eles ficam fora da comparação com ela
+CODIGOS_PERSISTENTES = ('COD_PRODUTO', 'COD_CLASSIFICACAO_FIS')
+
+# nome: (descrição, edição feita na pasta do MOTOR)
+CENARIOS_INCREMENTAIS = {
+    'config_editada': ("um item de separador a menos na config de Beta", _menos_separadores),
+    'separadores_removidos': ("config de Beta sem separadores", _sem_separadores),
+    'planilha_trocada': ("planilhas de Alfa com outros produtos", _planilha_trocada),
+}
+
+
+def _ler_json(caminho, padrao=None):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return padrao
+
+
+def _gravar_json(caminho, dados):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def _linhas_json(itens):
+    # Um registro por linha: o diff aponta o registro que mudou
+    return ''.join(json.dumps(item, ensure_ascii=False, default=str) + '\n' for item in itens)
+
+
+def normalizar(arquivo):
+    """(nome da referência, texto comparável) de uma saída."""
+    if arquivo.suffix == '.json':
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        return arquivo.name, _linhas_json(dados if isinstance(dados, list) else [dados])
+    if arquivo.suffix == '.xlsx':
+        import openpyxl
+        planilha = openpyxl.load_workbook(arquivo, read_only=True)
+        try:
+            texto = ''
+            for aba in planilha.worksheets:
+                linhas = [list(linha) for linha in aba.iter_rows(values_only=True)]
+                # Só as colunas com algum valor: o gabarito tem dezenas de colunas vazias
+                usadas = [i for i in range(max(map(len, linhas), default=0))
+                          if any(i < len(l) and l[i] not in (None, '') for l in linhas[1:])]
+                texto += f"# {aba.title}\n" + _linhas_json([[l[i] if i < len(l) else None for i in usadas] for l in linhas])
+        finally:
+            planilha.close()
+        return arquivo.name + '.txt', texto
+    return arquivo.name, arquivo.read_text(encoding='utf-8')
+
+
+def saidas_normalizadas(pasta_caso, etapa):
+    pasta = pasta_caso.joinpath(*PASTAS_ETAPA[etapa])
+    return dict(normalizar(arquivo) for arquivo in sorted(pasta.iterdir()) if arquivo.is_file())
+
+
+def rodar_caso(caso, repeticoes=1):
+    """Saídas normalizadas da primeira rodada e, por etapa, o menor tempo e o maior pico de RSS."""
+    parametros = {k: v for k, v in caso.items() if k not in ('nome', 'descricao', 'produtos')}
+    saidas, medidas = None, {}
+    for _ in range(repeticoes):
+        pasta = Path(tempfile.mkdtemp(prefix=f"regressao_{caso['nome']}_"))
+        try:
+            motor, tradutor = preparar_pastas(pasta, codigo_inicial=CODIGO_INICIAL)
+            linhas = gerar_catalogo(motor, caso['produtos'], **parametros)
+            etapas = medir_pasta(motor, tradutor, linhas['custo'] + linhas['venda'],
+                                 com_separador=bool(parametros.get('separadores')))
+            if saidas is None:
+                saidas = {e['etapa']: saidas_normalizadas(pasta, e['etapa']) for e in etapas}
+            for e in etapas:
+                medida = medidas.setdefault(e['etapa'], {'segundos': e['segundos'], 'pico_rss_mb': e['pico_rss_mb']})
+                medida['segundos'] = min(medida['segundos'], e['segundos'])
+                if e['pico_rss_mb'] is not None:
+                    medida['pico_rss_mb'] = max(medida['pico_rss_mb'] or 0, e['pico_rss_mb'])
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+    return saidas, medidas
+
+
+def comparar_saidas(nome_caso, saidas):
+    problemas = []
+    for etapa, arquivos in saidas.items():
+        pasta = PASTA_SAIDAS / nome_caso / etapa
+        referencia = {a.name: a.read_text(encoding='utf-8') for a in sorted(pasta.glob('*'))} if pasta.is_dir() else {}
+        for nome in sorted(set(referencia) - set(arquivos)):
+            problemas.append(f"{etapa}: {nome} não foi gerado")
+        for nome in sorted(set(arquivos) - set(referencia)):
+            problemas.append(f"{etapa}: {nome} gerado, mas não está nas referências")
+        for nome in sorted(set(arquivos) & set(referencia)):
+            if arquivos[nome] == referencia[nome]:
+                continue
+            diff = list(difflib.unified_diff(referencia[nome].splitlines(), arquivos[nome].splitlines(),
+                                             'referência', 'atual', n=1, lineterm=''))
+            resto = f"\n      ... mais {len(diff) - LINHAS_DIFF} linhas" if len(diff) > LINHAS_DIFF else ''
+            problemas.append(f"{etapa}: {nome} mudou\n      " + '\n      '.join(diff[:LINHAS_DIFF]) + resto)
+    return problemas
+
+
+def comparar_orcamento(nome_caso, medidas, orcamento):
+    problemas = []
+    limites = orcamento.get('casos', {}).get(nome_caso, {})
+    for etapa, medida in medidas.items():
+        limite = limites.get(etapa)
+        if limite is None:
+            problemas.append(f"{etapa}: sem orçamento (rode --atualizar-orcamento)")
+            continue
+        maximo = limite['segundos'] * (1 + orcamento['tolerancia_tempo']) + orcamento['folga_segundos']
+        if medida['segundos'] > maximo:
+            problemas.append(f"{etapa}: {medida['segundos']:.3f} s, orçamento {limite['segundos']:.3f} s "
+                             f"(máximo {maximo:.3f} s)")
+        if medida['pico_rss_mb'] is not None and limite.get('pico_rss_mb') is not None:
+            maximo = limite['pico_rss_mb'] * (1 + orcamento['tolerancia_memoria'])
+            if medida['pico_rss_mb'] > maximo:
+                problemas.append(f"{etapa}: pico de {medida['pico_rss_mb']:.0f} MB, orçamento "
+                                 f"{limite['pico_rss_mb']:.0f} MB (máximo {maximo:.0f} MB)")
+    return problemas
+
+
+def _rodar_pipeline(pasta_motor, pasta_tradutor):
+    """Roda em um processo novo: o pipeline importa os módulos das etapas e guarda estado neles."""
+    sys.path.insert(0, str(BASE_DIR))
+    logging.disable(logging.INFO)
+    from pipeline_etl import PipelineETL
+    # Sem o cache das etapas: o cenário mede o que o agendador refaz, não o que o cache esconde
+    PipelineETL(pasta_motor=pasta_motor, pasta_tradutor=pasta_tradutor, cache_etapas=False).executar()
+
+
+def _pipeline(pasta, editar=None, executor=None):
+    """Cria os fornecedores em `pasta`, aplica `editar` e roda o pipeline; retorna a pasta do MOTOR."""
+    motor, tradutor = preparar_pastas(pasta, codigo_inicial=CODIGO_INICIAL)
+    shutil.copytree(BASE_DIR / 'TRADUTOR' / 'gabarito', tradutor / 'gabarito')
+    for fornecedor in FORNECEDORES_INCREMENTAIS:
+        gerar_catalogo(motor, **fornecedor)
+    if editar:
+        editar(motor)
+    executor.submit(_rodar_pipeline, str(motor), str(tradutor)).result()
+    return motor
+
+
+def _saidas_pipeline(pasta):
+    return {etapa: saidas_normalizadas(pasta, etapa) for etapa in ('separador', 'tradutor')}
+
+
+def _sem_codigos_persistentes(texto):
+    """Texto normalizado de um xlsx sem as colunas numeradas pelo histórico (CODIGOS_PERSISTENTES)."""
+    linhas, indices = [], None
+    for linha in texto.splitlines():
+        if linha.startswith('# '):
+            linhas.append(linha)
+            indices = None
+            continue
+        valores = json.loads(linha)
+        if indices is None:
+            # A primeira linha de cada aba é o cabeçalho
+            indices = {i for i, valor in enumerate(valores) if valor in CODIGOS_PERSISTENTES}
+        linhas.append(json.dumps([v for i, v in enumerate(valores) if i not in indices], ensure_ascii=False, default=str))
+    return '\n'.join(linhas)
+
+
+def comparar_incremental(antes, incremental, limpo):
+    problemas = []
+    for etapa in ('separador', 'tradutor'):
+        for nome in sorted(set(incremental[etapa]) - set(limpo[etapa])):
+            problemas.append(f"{etapa}: {nome} sobrou na execução incremental")
+        for nome in sorted(set(limpo[etapa]) - set(incremental[etapa])):
+            problemas.append(f"{etapa}: {nome} faltou na execução incremental")
+
+    for nome in sorted(set(incremental['separador']) & set(limpo['separador'])):
+        if incremental['separador'][nome] != limpo['separador'][nome]:
+            problemas.append(f"separador: {nome} difere da execução limpa")
+
+    mudaram = 0
+    for nome in sorted(set(incremental['tradutor']) & set(limpo['tradutor'])):
+        texto = incremental['tradutor'][nome]
+        if texto != antes['tradutor'].get(nome):
+            mudaram += 1
+        if _sem_codigos_persistentes(texto) != _sem_codigos_persistentes(limpo['tradutor'][nome]):
+            problemas.append(f"tradutor: {nome} difere da execução limpa")
+        entrada = nome.rsplit('.xlsx', 1)[0] + '.json'
+        if incremental['separador'].get(entrada) == antes['separador'].get(entrada) and texto != antes['tradutor'].get(nome):
+            problemas.append(f"tradutor: {nome} foi refeito (COD_PRODUTO ou conteúdo mudou) sem o JSON dele mudar")
+    if not mudaram and incremental['tradutor'] == antes['tradutor']:
+        problemas.append("a edição não mudou nenhuma saída; o cenário não testa nada")
+    return problemas
+
+
+def rodar_cenario(nome, editar):
+    """Execução, edição e nova execução em uma pasta, e uma execução limpa já editada em outra."""
+    pasta = Path(tempfile.mkdtemp(prefix=f"incremental_{nome}_"))
+    contexto = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            motor = _pipeline(pasta / 'incremental', executor=executor)
+            antes = _saidas_pipeline(pasta / 'incremental')
+            editar(motor)
+            executor.submit(_rodar_pipeline, str(motor), str(pasta / 'incremental' / 'TRADUTOR')).result()
+            incremental = _saidas_pipeline(pasta / 'incremental')
+            _pipeline(pasta / 'limpo', editar, executor=executor)
+            limpo = _saidas_pipeline(pasta / 'limpo')
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return comparar_incremental(antes, incremental, limpo)
+
+
+def _rodar_tradutor(pasta_tradutor, arquivos, opcoes):
+    """Roda em um processo novo: traduz só `arquivos` de TRADUTOR/jsons."""
+    sys.path.insert(0, str(BASE_DIR / 'TRADUTOR'))
+    logging.disable(logging.INFO)
+    from tradutor_final import TradutorFinal
+    tradutor = Path(pasta_tradutor)
+    TradutorFinal(pasta_gabarito=str(tradutor / 'gabarito'), pasta_json=str(tradutor / 'jsons'),
+                  pasta_saida=str(tradutor / 'saidas'), pasta_cache=str(tradutor / 'cache'),
+                  arquivo_cod=str(tradutor / 'start_cod_produto.txt'), **opcoes).processar(arquivos=arquivos)
+
+
+def verificar_partes():
+    """foo_2.xlsx de foo_2.json não é parte antiga de foo; as partes que foo gravou antes são."""
+    pasta = Path(tempfile.mkdtemp(prefix="partes_"))
+    contexto = multiprocessing.get_context('spawn')
+    problemas = []
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            motor = _pipeline(pasta, executor=executor)
+            tradutor = pasta / 'TRADUTOR'
+            saidas = tradutor / 'saidas'
+            (tradutor / 'jsons').mkdir()
+            for arquivo in saidas.iterdir():
+                arquivo.unlink()
+            mesclados = sorted((motor / 'json_com_rgex').glob('*.json'))
+            for nome, origem in (('foo_2.json', mesclados[0]), ('foo.json', mesclados[-1])):
+                shutil.copyfile(origem, tradutor / 'jsons' / nome)
+
+            def traduzir(nome, **opcoes):
+                executor.submit(_rodar_tradutor, str(tradutor), [nome], opcoes).result()
+                return sorted(a.name for a in saidas.iterdir() if a.is_file())
+
+            traduzir('foo_2.json')
+            foo_2 = normalizar(saidas / 'foo_2.xlsx')
+            if traduzir('foo.json') != ['foo.xlsx', 'foo_2.xlsx'] or normalizar(saidas / 'foo_2.xlsx') != foo_2:
+                problemas.append("traduzir foo.json apagou ou mudou foo_2.xlsx, a saída de foo_2.json")
+
+            (saidas / 'foo_2.xlsx').unlink(missing_ok=True)
+            (tradutor / 'jsons' / 'foo_2.json').unlink()
+            divididas = traduzir('foo.json', linhas_por_parte=100, dividir_em='arquivos')
+            if len(divididas) < 3:
+                problemas.append(f"foo.json em partes de 100 linhas gerou só {divididas}")
+            if traduzir('foo.json') != ['foo.xlsx']:
+                problemas.append(f"partes antigas de foo ficaram em saidas/: {sorted(a.name for a in saidas.iterdir())}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return problemas
+
+
+def _simular(pasta_motor, pasta_tradutor, opcoes):
+    """Roda em um processo novo: plano do pipeline, como o --simular."""
+    sys.path.insert(0, str(BASE_DIR))
+    logging.disable(logging.INFO)
+    from pipeline_etl import PipelineETL
+    return PipelineETL(pasta_motor=pasta_motor, pasta_tradutor=pasta_tradutor, **opcoes).simular()
+
+
+def verificar_simular():
+    """O --simular só lê: com as pastas de trabalho ainda inexistentes, nada é criado."""
+    pasta = Path(tempfile.mkdtemp(prefix="simular_"))
+    contexto = multiprocessing.get_context('spawn')
+    problemas = []
+    try:
+        motor, tradutor = preparar_pastas(pasta, codigo_inicial=CODIGO_INICIAL)
+        shutil.copytree(BASE_DIR / 'TRADUTOR' / 'gabarito', tradutor / 'gabarito')
+        for fornecedor in FORNECEDORES_INCREMENTAIS:
+            gerar_catalogo(motor, **fornecedor)
+        for nome in ('txt_bruto', 'json_final', 'jsons_mesclados', 'json_com_rgex'):
+            (motor / nome).rmdir()
+        antes = sorted(str(a.relative_to(pasta)) for a in pasta.rglob('*'))
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+            for opcoes in ({}, {'linhas_previa': 10}, {'paralelo': 2}):
+                plano = executor.submit(_simular, str(motor), str(tradutor), opcoes).result()
+                if not plano or not all(motivo for _, motivo in plano):
+                    problemas.append(f"plano com {opcoes} deveria refazer todas as tarefas: {plano}")
+        criados = sorted(set(str(a.relative_to(pasta)) for a in pasta.rglob('*')) - set(antes))
+        if criados:
+            problemas.append(f"--simular criou {criados}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return problemas
+
+
+def gravar_referencias(nome_caso, saidas):
+    pasta_caso = PASTA_SAIDAS / nome_caso
+    shutil.rmtree(pasta_caso, ignore_errors=True)
+    for etapa, arquivos in saidas.items():
+        (pasta_caso / etapa).mkdir(parents=True, exist_ok=True)
+        for nome, texto in arquivos.items():
+            (pasta_caso / etapa / nome).write_text(texto, encoding='utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara as saídas e o desempenho das etapas com as referências")
+    parser.add_argument('--casos', help="nomes dos casos, separados por vírgula (padrão: todos)")
+    parser.add_argument('--repeticoes', type=int, default=1, help="rodadas por caso; vale o menor tempo (padrão: 1)")
+    parser.add_argument('--tolerancia-tempo', type=float, help="fração acima do orçamento de tempo aceita")
+    parser.add_argument('--tolerancia-memoria', type=float, help="fração acima do orçamento de memória aceita")
+    parser.add_argument('--sem-incrementais', action='store_true',
+                        help="não roda os cenários de execução incremental pelo pipeline")
+    atualizar = parser.add_mutually_exclusive_group()
+    atualizar.add_argument('--atualizar', action='store_true', help="aceita as saídas e medidas atuais como referência")
+    atualizar.add_argument('--atualizar-orcamento', action='store_true', help="regrava só o orçamento de tempo e memória")
+    args = parser.parse_args(argv)
+    if args.repeticoes < 1:
+        parser.error("--repeticoes precisa ser maior que zero")
+
+    casos = _ler_json(ARQUIVO_CASOS)
+    if args.casos:
+        nomes = set(args.casos.split(','))
+        desconhecidos = nomes - {c['nome'] for c in casos}
+        if desconhecidos:
+            parser.error(f"casos inexistentes: {', '.join(sorted(desconhecidos))}")
+        casos = [c for c in casos if c['nome'] in nomes]
+
+    orcamento = {**TOLERANCIAS_PADRAO, 'casos': {}, **_ler_json(ARQUIVO_ORCAMENTO, {})}
+    if args.tolerancia_tempo is not None:
+        orcamento['tolerancia_tempo'] = args.tolerancia_tempo
+    if args.tolerancia_memoria is not None:
+        orcamento['tolerancia_memoria'] = args.tolerancia_memoria
+
+    falhas = 0
+    for caso in casos:
+        saidas, medidas = rodar_caso(caso, args.repeticoes)
+        total = sum(m['segundos'] for m in medidas.values())
+
+        if args.atualizar or args.atualizar_orcamento:
+            orcamento['casos'][caso['nome']] = medidas
+            if args.atualizar:
+                gravar_referencias(caso['nome'], saidas)
+            print(f"{caso['nome']}: referência atualizada ({total:.2f} s)")
+            continue
+
+        problemas = comparar_saidas(caso['nome'], saidas) + comparar_orcamento(caso['nome'], medidas, orcamento)
+        print(f"{caso['nome']}: {'FALHOU' if problemas else 'ok'} ({total:.2f} s)")
+        for problema in problemas:
+            print(f"    {problema}")
+        falhas += bool(problemas)
+
+    if args.atualizar or args.atualizar_orcamento:
+        orcamento['maquina'] = f"{platform.platform()}, Python {platform.python_version()}"
+        _gravar_json(ARQUIVO_ORCAMENTO, orcamento)
+        return 0
+
+    if not args.sem_incrementais:
+        for nome, (descricao, editar) in CENARIOS_INCREMENTAIS.items():
+            inicio = time.perf_counter()
+            problemas = rodar_cenario(nome, editar)
+            print(f"incremental/{nome}: {'FALHOU' if problemas else 'ok'} ({time.perf_counter() - inicio:.2f} s, {descricao})")
+            for problema in problemas:
+                print(f"    {problema}")
+            falhas += bool(problemas)
+
+    problemas = verificar_partes()
+    print(f"partes/colisao: {'FALHOU' if problemas else 'ok'} (foo_2.json e as partes de foo.json)")
+    for problema in problemas:
+        print(f"    {problema}")
+    falhas += bool(problemas)
+
+    problemas = verificar_simular()
+    print(f"simular/sem_efeitos: {'FALHOU' if problemas else 'ok'} (o plano não cria pastas)")
+    for problema in problemas:
+        print(f"    {problema}")
+    falhas += bool(problemas)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
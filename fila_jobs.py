@@ -0,0 +1,174 @@
+"""Fila local de execuções do pipeline, para rodar sem interface (cron, servidor Linux).
+
+    python fila_jobs.py adicionar [opções do pipeline_etl]   # enfileira um lote
+    python fila_jobs.py processar [-q]                       # roda os pendentes, um depois do outro
+    python fila_jobs.py listar
+
+Cada job é um JSON em fila/pendentes/ com os argumentos do pipeline_etl
+(--sem-separador, --paralelo, --pasta-motor, ...), validados na hora de
+enfileirar. `processar` roda os jobs em ordem de chegada, inclusive os que
+chegarem enquanto ele roda, e move cada um para fila/concluidos/ ou
+fila/falhos/ com início, fim, duração, código de saída e contagens. O log de
+cada job fica em fila/logs/<id>.log.
+
+Só um `processar` roda por vez: se o cron disparar outro antes do anterior
+terminar, ele sai com código 3 sem fazer nada. Exemplo de crontab:
+
+    */10 * * * * cd /opt/etl && python3 fila_jobs.py processar -q
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from pipeline_etl import (BASE_DIR, COMUM_PATH, SAIDA_ERRO, SAIDA_OCUPADO, SAIDA_OK,
+                          configurar_logging, criar_parser, executar_cli)
+
+sys.path.insert(0, str(COMUM_PATH))
+from trava_arquivo import TravaExclusiva
+
+PASTA_FILA = BASE_DIR / 'fila'
+SITUACOES = ('pendentes', 'em_execucao', 'concluidos', 'falhos')
+
+
+class FilaJobs:
+    def __init__(self, pasta=PASTA_FILA):
+        self.pasta = Path(pasta)
+        for nome in SITUACOES + ('logs',):
+            (self.pasta / nome).mkdir(parents=True, exist_ok=True)
+
+    def _gravar(self, situacao, job):
+        caminho = self.pasta / situacao / f"{job['id']}.json"
+        temporario = caminho.with_suffix('.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+        return caminho
+
+    def adicionar(self, argumentos):
+        """Enfileira uma execução do pipeline_etl com `argumentos` (lista, como na linha de comando)."""
+        args = criar_parser().parse_args(argumentos)
+        if args.simular:
+            raise ValueError("--simular não faz sentido na fila; rode pipeline_etl.py --simular direto")
+
+        agora = datetime.now()
+        job = {
+            'id': f"{agora:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}",
+            'argumentos': list(argumentos),
+            'criado_em': agora.isoformat(timespec='seconds'),
+        }
+        self._gravar('pendentes', job)
+        return job
+
+    def listar(self, situacao):
+        jobs = []
+        for arquivo in sorted((self.pasta / situacao).glob('*.json')):
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                jobs.append(json.load(f))
+        return jobs
+
+    def _recuperar_interrompidos(self):
+        # Com a trava do processador, nada em em_execucao está rodando: é de um processar que morreu
+        for arquivo in (self.pasta / 'em_execucao').glob('*.json'):
+            logging.warning(f"Job {arquivo.stem} interrompido em uma execução anterior; voltando para a fila")
+            os.replace(arquivo, self.pasta / 'pendentes' / arquivo.name)
+
+    def _executar(self, arquivo, console):
+        em_execucao = self.pasta / 'em_execucao' / arquivo.name
+        os.replace(arquivo, em_execucao)
+        with open(em_execucao, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+
+        arquivo_log = configurar_logging(arquivo_log=self.pasta / 'logs' / f"{job['id']}.log", console=console)
+        logging.info(f"Job {job['id']}: pipeline_etl {' '.join(job['argumentos'])}".rstrip())
+        job['inicio'] = datetime.now().isoformat(timespec='seconds')
+        inicio = time.perf_counter()
+
+        codigo, contagens = executar_cli(criar_parser().parse_args(job['argumentos']), arquivo_log)
+
+        segundos = time.perf_counter() - inicio
+        job.update({
+            'fim': datetime.now().isoformat(timespec='seconds'),
+            'segundos': round(segundos, 1),
+            'codigo_saida': codigo,
+            'contagens': contagens,
+            'log': str(arquivo_log),
+        })
+        logging.info(f"Job {job['id']} terminou com código {codigo} em {segundos:.1f} s")
+
+        if codigo == SAIDA_OCUPADO:
+            # A interface (ou outro processo) está usando as pastas: o job espera a próxima rodada
+            os.replace(em_execucao, arquivo)
+        else:
+            self._gravar('concluidos' if codigo == SAIDA_OK else 'falhos', job)
+            em_execucao.unlink()
+        return job
+
+    def processar(self, console=True):
+        """Roda os jobs pendentes em ordem e retorna o código de saída do lote."""
+        trava = TravaExclusiva(self.pasta / 'processador.lock')
+        if not trava.adquirir():
+            print(f"Outro processamento da fila já está rodando em {self.pasta}", file=sys.stderr)
+            return SAIDA_OCUPADO
+
+        try:
+            self._recuperar_interrompidos()
+            falhas = 0
+            while True:
+                pendentes = sorted((self.pasta / 'pendentes').glob('*.json'))
+                if not pendentes:
+                    break
+                job = self._executar(pendentes[0], console)
+                if job['codigo_saida'] == SAIDA_OCUPADO:
+                    return SAIDA_OCUPADO
+                if job['codigo_saida'] != SAIDA_OK:
+                    falhas += 1
+            return SAIDA_ERRO if falhas else SAIDA_OK
+        finally:
+            trava.liberar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fila local de execuções do pipeline_etl",
+        epilog=f"processar sai com {SAIDA_OK} se todos os jobs deram certo, {SAIDA_ERRO} se algum falhou "
+               f"e {SAIDA_OCUPADO} se outro processamento (ou a interface) está rodando"
+    )
+    parser.add_argument('--pasta-fila', default=str(PASTA_FILA), help="pasta da fila (padrão: ./fila)")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('adicionar', help="enfileira um lote; os demais argumentos vão para o pipeline_etl")
+    processar = comandos.add_parser('processar', help="roda os jobs pendentes, um depois do outro")
+    processar.add_argument('-q', '--silencioso', action='store_true', help="escreve só nos logs dos jobs")
+    comandos.add_parser('listar', help="mostra os jobs de cada situação")
+
+    args, argumentos_pipeline = parser.parse_known_args(argv)
+    if args.comando != 'adicionar' and argumentos_pipeline:
+        parser.error(f"argumentos não reconhecidos: {' '.join(argumentos_pipeline)}")
+
+    fila = FilaJobs(args.pasta_fila)
+
+    if args.comando == 'adicionar':
+        try:
+            job = fila.adicionar(argumentos_pipeline)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Job {job['id']} enfileirado")
+        return SAIDA_OK
+
+    if args.comando == 'processar':
+        return fila.processar(console=not args.silencioso)
+
+    for situacao in SITUACOES:
+        for job in fila.listar(situacao):
+            detalhes = f" código {job['codigo_saida']} em {job['segundos']} s" if 'codigo_saida' in job else ""
+            print(f"{situacao:<12} {job['id']}  {' '.join(job['argumentos']) or '(padrão)'}{detalhes}")
+    return SAIDA_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Modo daemon: observa MOTOR/planilhas e MOTOR/configs e roda o pipeline sozinho.
+
+    python observador_pastas.py [opções do pipeline_etl] [--espera S] [--intervalo S]
+
+Quando uma planilha ou config é criada, alterada ou removida, o observador
+espera os arquivos pararem de mudar por `--espera` segundos (cópias e
+gravações pela metade) e roda o pipeline. O grafo de tarefas é montado de
+novo a cada rodada, então configs novas ou editadas valem na hora, e só os
+ramos das planilhas e configs alteradas são refeitos; os outros ficam em dia.
+Os módulos das etapas são importados uma vez só, na primeira rodada.
+
+Com o pacote watchdog instalado, o observador acorda pelos eventos do sistema
+(inotify no Linux); sem ele, compara as pastas a cada `--intervalo` segundos.
+Na partida roda uma vez, para pegar o que chegou com o observador parado
+(`--forcar` vale só para essa rodada). Ctrl+C ou SIGTERM encerram.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pipeline_etl import SAIDA_INTERROMPIDO, SAIDA_OCUPADO, SAIDA_OK, configurar_logging, criar_parser, executar_cli
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+EXTENSOES = {'planilhas': ('.xlsx', '.xls'), 'configs': ('.json',)}
+
+# Sem eventos do sistema, confere as pastas mesmo assim de tempos em tempos
+INTERVALO_SEGURANCA = 30
+
+
+def _ignorado(nome):
+    # Travas do Excel (~$arquivo.xlsx), ocultos e temporários de cópia/download
+    return nome.startswith(('~$', '.')) or nome.endswith(('.tmp', '.part', '.crdownload'))
+
+
+class _Despertador(FileSystemEventHandler):
+    """Acorda o observador a cada evento do watchdog; a comparação das pastas decide o resto."""
+
+    def __init__(self, acordar):
+        super().__init__()
+        self.acordar = acordar
+
+    def on_any_event(self, event):
+        self.acordar.set()
+
+
+class ObservadorPastas:
+    def __init__(self, pasta_motor, espera=2.0, intervalo=1.0, usar_eventos=True):
+        self.pastas = {nome: Path(pasta_motor) / nome for nome in EXTENSOES}
+        self.espera = espera
+        self.intervalo = intervalo
+        self.usar_eventos = usar_eventos and Observer is not None
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._observer = None
+
+    def iniciar(self):
+        if not self.usar_eventos:
+            logging.info(f"Observando {', '.join(map(str, self.pastas.values()))} a cada {self.intervalo:g} s")
+            return
+        self._observer = Observer()
+        for pasta in self.pastas.values():
+            if pasta.is_dir():
+                self._observer.schedule(_Despertador(self._acordar), str(pasta), recursive=False)
+        self._observer.start()
+        logging.info(f"Observando {', '.join(map(str, self.pastas.values()))} (eventos do sistema)")
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def retrato(self):
+        """{caminho: (tamanho, data de modificação)} das planilhas e configs."""
+        retrato = {}
+        for nome, pasta in self.pastas.items():
+            try:
+                entradas = list(os.scandir(pasta))
+            except FileNotFoundError:
+                continue
+            for entrada in entradas:
+                if not entrada.name.lower().endswith(EXTENSOES[nome]) or _ignorado(entrada.name):
+                    continue
+                try:
+                    if entrada.is_file():
+                        info = entrada.stat()
+                        retrato[entrada.path] = (info.st_size, info.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+        return retrato
+
+    @staticmethod
+    def diferencas(antes, depois):
+        alterados = set(antes) ^ set(depois)
+        alterados.update(c for c in set(antes) & set(depois) if antes[c] != depois[c])
+        return sorted(alterados)
+
+    def aguardar(self, segundos):
+        """Dorme `segundos` ou até o próximo evento do sistema de arquivos."""
+        self._acordar.wait(segundos)
+        self._acordar.clear()
+
+    def esperar_mudanca(self, referencia):
+        """Espera as pastas mudarem em relação a `referencia` e ficarem `espera` segundos
+        sem mudar. Retorna (novo retrato, arquivos alterados), ou None se o observador parou."""
+        while not self._parar.is_set():
+            atual = self.retrato()
+            if atual == referencia:
+                self.aguardar(INTERVALO_SEGURANCA if self._observer else self.intervalo)
+                continue
+
+            # Debounce: cópias grandes e gravações do Excel chegam em várias partes
+            estavel_desde = time.monotonic()
+            while not self._parar.is_set() and time.monotonic() - estavel_desde < self.espera:
+                self.aguardar(min(self.intervalo, self.espera))
+                novo = self.retrato()
+                if novo != atual:
+                    atual, estavel_desde = novo, time.monotonic()
+
+            alterados = self.diferencas(referencia, atual)
+            if alterados and not self._parar.is_set():
+                return atual, alterados
+            referencia = atual
+        return None
+
+
+def _encerrar(*_):
+    raise KeyboardInterrupt
+
+
+def observar(observador, args, arquivo_log):
+    """Laço do daemon: roda o pipeline na partida e a cada mudança nas pastas."""
+    retrato = observador.retrato()
+    while True:
+        inicio = time.perf_counter()
+        codigo, contagens = executar_cli(args, arquivo_log)
+        args.forcar = False
+        if codigo == SAIDA_INTERROMPIDO:
+            return codigo
+        if codigo == SAIDA_OCUPADO:
+            # A interface ou a fila estão usando as pastas: tenta de novo em seguida
+            logging.info(f"Pipeline ocupado; nova tentativa em {INTERVALO_SEGURANCA} s")
+            observador.aguardar(INTERVALO_SEGURANCA)
+            continue
+        if codigo == SAIDA_OK:
+            logging.info(f"Rodada concluída em {time.perf_counter() - inicio:.1f} s "
+                         f"({contagens['executadas']} tarefas executadas, {contagens['em_dia']} em dia)")
+        else:
+            logging.info("Rodada com erro; aguardando a próxima mudança nas pastas")
+
+        mudanca = observador.esperar_mudanca(retrato)
+        if mudanca is None:
+            return SAIDA_OK
+        retrato, alterados = mudanca
+        logging.info(f"Alterados: {', '.join(os.path.basename(c) for c in alterados)}")
+
+
+def main(argv=None):
+    parser = criar_parser()
+    parser.description = "Observa as planilhas e configs do MOTOR e roda o pipeline a cada mudança"
+    parser.add_argument('--espera', type=float, default=2.0,
+                        help="segundos sem mudança nos arquivos antes de rodar (padrão: 2)")
+    parser.add_argument('--intervalo', type=float, default=1.0,
+                        help="segundos entre comparações das pastas sem watchdog (padrão: 1)")
+    parser.add_argument('--sem-eventos', action='store_true',
+                        help="compara as pastas periodicamente mesmo com o watchdog instalado")
+    args = parser.parse_args(argv)
+    if args.simular:
+        parser.error("--simular não se aplica ao observador; use pipeline_etl.py --simular")
+
+    pasta_logs = Path(args.pasta_logs or Path(args.pasta_motor) / 'logs')
+    arquivo_log = configurar_logging(
+        arquivo_log=pasta_logs / f"observador_{datetime.now():%Y%m%d_%H%M%S}.log", console=not args.silencioso
+    )
+    if Observer is None and not args.sem_eventos:
+        logging.info("watchdog não instalado; usando comparação periódica das pastas")
+
+    observador = ObservadorPastas(args.pasta_motor, args.espera, args.intervalo, usar_eventos=not args.sem_eventos)
+    signal.signal(signal.SIGTERM, _encerrar)
+    observador.iniciar()
+    try:
+        return observar(observador, args, arquivo_log)
+    except KeyboardInterrupt:
+        logging.info("Observador encerrado")
+        return SAIDA_OK
+    finally:
+        observador.parar()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
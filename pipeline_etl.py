@@ -0,0 +1,819 @@
+"""Executa as etapas do ETL (conversor → gerador → mesclador → separador → tradutor) em um único processo.
+
+As etapas viram tarefas de um grafo de dependências (COMUM/agendador.py):
+conversor e gerador por planilha, mesclador por config de fornecedor,
+separador por par de configs (os mesclados de uma com os separadores da
+outra) e um tradutor no fim de cada ramo, só com os JSONs dele. Os
+tradutores rodam um de cada vez, na ordem do grafo (a sequência de
+COD_PRODUTO é uma só). Cada execução refaz só as tarefas cujas
+entradas, configs ou código mudaram desde a anterior; com `--paralelo N`,
+ramos de fornecedores diferentes rodam ao mesmo tempo. Dentro das tarefas que
+rodam, o que já foi gerado antes com as mesmas entradas sai do cache das
+etapas (COMUM/cache_etapas.py).
+
+Os módulos do MOTOR e do TRADUTOR são importados uma vez e as classes são
+chamadas direto, sem abrir um interpretador por etapa. Rodando no processo
+principal, os JSONs gravados por uma etapa ficam em memória (MemoriaJSON) e a
+etapa seguinte os usa sem reler do disco. Usado pelo LuiHomeApp e pela linha
+de comando:
+
+    python pipeline_etl.py [--sem-separador] [--simular] [--forcar] [--paralelo N] [-p N] [--previa N] ...
+"""
+import argparse
+import contextlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+MOTOR_PATH = BASE_DIR / 'MOTOR'
+TRADUTOR_PATH = BASE_DIR / 'TRADUTOR'
+COMUM_PATH = BASE_DIR / 'COMUM'
+
+_etapas = None
+
+# Memória compartilhada entre as tarefas quando elas rodam no processo principal
+_memoria = None
+
+# Nos processos do modo paralelo, pasta onde cada tarefa deixa suas medidas para o manifesto
+_pasta_medidas = None
+
+# Cache das saídas das etapas (COMUM/cache_etapas.py), em todos os processos
+_cache_etapas = None
+
+
+def _carregar_etapas():
+    """Importa as classes das etapas (e o pandas) só na primeira execução."""
+    global _etapas
+    if _etapas is None:
+        for pasta in (COMUM_PATH, MOTOR_PATH, TRADUTOR_PATH):
+            if str(pasta) not in sys.path:
+                sys.path.insert(0, str(pasta))
+
+        from conversor_etl import ConversorPlanilhasTXT, config_para_planilha
+        from geradorJSON import GeradorJSON
+        from mescladorJSON import GeradorJSONMesclado
+        from separadorVariacoes import SeparadorVariacoes
+        from tradutor_final import TradutorFinal
+        from memoria_json import MemoriaJSON
+        from entrega_arquivos import entregar_arquivos, registrar_entrega
+        from agendador import Agendador, ErroTarefa, Tarefa
+        from trava_arquivo import TravaExclusiva
+        import progresso
+        import metricas
+        import perfil
+        import manifesto
+        from cache_etapas import CacheEtapas
+
+        _etapas = {
+            'conversor': ConversorPlanilhasTXT,
+            'config_para_planilha': config_para_planilha,
+            'gerador': GeradorJSON,
+            'mesclador': GeradorJSONMesclado,
+            'separador': SeparadorVariacoes,
+            'tradutor': TradutorFinal,
+            'memoria': MemoriaJSON,
+            'entregar': entregar_arquivos,
+            'registrar_entrega': registrar_entrega,
+            'agendador': Agendador,
+            'erro_tarefa': ErroTarefa,
+            'tarefa': Tarefa,
+            'progresso': progresso,
+            'metricas': metricas,
+            'perfil': perfil,
+            'manifesto': manifesto,
+            'cache_etapas': CacheEtapas,
+            'trava': TravaExclusiva,
+        }
+    return _etapas
+
+
+# Códigos de saída da linha de comando (2 é o do argparse para argumentos inválidos)
+SAIDA_OK = 0
+SAIDA_ERRO = 1
+SAIDA_OCUPADO = 3
+SAIDA_INTERROMPIDO = 130
+
+
+class ErroEtapa(Exception):
+    def __init__(self, etapa, mensagem):
+        super().__init__(mensagem)
+        self.etapa = etapa
+
+
+class PipelineOcupado(ErroEtapa):
+    """Outra execução (interface, cron, fila) já está usando as mesmas pastas."""
+
+
+def contar_arquivos(pasta, extensao=""):
+    try:
+        return len([f for f in os.listdir(pasta) if f.endswith(extensao)])
+    except OSError:
+        return 0
+
+
+# Tarefas do grafo. Recebem as saídas das dependências e retornam os arquivos gerados.
+
+# `trabalho` é a pasta dos intermediários (a do MOTOR, ou MOTOR/previa na prévia).
+
+@contextlib.contextmanager
+def _medidas_da_tarefa(etapa):
+    """Em um processo do modo paralelo, mede a tarefa e grava as medidas para o processo principal."""
+    if _pasta_medidas is None:
+        yield
+        return
+    metricas = _carregar_etapas()['metricas']
+    medidas = metricas.Metricas()
+    medidas.etapa = etapa
+    metricas.coletar(medidas)
+    try:
+        yield
+    finally:
+        metricas.coletar(None)
+        os.makedirs(_pasta_medidas, exist_ok=True)
+        with open(Path(_pasta_medidas) / f"{etapa}_{os.getpid()}_{id(medidas)}.json", 'w', encoding='utf-8') as f:
+            json.dump(medidas.exportar(), f, ensure_ascii=False)
+
+
+def _tarefa_conversor(_, pasta_motor, planilha, trabalho=None, linhas_previa=None):
+    motor = Path(pasta_motor)
+    conversor = _carregar_etapas()['conversor'](
+        pasta_origem=motor / 'planilhas', pasta_destino=Path(trabalho or motor) / 'txt_bruto',
+        pasta_config=motor / 'configs', linhas_previa=linhas_previa, cache=_cache_etapas
+    )
+    with _medidas_da_tarefa('conversor'):
+        conversor.fase1_conversao_bruta([planilha])
+    return conversor.gerados
+
+
+def _tarefa_gerador(txts, pasta_motor, trabalho=None):
+    motor = Path(pasta_motor)
+    trabalho = Path(trabalho or motor)
+    gerador = _carregar_etapas()['gerador'](
+        pasta_txt=trabalho / 'txt_bruto', pasta_destino=trabalho / 'json_final',
+        pasta_config=motor / 'configs', memoria=_memoria, cache=_cache_etapas
+    )
+    with _medidas_da_tarefa('gerador'):
+        gerador.gerar_json_final(txts)
+    return gerador.gerados
+
+
+def _tarefa_mesclador(jsons, pasta_motor, trabalho=None):
+    motor = Path(pasta_motor)
+    trabalho = Path(trabalho or motor)
+    mesclador = _carregar_etapas()['mesclador'](
+        pasta_json=trabalho / 'json_final', pasta_destino=trabalho / 'jsons_mesclados',
+        pasta_config=motor / 'configs', memoria=_memoria, cache=_cache_etapas
+    )
+    with _medidas_da_tarefa('mesclador'):
+        mesclador.gerar_json_final(jsons)
+    if _memoria is not None:
+        for arquivo in jsons:
+            _memoria.descartar(arquivo)
+    return mesclador.gerados
+
+
+def _tarefa_separador(mesclados, pasta_motor, config, trabalho=None):
+    motor = Path(pasta_motor)
+    trabalho = Path(trabalho or motor)
+    separador = _carregar_etapas()['separador'](
+        pasta_json_mesclado=trabalho / 'jsons_mesclados', pasta_config=motor / 'configs',
+        pasta_destino=trabalho / 'json_com_rgex', memoria=_memoria, cache=_cache_etapas
+    )
+    with _medidas_da_tarefa('separador'):
+        separador.processar_todos(mesclados, configs=[config])
+    return separador.gerados
+
+
+def _ler_config(caminho):
+    # Config ilegível: as etapas avisam e a ignoram ao procurar a config de cada arquivo
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _entregar_jsons(origem, pasta_tradutor, modo, nomes=None):
+    etapas = _carregar_etapas()
+    estatisticas = pasta_tradutor / 'cache' / 'entrega.json'
+    estatisticas.parent.mkdir(parents=True, exist_ok=True)
+
+    resultado = etapas['entregar'](origem, pasta_tradutor / 'jsons', modo, arquivo_estatisticas=estatisticas,
+                                   nomes=nomes)
+    etapas['registrar_entrega'](resultado, estatisticas)
+
+    if _memoria is not None and Path(resultado.pasta) != Path(origem):
+        for nome in nomes if nomes is not None else [a.name for a in Path(origem).glob('*.json')]:
+            _memoria.vincular(Path(resultado.pasta) / nome, Path(origem) / nome)
+    return resultado
+
+
+def _tarefa_tradutor(jsons, pasta_tradutor, entrega, opcoes, pasta_gabarito=None, usar_cache=False):
+    """Traduz só os JSONs do ramo (`jsons`, as saídas do mesclador ou do separador)."""
+    if not jsons:
+        return []
+    tradutor = Path(pasta_tradutor)
+    nomes = [Path(j).name for j in jsons]
+    origem = Path(jsons[0]).parent
+    resultado = _entregar_jsons(origem, tradutor, entrega, nomes)
+    final = _carregar_etapas()['tradutor'](
+        pasta_gabarito=str(pasta_gabarito or tradutor / 'gabarito'), pasta_json=str(resultado.pasta),
+        pasta_saida=str(tradutor / 'saidas'), pasta_cache=str(tradutor / 'cache'),
+        arquivo_cod=str(tradutor / 'start_cod_produto.txt'), memoria=_memoria,
+        cache=_cache_etapas if usar_cache else None, **opcoes
+    )
+    with _medidas_da_tarefa('tradutor'):
+        final.processar(arquivos=nomes)
+    # As cópias em TRADUTOR/jsons também são saídas: somem quando o ramo deixa de gerá-las
+    entregues = [Path(resultado.pasta) / nome for nome in nomes] if Path(resultado.pasta) != origem else []
+    return final.arquivos_gerados + entregues
+
+
+def _iniciar_processo_tarefa(arquivo_log, pasta_medidas=None, cache_etapas=None):
+    """Processos do modo paralelo escrevem no mesmo log da execução."""
+    global _pasta_medidas, _cache_etapas
+    _pasta_medidas = pasta_medidas
+    _cache_etapas = cache_etapas
+    handlers = [logging.StreamHandler(sys.stdout)] if sys.stdout is not None else []
+    if arquivo_log:
+        handlers.append(logging.FileHandler(arquivo_log, encoding='utf-8'))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=handlers,
+        force=True
+    )
+
+
+class PipelineETL:
+    def __init__(self, pasta_motor=MOTOR_PATH, pasta_tradutor=TRADUTOR_PATH, usar_separador=True,
+                 ao_iniciar_etapa=None, entrega='direto', paralelo=1, forcar=False, arquivo_log=None,
+                 progresso=None, linhas_previa=None, metricas=None, prometheus=None,
+                 perfil=None, perfil_memoria=None, cache_etapas=True, limite_cache_mb=None, cache_tradutor=None,
+                 **opcoes_tradutor):
+        """`usar_separador` pode ser um bool ou uma função chamada antes de montar
+        o grafo (o LuiHomeApp pergunta ao usuário nesse momento). `entrega` define
+        como os JSONs chegam ao tradutor: 'direto' (lê da pasta do MOTOR), 'link'
+        (hardlinks em TRADUTOR/jsons) ou 'copia'. `paralelo` é o número de tarefas
+        rodando ao mesmo tempo e `forcar` refaz tudo, mesmo o que está em dia;
+        `arquivo_log` é o log que os processos do modo paralelo também usam.
+        `progresso` (progresso.Progresso) recebe os eventos de cada tarefa e
+        arquivo; no modo paralelo só chegam os eventos de início e fim de tarefa.
+        Com `linhas_previa` o conversor lê só as primeiras N linhas de cada aba, e
+        intermediários, estado e saídas vão para MOTOR/previa e TRADUTOR/previa.
+        `metricas` grava tempos, linhas e pico de memória por etapa e arquivo em
+        JSON (True para MOTOR/logs/metricas_<data>.json, ou o caminho), e
+        `prometheus` no formato texto do Prometheus, mesmo quando a execução falha.
+        O manifesto (COMUM/manifesto.py) é gravado em toda execução, em
+        MOTOR/logs/manifesto_<data>.json.
+        `perfil` (alvos de COMUM/perfil.py, True para os padrões) passa esses
+        alvos pelo cProfile, e `perfil_memoria` também pelo tracemalloc; os dumps
+        e o resumo vão para MOTOR/logs. Sem eles, valem ETL_PERFIL e ETL_PERFIL_MEMORIA.
+        `cache_etapas` guarda as saídas de cada etapa pelo hash do que as produz
+        (COMUM/cache_etapas.py) em MOTOR/cache/etapas, ou na pasta informada (a API
+        usa a do MOTOR de verdade); False desliga. Com `forcar` nada sai do cache.
+        `limite_cache_mb` é o tamanho a partir do qual as entradas mais antigas saem.
+        No tradutor a chave inclui o início da faixa de COD_PRODUTO, que na produção só
+        avança: o cache só é usado nele com `cache_tradutor`, quando a numeração parte
+        de uma cópia do contador (padrão na prévia; a API liga nos jobs).
+        `opcoes_tradutor` vai para o TradutorFinal (processos, cor_persistente, formato, ...)."""
+        self.pasta_motor = Path(pasta_motor)
+        self.pasta_tradutor = Path(pasta_tradutor)
+        self.linhas_previa = linhas_previa
+        self.pasta_trabalho = self.pasta_motor / 'previa' if linhas_previa else self.pasta_motor
+        self.pasta_saida_tradutor = self.pasta_tradutor / 'previa' if linhas_previa else self.pasta_tradutor
+        self.usar_separador = usar_separador
+        self.entrega = entrega
+        self.paralelo = paralelo
+        self.forcar = forcar
+        self.ao_iniciar_etapa = ao_iniciar_etapa
+        self.opcoes_tradutor = opcoes_tradutor
+        self.arquivo_log = arquivo_log
+        self.progresso = progresso
+        self.metricas = metricas
+        self.prometheus = prometheus
+        self.arquivo_metricas = None
+        self.arquivo_manifesto = None
+        self.manifesto = None
+        self._metricas = None
+        self._agendador = None
+        self._situacoes = {}
+        self.perfil = perfil
+        self.perfil_memoria = perfil_memoria
+        self.arquivos_perfil = []
+        self.cache_etapas = cache_etapas
+        self.limite_cache_mb = limite_cache_mb
+        self.cache_tradutor = bool(linhas_previa) if cache_tradutor is None else cache_tradutor
+        self.contagens = {}
+        self._concluidas = 0
+        self._total = 0
+
+    def _executar_etapa(self, etapa, funcao):
+        try:
+            return funcao()
+        except SystemExit as e:
+            # As classes do MOTOR chamam exit(1) quando falta config
+            raise ErroEtapa(etapa, f"{etapa} encerrou com código {e.code} (veja o log)") from e
+        except ErroEtapa:
+            raise
+        except Exception as e:
+            logging.exception(f"Erro na etapa {etapa}")
+            raise ErroEtapa(etapa, f"{type(e).__name__}: {e}") from e
+
+    def _ao_iniciar_tarefa(self, tarefa, motivo):
+        numero = self._concluidas + 1
+        if self._metricas:
+            self._metricas.iniciar_tarefa(tarefa.nome)
+        if self.progresso:
+            self.progresso.iniciar_tarefa(numero, self._total, tarefa.descricao)
+        if self.ao_iniciar_etapa:
+            self.ao_iniciar_etapa(numero, self._total, tarefa.descricao)
+
+    def _ao_terminar_tarefa(self, tarefa, situacao):
+        self._concluidas += 1
+        self._situacoes[tarefa.nome] = situacao
+        if self._metricas:
+            self._metricas.terminar_tarefa(tarefa.nome, situacao)
+        if self.progresso and situacao == 'executada':
+            self.progresso.terminar_tarefa(situacao)
+
+    def _chave_tradutor(self, classe):
+        """Opções do tradutor que mudam a saída, com os padrões preenchidos, para que
+        omitir uma opção ou passá-la com o valor padrão dê a mesma assinatura."""
+        parametros = inspect.signature(classe).parameters
+        opcoes = {nome: p.default for nome, p in parametros.items() if p.default is not inspect.Parameter.empty}
+        opcoes.update(self.opcoes_tradutor)
+        # Pastas vêm do grafo; o número de processos não muda a saída
+        for nome in ('pasta_gabarito', 'pasta_json', 'pasta_saida', 'pasta_cache', 'arquivo_cod', 'memoria', 'processos'):
+            opcoes.pop(nome, None)
+        return opcoes
+
+    def _montar_grafo(self, cache=None):
+        """Só lê configs, planilhas e o estado do agendador: nenhuma pasta é criada aqui.
+        `cache` (CacheEtapas) vai para os processos do modo paralelo."""
+        etapas = _carregar_etapas()
+        Tarefa = etapas['tarefa']
+        motor = self.pasta_motor
+        trabalho = self.pasta_trabalho
+        codigo = {nome: inspect.getfile(etapas[nome]) for nome in ('conversor', 'gerador', 'mesclador', 'separador')}
+        memoria_json = COMUM_PATH / 'memoria_json.py'
+        # Na prévia as tarefas recebem a pasta de trabalho; fora dela os argumentos ficam como sempre
+        etapa = {'pasta_motor': str(motor)}
+        if self.linhas_previa:
+            etapa['trabalho'] = str(trabalho)
+
+        usar_separador = self.usar_separador() if callable(self.usar_separador) else self.usar_separador
+        agendador = etapas['agendador'](
+            trabalho / 'cache' / 'agendador.json', paralelo=self.paralelo, ao_iniciar=self._ao_iniciar_tarefa,
+            ao_terminar=self._ao_terminar_tarefa, inicializador=_iniciar_processo_tarefa,
+            argumentos_inicializador=(self.arquivo_log, str(self._pasta_medidas()), cache)
+        )
+
+        # Um ramo por config de fornecedor, com as planilhas que o conversor associa a ela
+        grupos = {}
+        for planilha in list((motor / 'planilhas').glob('*.xlsx')) + list((motor / 'planilhas').glob('*.xls')):
+            grupos.setdefault(etapas['config_para_planilha'](motor / 'configs', planilha.name), []).append(planilha)
+        configs = sorted(p for p in (motor / 'configs').glob('*.json') if p.name != '.gitkeep')
+        # Gerador e mesclador escolhem a config de cada arquivo comparando com o 'files' de todas
+        arquivos_configs = {config.name: _ler_config(config).get('files') for config in configs}
+
+        # Cada ramo depende só da sua config; o nome dela entra na chave para que uma
+        # planilha que passe a casar com outra config (config nova, 'files' editado) seja refeita
+        finais = []
+        for config, planilhas in sorted(grupos.items()):
+            geradores = []
+            for planilha in planilhas:
+                argumentos = {**etapa, 'planilha': planilha.name}
+                if self.linhas_previa:
+                    argumentos['linhas_previa'] = self.linhas_previa
+                agendador.adicionar(Tarefa(
+                    f"conversor:{planilha.name}", _tarefa_conversor, argumentos,
+                    chave={**argumentos, 'config': config.name},
+                    entradas=[planilha, config], codigo=[codigo['conversor'], COMUM_PATH / 'indice_planilhas.py'],
+                    descricao=f"Conversor ETL ({planilha.name})"
+                ))
+                geradores.append(agendador.adicionar(Tarefa(
+                    f"gerador:{planilha.name}", _tarefa_gerador, etapa,
+                    chave={**etapa, 'config': config.name, 'arquivos_configs': arquivos_configs},
+                    dependencias=[f"conversor:{planilha.name}"], entradas=[config],
+                    codigo=[codigo['gerador'], memoria_json],
+                    descricao=f"Gerador JSON ({planilha.name})"
+                )).nome)
+
+            mesclador = agendador.adicionar(Tarefa(
+                f"mesclador:{config.name}", _tarefa_mesclador, etapa,
+                chave={**etapa, 'arquivos_configs': arquivos_configs},
+                dependencias=geradores, entradas=[config],
+                codigo=[codigo['mesclador'], memoria_json, COMUM_PATH / 'precos.py'],
+                descricao=f"Mesclador JSON ({config.name})"
+            ))
+            if not usar_separador:
+                finais.append(mesclador.nome)
+                continue
+            # O separador aplica cada config com separadores a todos os mesclados: uma tarefa por
+            # par, que depende só das duas configs. Configs sem separadores também entram, para
+            # que a saída de um par cujos separadores foram removidos seja apagada
+            for outra in configs:
+                finais.append(agendador.adicionar(Tarefa(
+                    f"separador:{config.name}:{outra.name}", _tarefa_separador, {**etapa, 'config': outra.name},
+                    dependencias=[mesclador.nome], entradas=[outra],
+                    codigo=[codigo['separador'], memoria_json],
+                    descricao=f"Separador de Variações ({config.name} × {outra.name})"
+                )).nome)
+
+        # Um tradutor por ramo, com só os JSONs dele: um ramo que muda não retraduz (nem
+        # renumera) os outros. Eles rodam um depois do outro, na ordem do grafo, para que a
+        # sequência de COD_PRODUTO seja reservada na mesma ordem também com --paralelo
+        origem = trabalho / ('json_com_rgex' if usar_separador else 'jsons_mesclados')
+        gabarito = self.pasta_tradutor / 'gabarito'
+        argumentos = {'pasta_tradutor': str(self.pasta_saida_tradutor), 'entrega': self.entrega,
+                      'opcoes': self.opcoes_tradutor, 'usar_cache': self.cache_tradutor}
+        if self.linhas_previa:
+            argumentos['pasta_gabarito'] = str(gabarito)
+        anterior = None
+        for final in finais:
+            ramo = final.split(':', 1)[1]
+            anterior = agendador.adicionar(Tarefa(
+                f"tradutor:{ramo}", _tarefa_tradutor, argumentos,
+                chave=self._chave_tradutor(etapas['tradutor']),
+                dependencias=[final], entradas=[gabarito / '*'], apos=[anterior] if anterior else [],
+                codigo=[TRADUTOR_PATH / '*.py', COMUM_PATH / '*.py'],
+                descricao=f"Tradutor Final ({ramo.replace(':', ' × ')})"
+            )).nome
+        return agendador, origem
+
+    def simular(self):
+        """Dry-run: [(descricao, motivo ou None)] sem executar nada nem criar pastas.
+
+        Não pega a pipeline.lock: com uma execução em andamento, o plano mostra o
+        estado em que ela estiver no momento."""
+        agendador, _ = self._executar_etapa('Planejamento', self._montar_grafo)
+        return [(tarefa.descricao, motivo) for tarefa, motivo in agendador.planejar(self.forcar)]
+
+    def executar(self):
+        """Roda as tarefas desatualizadas e retorna as contagens usadas no resumo final.
+
+        Com `progresso`, o fim da execução também vira um evento: 'concluido'
+        com as contagens ou 'erro' com {'etapa', 'mensagem'}.
+        """
+        etapas = _carregar_etapas()
+        progresso = etapas['progresso']
+        trava = etapas['trava'](self.pasta_trabalho / 'cache' / 'pipeline.lock')
+        progresso.acompanhar(self.progresso)
+        # As contagens do manifesto são coletadas sempre; o arquivo de métricas só com `metricas`
+        self._metricas = etapas['metricas'].Metricas()
+        etapas['metricas'].coletar(self._metricas)
+        perfil = None
+        situacao = 'erro'
+        try:
+            perfil = self._criar_perfil()
+            if not trava.adquirir():
+                raise PipelineOcupado('Início', f"Já existe uma execução do pipeline em andamento em {self.pasta_trabalho}")
+            if self.linhas_previa:
+                self._preparar_previa()
+            contagens = self._executar()
+            situacao = 'concluida'
+        except ErroEtapa as e:
+            if self.progresso:
+                self.progresso.falhar({'etapa': e.etapa, 'mensagem': str(e)})
+            raise
+        except progresso.Cancelado:
+            situacao = 'cancelada'
+            logging.warning("Execução cancelada")
+            if self.progresso:
+                self.progresso.falhar({'etapa': 'Cancelamento', 'mensagem': "Execução cancelada"})
+            raise
+        except KeyboardInterrupt:
+            situacao = 'interrompida'
+            raise
+        finally:
+            progresso.acompanhar(None)
+            trava.liberar()
+            etapas['metricas'].coletar(None)
+            self._metricas.encerrar()
+            if self._agendador is not None:
+                self._gravar_manifesto(situacao)
+            if self.metricas or self.prometheus:
+                self._gravar_metricas()
+            self._metricas = self._agendador = None
+            if perfil:
+                etapas['perfil'].perfilar(None)
+                self._gravar_perfil(perfil)
+
+        if self.progresso:
+            self.progresso.concluir(contagens)
+        return contagens
+
+    def _criar_perfil(self):
+        modulo = _carregar_etapas()['perfil']
+        alvos, memoria = modulo.configuracao_ambiente()
+        if self.perfil is not None:
+            alvos = modulo.ALVOS_PADRAO if self.perfil is True else (modulo.ler_alvos(self.perfil) if self.perfil else None)
+        if self.perfil_memoria is not None:
+            memoria = self.perfil_memoria
+        if not alvos:
+            return None
+        if self.paralelo > 1 or self.opcoes_tradutor.get('processos', 1) != 1:
+            logging.warning("Perfil: só o que roda no processo principal é medido; use --paralelo 1 e -p 1 para o quadro completo")
+        perfil = modulo.Perfil(alvos, memoria=memoria)
+        perfil.iniciar()
+        modulo.perfilar(perfil)
+        logging.info(f"Perfil ligado: {', '.join(alvos)}" + (" (com memória)" if memoria else ""))
+        return perfil
+
+    def _gravar_perfil(self, perfil):
+        perfil.parar()
+        try:
+            self.arquivos_perfil = perfil.gravar(self.pasta_motor / 'logs')
+            logging.info(f"Perfil: {self.arquivos_perfil[-1]}")
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar o perfil: {e}")
+
+    def _gravar_manifesto(self, situacao):
+        modulo = _carregar_etapas()['manifesto']
+        atual = self.pasta_trabalho / 'cache' / 'manifesto.json'
+        saidas = {nome: self._agendador.saidas(nome) for nome in self._agendador.tarefas}
+        self.manifesto = modulo.montar_manifesto(
+            self._metricas.resumo(), self._situacoes, saidas, anterior=modulo.ler_manifesto(atual),
+            situacao=situacao, previa=self.linhas_previa
+        )
+        caminho = self.pasta_motor / 'logs' / f"manifesto_{self._metricas.inicio:%Y%m%d_%H%M%S}.json"
+        try:
+            modulo.gravar_manifesto(caminho, self.manifesto)
+            # O da última execução fica junto do estado do agendador, para as tarefas em dia da próxima
+            modulo.gravar_manifesto(atual, self.manifesto)
+            self.arquivo_manifesto = caminho
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar o manifesto: {e}")
+            return
+        diferentes = [f"{linha['etapa']}:{linha['arquivo']}" for linha in self.manifesto['arquivos']
+                      if linha.get('confere') is False]
+        if diferentes:
+            logging.warning(f"Manifesto: contagens que não fecham em {', '.join(diferentes)}")
+        logging.info(f"Manifesto: {caminho}")
+
+    def _gravar_metricas(self):
+        medidas = self._metricas
+        try:
+            if self.metricas:
+                caminho = self.metricas
+                if caminho is True:
+                    caminho = self.pasta_motor / 'logs' / f"metricas_{medidas.inicio:%Y%m%d_%H%M%S}.json"
+                medidas.gravar_json(caminho)
+                self.arquivo_metricas = Path(caminho)
+                logging.info(f"Métricas: {caminho}")
+            if self.prometheus:
+                medidas.gravar_prometheus(self.prometheus)
+        except OSError as e:
+            # Sem as métricas a execução continua valendo
+            logging.warning(f"Não foi possível gravar as métricas: {e}")
+
+    def _criar_cache(self):
+        if not self.cache_etapas:
+            return None
+        pasta = self.pasta_motor / 'cache' / 'etapas' if self.cache_etapas is True else Path(self.cache_etapas)
+        return _carregar_etapas()['cache_etapas'](pasta, self.limite_cache_mb, ler=not self.forcar)
+
+    def _despejar_cache(self, cache):
+        try:
+            quantidade, total = cache.despejar()
+        except OSError as e:
+            logging.warning(f"Não foi possível limpar o cache das etapas: {e}")
+            return
+        if quantidade:
+            logging.info(f"Cache das etapas: {quantidade} entradas antigas removidas ({total / (1024 * 1024):.1f} MB)")
+
+    def _pasta_medidas(self):
+        return self.pasta_trabalho / 'cache' / 'medidas_tarefas'
+
+    def _juntar_medidas(self, pasta):
+        """Medidas das tarefas que rodaram em outros processos (modo paralelo)."""
+        if not pasta.is_dir():
+            return
+        for arquivo in sorted(pasta.glob('*.json')):
+            try:
+                with open(arquivo, 'r', encoding='utf-8') as f:
+                    self._metricas.incorporar(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Medidas ilegíveis em {arquivo.name}: {e}")
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    def _preparar_previa(self):
+        """A prévia numera a partir do COD_PRODUTO atual, em uma cópia que nunca volta para a produção."""
+        destino = self.pasta_saida_tradutor
+        (destino / 'cache').mkdir(parents=True, exist_ok=True)
+        cod = self.pasta_tradutor / 'start_cod_produto.txt'
+        if cod.exists():
+            shutil.copyfile(cod, destino / 'start_cod_produto.txt')
+        # Faixas reservadas por prévias anteriores não valem para a cópia nova do contador
+        (destino / 'cache' / 'reservas_cod_produto.json').unlink(missing_ok=True)
+        logging.info(f"Prévia: até {self.linhas_previa} linhas por aba, saídas em {destino / 'saidas'}")
+
+    def _executar(self):
+        global _memoria, _cache_etapas
+        etapas = _carregar_etapas()
+        trabalho = self.pasta_trabalho
+        cache = self._criar_cache()
+        agendador, origem = self._executar_etapa('Planejamento', lambda: self._montar_grafo(cache))
+        self._agendador = agendador
+        self._situacoes = {}
+        self._total = len(agendador.tarefas)
+        self._concluidas = 0
+        pasta_medidas = self._pasta_medidas()
+        shutil.rmtree(pasta_medidas, ignore_errors=True)
+
+        # Com tarefas em outros processos a memória não é compartilhada; cada etapa lê do disco
+        _memoria = etapas['memoria']() if self.paralelo <= 1 else None
+        _cache_etapas = cache
+        try:
+            resultado = agendador.executar(self.forcar)
+        except etapas['erro_tarefa'] as e:
+            raise ErroEtapa(e.tarefa.descricao, str(e)) from e
+        finally:
+            if _memoria is not None:
+                _memoria.limpar()
+            _memoria = None
+            if _cache_etapas is not None:
+                self._despejar_cache(_cache_etapas)
+            _cache_etapas = None
+            self._juntar_medidas(pasta_medidas)
+
+        executadas = sum(1 for r in resultado.values() if r == 'executada')
+        logging.info(f"Tarefas executadas: {executadas}, em dia: {len(resultado) - executadas}")
+
+        self.contagens = {
+            'txt': contar_arquivos(trabalho / 'txt_bruto', '.txt'),
+            'json': contar_arquivos(trabalho / 'json_final', '.json'),
+            'mesclados': contar_arquivos(trabalho / 'jsons_mesclados', '.json'),
+            'entregues': contar_arquivos(origem, '.json'),
+            'excel': contar_arquivos(self.pasta_saida_tradutor / 'saidas', '.xlsx'),
+            'executadas': executadas,
+            'em_dia': len(resultado) - executadas,
+        }
+        if origem.name == 'json_com_rgex':
+            self.contagens['regex'] = self.contagens['entregues']
+        return self.contagens
+
+
+def configurar_logging(pasta_logs=MOTOR_PATH / 'logs', arquivo_log=None, console=True):
+    """Configura o log da execução e retorna o caminho do arquivo.
+
+    Sem `arquivo_log`, cria pipeline_<data>.log em `pasta_logs`. Com
+    `console=False` nada vai para a saída padrão (cron).
+    """
+    if arquivo_log is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        arquivo_log = Path(pasta_logs) / f'pipeline_{timestamp}.log'
+    arquivo_log = Path(arquivo_log)
+    arquivo_log.parent.mkdir(parents=True, exist_ok=True)
+
+    handlers = [logging.FileHandler(arquivo_log, encoding='utf-8')]
+    if console and sys.stdout is not None:
+        handlers.append(logging.StreamHandler(sys.stdout))
+
+    # force: o tradutor_final configura o logging ao ser importado
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=handlers,
+        force=True
+    )
+    return arquivo_log
+
+
+def _inteiro_positivo(valor):
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError("precisa ser maior que zero")
+    return numero
+
+
+def _alvos_perfil(valor):
+    # Só o módulo do perfil (sem pandas) para validar os argumentos
+    if str(COMUM_PATH) not in sys.path:
+        sys.path.insert(0, str(COMUM_PATH))
+    from perfil import ler_alvos
+    try:
+        return ','.join(ler_alvos(valor))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Executa o ETL completo em um único processo, sem interface",
+        epilog=f"Códigos de saída: {SAIDA_OK} ok, {SAIDA_ERRO} erro em uma etapa, 2 argumentos inválidos, "
+               f"{SAIDA_OCUPADO} outra execução em andamento, {SAIDA_INTERROMPIDO} interrompido"
+    )
+    parser.add_argument('--sem-separador', action='store_true',
+                        help="não roda o separadorVariacoes; o tradutor usa jsons_mesclados")
+    parser.add_argument('--simular', '--dry-run', action='store_true',
+                        help="só mostra o que seria refeito, sem executar nada")
+    parser.add_argument('--forcar', action='store_true',
+                        help="refaz todas as tarefas, mesmo as que estão em dia, sem usar o cache das etapas")
+    parser.add_argument('--paralelo', type=int, default=1,
+                        help="tarefas independentes (fornecedores diferentes) rodando ao mesmo tempo")
+    parser.add_argument('-p', '--processos', type=int, default=1,
+                        help="arquivos de um mesmo ramo traduzidos em paralelo no tradutor (0 = um por CPU)")
+    parser.add_argument('--cor-persistente', action='store_true',
+                        help="mantém o mesmo COD_COR para cada cor em todos os arquivos")
+    parser.add_argument('--formato', choices=['xlsx', 'csv', 'parquet'], default='xlsx',
+                        help="formato das saídas do tradutor")
+    parser.add_argument('--linhas-por-parte', type=_inteiro_positivo, default=None,
+                        help="máximo de linhas por aba/arquivo de saída")
+    parser.add_argument('--dividir-em', choices=['abas', 'arquivos'], default='abas',
+                        help="no .xlsx, partes como abas do mesmo arquivo ou arquivos separados")
+    parser.add_argument('--previa', type=_inteiro_positivo, default=None, metavar='N',
+                        help="prévia rápida: só as N primeiras linhas de cada aba, com saídas em MOTOR/previa e TRADUTOR/previa")
+    parser.add_argument('--entrega', choices=['direto', 'link', 'copia'], default='direto',
+                        help="como os JSONs chegam ao tradutor: lidos direto do MOTOR, hardlinks ou cópias em TRADUTOR/jsons")
+    parser.add_argument('--pasta-motor', default=str(MOTOR_PATH),
+                        help="pasta com planilhas, configs e intermediários do MOTOR")
+    parser.add_argument('--pasta-tradutor', default=str(TRADUTOR_PATH),
+                        help="pasta com gabarito, start_cod_produto.txt e saídas do TRADUTOR")
+    parser.add_argument('--pasta-logs', default=None,
+                        help="onde gravar o log da execução (padrão: <pasta-motor>/logs)")
+    parser.add_argument('--metricas', nargs='?', const=True, default=None, metavar='ARQUIVO',
+                        help="grava tempos, linhas e pico de memória por etapa e arquivo em JSON "
+                             "(padrão: <pasta-motor>/logs/metricas_<data>.json)")
+    parser.add_argument('--prometheus', default=None, metavar='ARQUIVO',
+                        help="grava as métricas também no formato texto do Prometheus (textfile collector)")
+    parser.add_argument('--perfil', nargs='?', const=True, default=None, type=_alvos_perfil, metavar='ALVOS',
+                        help="passa funções ou etapas pelo cProfile e grava os dumps e um resumo em <pasta-motor>/logs "
+                             "(padrão: processar_arquivo_txt,mesclar_dados,gerar_produto_cartesiano,_corrigir_valores)")
+    parser.add_argument('--perfil-memoria', action='store_const', const=True, default=None,
+                        help="no perfil, mede também o pico de memória de cada alvo (tracemalloc, bem mais lento)")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="não usa nem guarda o cache das saídas das etapas (<pasta-motor>/cache/etapas)")
+    parser.add_argument('--limite-cache', type=_inteiro_positivo, default=None, metavar='MB',
+                        help="tamanho máximo do cache das etapas; as entradas usadas há mais tempo saem primeiro "
+                             "(padrão: 2048)")
+    parser.add_argument('-q', '--silencioso', action='store_true',
+                        help="escreve só no arquivo de log, nada na saída padrão")
+    return parser
+
+
+def opcoes_pipeline(args):
+    """Argumentos da linha de comando -> argumentos do PipelineETL."""
+    return dict(
+        pasta_motor=args.pasta_motor, pasta_tradutor=args.pasta_tradutor,
+        usar_separador=not args.sem_separador, entrega=args.entrega, paralelo=args.paralelo,
+        forcar=args.forcar, processos=args.processos, cor_persistente=args.cor_persistente,
+        formato=args.formato, linhas_por_parte=args.linhas_por_parte, dividir_em=args.dividir_em,
+        linhas_previa=args.previa, metricas=args.metricas, prometheus=args.prometheus,
+        perfil=args.perfil, perfil_memoria=args.perfil_memoria,
+        cache_etapas=not args.sem_cache, limite_cache_mb=args.limite_cache
+    )
+
+
+def executar_cli(args, arquivo_log=None):
+    """Roda o pipeline com os argumentos já lidos e retorna (código de saída, contagens ou None)."""
+    _carregar_etapas()
+    try:
+        contagens = PipelineETL(arquivo_log=arquivo_log, **opcoes_pipeline(args)).executar()
+    except PipelineOcupado as e:
+        logging.error(str(e))
+        return SAIDA_OCUPADO, None
+    except ErroEtapa as e:
+        logging.error(f"Erro no {e.etapa}: {e}")
+        return SAIDA_ERRO, None
+    except (KeyboardInterrupt, _etapas['progresso'].Cancelado):
+        logging.error("Execução interrompida")
+        return SAIDA_INTERROMPIDO, None
+    except Exception:
+        logging.exception("Erro inesperado no pipeline")
+        return SAIDA_ERRO, None
+
+    logging.info(f"Concluído: {contagens}")
+    return SAIDA_OK, contagens
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+
+    if args.simular:
+        logging.basicConfig(level=logging.INFO, format='%(message)s', force=True)
+        _carregar_etapas()
+        try:
+            plano = PipelineETL(**opcoes_pipeline(args)).simular()
+        except ErroEtapa as e:
+            logging.error(f"Erro no {e.etapa}: {e}")
+            return SAIDA_ERRO
+        for descricao, motivo in plano:
+            print(f"{'REFAZER' if motivo else 'em dia '}  {descricao}" + (f"  ({motivo})" if motivo else ""))
+        print(f"{sum(1 for _, motivo in plano if motivo)} de {len(plano)} tarefas seriam executadas")
+        return SAIDA_OK
+
+    pasta_logs = args.pasta_logs or Path(args.pasta_motor) / 'logs'
+    codigo, _ = executar_cli(args, configurar_logging(pasta_logs, console=not args.silencioso))
+    return codigo
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Servidor HTTP dos arquivos estáticos (build do Vite em JSON/dist).
+
+Serve a pasta informada sem mudar o diretório atual do processo (o pipeline
+roda no mesmo processo e usa caminhos relativos), atende cada conexão em uma
+thread e:
+
+- responde 304 com ETag / Last-Modified quando o navegador já tem o arquivo;
+- manda cache longo (immutable) para os arquivos com hash no nome em assets/,
+  e `no-cache` (revalidar) para o resto, como o index.html;
+- entrega `arquivo.br` ou `arquivo.gz` pré-comprimidos, quando existirem e o
+  navegador aceitar;
+- envia o corpo com sendfile (socket.sendfile), sem passar pelo Python, o que
+  importa para arquivos grandes como o gabarito-padrao.xlsx.
+
+    servidor = ServidorEstatico(("", 8000), "JSON/dist")
+    servidor.serve_forever()
+"""
+import email.utils
+import http.server
+import os
+import re
+import sys
+from datetime import timezone
+from functools import partial
+
+# Nomes gerados pelo Vite: assets/index-BxYz12ab.js
+ASSET_COM_HASH = re.compile(r'-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+PASTA_ASSETS = 'assets'
+CACHE_LONGO = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+
+# Em ordem de preferência
+PRE_COMPRIMIDOS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _etag_igual(cabecalho, etag):
+    if cabecalho.strip() == '*':
+        return True
+    for candidato in cabecalho.split(','):
+        candidato = candidato.strip()
+        if candidato.startswith('W/'):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+class ManipuladorEstatico(http.server.SimpleHTTPRequestHandler):
+    # No Windows o mimetypes lê o registro, que às vezes diz text/plain para .js
+    extensions_map = {
+        **http.server.SimpleHTTPRequestHandler.extensions_map,
+        '.js': 'text/javascript',
+        '.mjs': 'text/javascript',
+        '.css': 'text/css',
+        '.json': 'application/json',
+        '.svg': 'image/svg+xml',
+        '.wasm': 'application/wasm',
+        '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def _codificacoes_aceitas(self):
+        aceitas = set()
+        for parte in self.headers.get('Accept-Encoding', '').split(','):
+            nome, _, parametros = parte.partition(';')
+            parametros = parametros.strip()
+            if parametros.startswith('q='):
+                try:
+                    if float(parametros[2:]) == 0:
+                        continue
+                except ValueError:
+                    continue
+            if nome.strip():
+                aceitas.add(nome.strip().lower())
+        return aceitas
+
+    def _nao_modificado(self, etag, modificado):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Com If-None-Match, o If-Modified-Since é ignorado (RFC 9110)
+            return _etag_igual(if_none_match, etag)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if not if_modified_since:
+            return False
+        try:
+            data = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if data.tzinfo is None:
+            data = data.replace(tzinfo=timezone.utc)
+        return int(modificado) <= data.timestamp()
+
+    def _cabecalhos_cache(self, caminho, etag, modificado, variantes):
+        relativo = os.path.relpath(caminho, self.directory).replace(os.sep, '/')
+        longo = relativo.startswith(PASTA_ASSETS + '/') and ASSET_COM_HASH.search(relativo)
+        self.send_header('Cache-Control', CACHE_LONGO if longo else CACHE_REVALIDAR)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(int(modificado)))
+        if variantes:
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def send_head(self):
+        caminho = self.translate_path(self.path)
+        termina_em_barra = self.path.split('?', 1)[0].split('#', 1)[0].endswith('/')
+        if os.path.isdir(caminho) and termina_em_barra and os.path.isfile(os.path.join(caminho, 'index.html')):
+            caminho = os.path.join(caminho, 'index.html')
+        elif not os.path.isfile(caminho) or termina_em_barra:
+            # Redirecionamento de pasta sem barra, listagem e 404 ficam com a classe base
+            return super().send_head()
+
+        variantes = [(cod, caminho + ext) for cod, ext in PRE_COMPRIMIDOS if os.path.isfile(caminho + ext)]
+        aceitas = self._codificacoes_aceitas()
+        arquivo, codificacao = caminho, None
+        for cod, variante in variantes:
+            if cod in aceitas:
+                arquivo, codificacao = variante, cod
+                break
+
+        try:
+            f = open(arquivo, 'rb')
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            info = os.fstat(f.fileno())
+            etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}{"-" + codificacao if codificacao else ""}"'
+            if self._nao_modificado(etag, info.st_mtime):
+                f.close()
+                self.send_response(http.HTTPStatus.NOT_MODIFIED)
+                self._cabecalhos_cache(caminho, etag, info.st_mtime, variantes)
+                self.end_headers()
+                return None
+
+            self.send_response(http.HTTPStatus.OK)
+            self.send_header('Content-Type', self.guess_type(caminho))
+            self.send_header('Content-Length', str(info.st_size))
+            if codificacao:
+                self.send_header('Content-Encoding', codificacao)
+            self._cabecalhos_cache(caminho, etag, info.st_mtime, variantes)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        try:
+            source.fileno()
+        except (AttributeError, OSError):
+            # Listagem de pasta e páginas de erro vêm em memória
+            return super().copyfile(source, outputfile)
+        outputfile.flush()
+        self.connection.sendfile(source)
+
+
+class ServidorEstatico(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    manipulador = ManipuladorEstatico
+
+    def __init__(self, endereco, pasta):
+        self.pasta = os.path.abspath(pasta)
+        super().__init__(endereco, partial(self.manipulador, directory=self.pasta))
+
+    def handle_error(self, request, client_address):
+        # Aba fechada no meio de um download não é erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)